@@ -0,0 +1,58 @@
+"""
+Compare two benchmark reports:  python -m benchmarks.compare before.json after.json
+Prints every latency/throughput metric with its relative change.
+"""
+import argparse
+import json
+from typing import Any, Dict, Iterator, Tuple
+
+# Metrics where a higher value is better, everything else is a latency
+HIGHER_IS_BETTER = ("throughput_rps", "events_per_s")
+TRACKED = ("p50_ms", "p90_ms", "p99_ms", "mean_ms", "throughput_rps", "events_per_s",
+           "overhead_p50_ms", "overhead_p99_ms", "mean_ms_per_event", "errors", "import_ms", "ready_ms")
+
+
+def flatten(node: Any, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    if isinstance(node, dict):
+        for key, value in node.items():
+            yield from flatten(value, f"{prefix}/{key}" if prefix else key)
+    elif isinstance(node, (int, float)) and prefix.rsplit("/", 1)[-1] in TRACKED:
+        yield prefix, float(node)
+
+
+def compare(before: Dict[str, Any], after: Dict[str, Any], threshold: float) -> int:
+    old = dict(flatten(before["results"]))
+    new = dict(flatten(after["results"]))
+    regressions = 0
+
+    print(f"{'metric':<70} {before['revision']:>10} {after['revision']:>10} {'change':>9}")
+    for key in sorted(old.keys() & new.keys()):
+        a, b = old[key], new[key]
+        change = (b - a) / a * 100 if a else 0.0
+        better_if_higher = key.endswith(HIGHER_IS_BETTER)
+        worse = change < -threshold if better_if_higher else change > threshold
+        marker = "  <-- regression" if worse and a else ""
+        regressions += bool(marker)
+        print(f"{key:<70} {a:>10.2f} {b:>10.2f} {change:>8.1f}%{marker}")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent change flagged as a regression")
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    regressions = compare(before, after, args.threshold)
+    raise SystemExit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
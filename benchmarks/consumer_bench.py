@@ -0,0 +1,75 @@
+"""
+Consumer throughput: feed N UserCreated events through UserEventConsumer backed
+through the in-memory Kafka transport, including the notification DB write. Prints JSON.
+  python -m benchmarks.consumer_bench --events 5000 --database-url sqlite:///...
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+
+async def run(events: int) -> dict:
+    from database import Base, engine, SessionLocal
+    from models import Notification
+    from events.consumer import UserEventConsumer
+    from events.transport import memory_broker
+
+    Base.metadata.create_all(bind=engine)
+
+    topic = "notification"
+    group_id = "benchmark"
+    broker = memory_broker()
+    for i in range(events):
+        broker.produce(topic, str(i + 1).encode(), json.dumps({
+            "user_id": i + 1,
+            "username": f"bench_user_{i}",
+            "email": f"bench_user_{i}@bench-mail.com",
+        }).encode())
+
+    consumer = UserEventConsumer(bootstrap_servers=[], topic=topic, group_id=group_id,
+                                 transport="memory", poll_timeout_ms=10)
+
+    start = time.perf_counter()
+    await consumer.start()
+    while broker.lag(group_id, topic):
+        await asyncio.sleep(0.001)
+    elapsed = time.perf_counter() - start
+    await consumer.stop()
+
+    session = SessionLocal()
+    try:
+        stored = session.query(Notification).count()
+    finally:
+        session.close()
+
+    return {
+        "events": events,
+        "stored": stored,
+        "elapsed_s": round(elapsed, 4),
+        "events_per_s": round(events / elapsed, 2) if elapsed else 0.0,
+        "mean_ms_per_event": round(elapsed / events * 1000, 4) if events else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--database-url", required=True)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url
+    from benchmarks.serve import enter_service
+    enter_service("notification")
+
+    import logging
+    logging.disable(logging.INFO)
+
+    result = asyncio.run(run(args.events))
+    sys.stdout.write(json.dumps(result) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""
+Time the import of one service's app in a fresh interpreter. Prints JSON.
+  python -m benchmarks.import_time user
+"""
+import argparse
+import json
+import sys
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("service", choices=["user", "notification", "gateway"])
+    args = parser.parse_args()
+
+    from benchmarks.serve import enter_service
+    enter_service(args.service)
+
+    start = time.perf_counter()
+    import main  # noqa: F401
+    elapsed = time.perf_counter() - start
+
+    sys.stdout.write(json.dumps({"import_ms": round(elapsed * 1000, 3), "modules": len(sys.modules)}) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""
+Benchmark suite: python -m benchmarks.run [--scenarios user_api,gateway,consumer,startup]
+
+Starts the services locally with SQLite and the in-memory Kafka transport,
+runs each scenario at several concurrency levels and writes a JSON report to
+benchmarks/results/ that benchmarks.compare can diff between commits.
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import platform
+import statistics
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import httpx
+
+from .loadgen import run_load
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+JWT_SECRET = "benchmark-secret"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def make_token(subject: str = "1") -> str:
+    """HS256 JWT for the gateway, built by hand to keep the harness dependency free"""
+    def encode(data: dict) -> bytes:
+        return base64.urlsafe_b64encode(json.dumps(data, separators=(",", ":")).encode()).rstrip(b"=")
+
+    signing_input = encode({"alg": "HS256", "typ": "JWT"}) + b"." + encode({"sub": subject, "exp": int(time.time()) + 3600})
+    signature = base64.urlsafe_b64encode(hmac.new(JWT_SECRET.encode(), signing_input, hashlib.sha256).digest()).rstrip(b"=")
+    return (signing_input + b"." + signature).decode()
+
+
+def subprocess_env(**extra) -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    env.update({key: str(value) for key, value in extra.items()})
+    return env
+
+
+@contextmanager
+def running_service(service: str, port: int, health_path: str, **env):
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.serve", service, "--port", str(port)],
+        cwd=ROOT,
+        env=subprocess_env(**env),
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"{service} service exited with code {process.returncode}")
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}{health_path}", timeout=1).status_code < 500:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{service} service did not start on port {port}")
+            time.sleep(0.2)
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def user_service_env(database_path: str) -> dict:
+    return {
+        "DATABASE_URL": f"sqlite:///{database_path}",
+        "USER_CACHE_INVALIDATION_ENABLED": "false",
+        "FLUENTD_HOST": "127.0.0.1",
+        "TRACING_EXPORTER": "none",
+    }
+
+
+def new_user(tag: str, index: int) -> dict:
+    return {
+        "username": f"bench_{tag}_{index}",
+        "email": f"bench_{tag}_{index}@bench-mail.com",
+        "password": "BenchPass123",
+        "role": "user",
+        "age": 30,
+        "full_name": "Bench User",
+    }
+
+
+async def bench_user_api(base_url: str, levels: list[int], requests: int) -> dict:
+    results = {}
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        for concurrency in levels:
+            tag = f"c{concurrency}_{int(time.time())}"
+
+            async def create(i: int) -> int:
+                return (await client.post("/users/", json=new_user(tag, i))).status_code
+
+            async def list_users(i: int) -> int:
+                return (await client.get("/users/")).status_code
+
+            async def get_user(i: int) -> int:
+                return (await client.get(f"/users/{i % 50 + 1}")).status_code
+
+            results[str(concurrency)] = {
+                "POST /users/": await run_load(create, requests, concurrency),
+                "GET /users/": await run_load(list_users, requests, concurrency),
+                "GET /users/{user_id}": await run_load(get_user, requests, concurrency),
+            }
+    return results
+
+
+async def seed_users(base_url: str, count: int):
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        for i in range(count):
+            await client.post("/users/", json=new_user("seed", i))
+
+
+async def bench_gateway(direct_url: str, gateway_url: str, levels: list[int], requests: int) -> dict:
+    headers = {"Authorization": f"Bearer {make_token()}"}
+    results = {}
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    async with httpx.AsyncClient(limits=limits, timeout=30, headers=headers) as client:
+        for concurrency in levels:
+            async def direct(i: int) -> int:
+                return (await client.get(f"{direct_url}/users/{i % 50 + 1}")).status_code
+
+            async def proxied(i: int) -> int:
+                return (await client.get(f"{gateway_url}/api/user/users/{i % 50 + 1}")).status_code
+
+            direct_result = await run_load(direct, requests, concurrency)
+            gateway_result = await run_load(proxied, requests, concurrency)
+            results[str(concurrency)] = {
+                "direct": direct_result,
+                "gateway": gateway_result,
+                "overhead_p50_ms": round(gateway_result["p50_ms"] - direct_result["p50_ms"], 3),
+                "overhead_p99_ms": round(gateway_result["p99_ms"] - direct_result["p99_ms"], 3),
+            }
+    return results
+
+
+def bench_consumer(events: int, workdir: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.consumer_bench", "--events", str(events),
+         "--database-url", f"sqlite:///{os.path.join(workdir, 'notification.db')}"],
+        cwd=ROOT,
+        env=subprocess_env(TRACING_EXPORTER="none"),
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    # The service prints while handling events, the report is the last line
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def bench_startup(runs: int, workdir: str) -> dict:
+    """Median cold start per service: importing the app, and launching it until it answers its health check"""
+    services = {
+        "user": ("/", user_service_env(os.path.join(workdir, "startup_user.db"))),
+        "notification": ("/health", {
+            "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'startup_notification.db')}",
+            "TRACING_EXPORTER": "none",
+        }),
+        "gateway": ("/health", {"TRACING_EXPORTER": "none"}),
+    }
+    results = {}
+    for service, (health_path, env) in services.items():
+        imports, ready = [], []
+        for _ in range(runs):
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.import_time", service],
+                cwd=ROOT, env=subprocess_env(**env), check=True, capture_output=True, text=True,
+            ).stdout
+            imports.append(json.loads(output.strip().splitlines()[-1])["import_ms"])
+            ready.append(time_to_ready(service, health_path, env))
+
+        results[service] = {
+            "import_ms": round(statistics.median(imports), 3),
+            "ready_ms": round(statistics.median(ready), 3),
+            "runs": runs,
+        }
+    return results
+
+
+def time_to_ready(service: str, health_path: str, env: dict) -> float:
+    port = free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.serve", service, "--port", str(port)],
+        cwd=ROOT,
+        env=subprocess_env(**env),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(timeout=1) as client:
+            while True:
+                if process.poll() is not None:
+                    raise RuntimeError(f"{service} service exited with code {process.returncode}")
+                try:
+                    if client.get(f"http://127.0.0.1:{port}{health_path}").status_code < 500:
+                        return (time.perf_counter() - start) * 1000
+                except httpx.HTTPError:
+                    pass
+                if time.perf_counter() - start > 30:
+                    raise RuntimeError(f"{service} service did not start on port {port}")
+                time.sleep(0.01)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default="user_api,gateway,consumer,startup")
+    parser.add_argument("--concurrency", default="1,10,50")
+    parser.add_argument("--requests", type=int, default=500, help="requests per endpoint and concurrency level")
+    parser.add_argument("--events", type=int, default=5000, help="events for the consumer scenario")
+    parser.add_argument("--startup-runs", type=int, default=5, help="cold starts per service for the startup scenario")
+    parser.add_argument("--output", default=None, help="report path, defaults to benchmarks/results/<time>_<rev>.json")
+    args = parser.parse_args()
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    levels = [int(c) for c in args.concurrency.split(",")]
+    revision = git_revision()
+
+    report = {
+        "revision": revision,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {"concurrency": levels, "requests": args.requests, "events": args.events,
+                     "startup_runs": args.startup_runs},
+        "results": {},
+    }
+
+    with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+        if "user_api" in scenarios:
+            with running_service("user", free_port(), "/", **user_service_env(os.path.join(workdir, "user_api.db"))) as url:
+                report["results"]["user_api"] = asyncio.run(bench_user_api(url, levels, args.requests))
+
+        if "gateway" in scenarios:
+            user_env = user_service_env(os.path.join(workdir, "gateway.db"))
+            with running_service("user", free_port(), "/", **user_env) as user_url:
+                asyncio.run(seed_users(user_url, 50))
+                gateway_env = {
+                    "USER_SERVICE_URLS": user_url,
+                    "JWT_SECRET_KEY": JWT_SECRET,
+                    "JWT_ALGORITHM": "HS256",
+                    "RATE_LIMIT_ENABLED": "false",
+                    "TRACING_EXPORTER": "none",
+                }
+                with running_service("gateway", free_port(), "/health", **gateway_env) as gateway_url:
+                    report["results"]["gateway"] = asyncio.run(bench_gateway(user_url, gateway_url, levels, args.requests))
+
+        if "consumer" in scenarios:
+            report["results"]["consumer"] = bench_consumer(args.events, workdir)
+
+        if "startup" in scenarios:
+            report["results"]["startup"] = bench_startup(args.startup_runs, workdir)
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}_{revision}.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(json.dumps(report["results"], indent=2))
+    print(f"Report written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+Run one service under uvicorn for the benchmarks, with Kafka replaced by the
+in-memory transport:  python -m benchmarks.serve user --port 18001
+"""
+import argparse
+import os
+import sys
+
+SERVICES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "app")
+
+
+def enter_service(name: str):
+    """Make the service importable the way its Dockerfile runs it"""
+    service_dir = os.path.join(SERVICES_DIR, name)
+    os.chdir(service_dir)
+    sys.path.insert(0, service_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("service", choices=["user", "notification", "gateway"])
+    parser.add_argument("--port", type=int, required=True)
+    args = parser.parse_args()
+
+    os.environ["KAFKA_TRANSPORT"] = "memory"
+    enter_service(args.service)
+    if os.path.exists("migrate.py"):
+        from migrate import run_migrations
+        run_migrations()
+
+    import uvicorn
+    uvicorn.run("main:app", host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,154 @@
-from pydantic_settings import BaseSettings as PydanticBaseSettings
-from dotenv import load_dotenv
-import os
-from domain.entities.service import Service
-
-#Load environment variables from .env file
-load_dotenv('../.env')
+from pydantic_settings import BaseSettings as PydanticBaseSettings, SettingsConfigDict
+import json
+from domain.entities.service import Service, ResiliencePolicy
 
 
 class BaseSettings(PydanticBaseSettings):
-    env: str = os.getenv("ENV", "development")
+    # Fields are read from the environment by name (USER_SERVICE_URLS -> user_service_urls),
+    # then from ../.env. Nothing is read until the settings are instantiated.
+    model_config = SettingsConfigDict(env_file="../.env", env_file_encoding="utf-8", extra="ignore")
+
+    env: str = "development"
     api_gateway_url: str = "http://localhost:8000"
 
-    # They will change and I use service discovery in future
-    user_service_url: str = "http://localhost:8001"
-    notification_service_url: str = "http://localhost:8002"
-    jwt_secret_key: str = os.getenv("JWT_SECRET_KEY", "your_secret_key")
-    jwt_algorithm: str = os.getenv("JWT_ALGORITHM", "HS256")
-    jwt_expiration_minutes: int = int(os.getenv("JWT_EXPIRATION_MINUTES", "60"))
+    # Comma separated instance urls, or an UPSTREAMS_FILE (see load_upstreams_file)
+    user_service_urls: str = "http://localhost:8001"
+    notification_service_urls: str = "http://localhost:8002"
+    upstreams_file: str = ""
+    routes_file: str = ""
+    load_balancer: str = "round_robin"
+
+    # Active and passive health checking
+    health_check_interval: float = 5.0
+    health_check_timeout: float = 1.0
+    ejection_threshold: int = 3
+    ejection_duration: float = 30.0
+    config_reload_interval: float = 5.0
+
+    # Rate limiting, routes without a `rate_limit` get the default one
+    rate_limit_enabled: bool = True
+    rate_limit_default: str = "50/second"
+    rate_limit_backend: str = "memory"
+    rate_limit_redis_url: str = "redis://localhost:6379/0"
+    rate_limit_max_keys: int = 100000
+    trust_forwarded_for: bool = False
+
+    # Tracing: tracing_exporter is one of none, memory, log, file
+    tracing_exporter: str = "none"
+    tracing_file: str = "traces/gateway.jsonl"
+    tracing_sample_rate: float = 1.0
+
+    # Request metrics and access log sampling
+    access_log_sample_rate: float = 0.01
+    slow_request_threshold: float = 1.0
+
+    # /debug endpoints need an X-Debug-Token header equal to debug_admin_token, empty disables them
+    debug_admin_token: str = ""
+    loop_lag_monitor_enabled: bool = True
+    loop_lag_threshold_ms: float = 100.0
+
+    jwt_secret_key: str = "your_secret_key"
+    jwt_algorithm: str = "HS256"
+    jwt_expiration_minutes: int = 60
+
+    # RS256/RS384/RS512/EdDSA tokens are verified against the public keys of a JWKS,
+    # read from a file or an http(s) url, reloaded every jwks_refresh_interval and when a
+    # token names an unknown kid (at most once per jwks_min_refetch_interval). HS256
+    # tokens keep using jwt_secret_key. Issuer and audience are only checked when set.
+    jwks_source: str = ""
+    jwks_refresh_interval: float = 300.0
+    jwks_min_refetch_interval: float = 30.0
+    jwt_issuer: str = ""
+    jwt_audience: str = ""
+    jwt_leeway_seconds: float = 30.0
 
+    # Upstream resilience defaults, applied to every service
+    upstream_connect_timeout: float = 2.0
+    upstream_read_timeout: float = 10.0
+    upstream_max_retries: int = 2
+    upstream_retry_budget_ratio: float = 0.2
+    breaker_failure_threshold: int = 5
+    breaker_reset_timeout: float = 30.0
+    bulkhead_max_concurrency: int = 50
+    bulkhead_max_queue_wait: float = 0.1
 
+    # Response compression (br needs the `brotli` package) and request body limits.
+    # Content types are prefixes, routes can opt out with `"compress": false` and
+    # override the body limit with `max_body_size` (0 disables it).
+    compression_enabled: bool = True
+    compression_algorithms: str = "br,gzip"
+    compression_min_size: int = 1024
+    compression_content_types: str = "application/json,text/,application/javascript"
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+    max_body_size: int = 1048576
+
+    # Concurrent identical GETs share one upstream call, whose response is buffered and
+    # copied to every waiter. Routes override it with `"coalesce"` and `"coalesce_scope"`.
+    coalesce_enabled: bool = True
+
+
+    def resilience_policy(self) -> ResiliencePolicy:
+        return ResiliencePolicy(
+            connect_timeout=self.upstream_connect_timeout,
+            read_timeout=self.upstream_read_timeout,
+            max_retries=self.upstream_max_retries,
+            retry_budget_ratio=self.upstream_retry_budget_ratio,
+            breaker_failure_threshold=self.breaker_failure_threshold,
+            breaker_reset_timeout=self.breaker_reset_timeout,
+            max_concurrency=self.bulkhead_max_concurrency,
+            max_queue_wait=self.bulkhead_max_queue_wait,
+        )
 
     @property
     def service_mapping(self) -> dict[str, Service]:
-        return {
+        services = {
             "user": Service(
                 name="user_service",
-                url=self.user_service_url,
-                slag="users"
+                instances=split_urls(self.user_service_urls),
+                slag="users",
+                health_path="/",
+                balancer=self.load_balancer,
+                policy=self.resilience_policy()
             ),
             "notification": Service(
                 name="notification_service",
-                url=self.notification_service_url,
-                slag="notifications"
+                instances=split_urls(self.notification_service_urls),
+                slag="notifications",
+                health_path="/health",
+                balancer=self.load_balancer,
+                policy=self.resilience_policy()
             ),
         }
+        if self.upstreams_file:
+            load_upstreams_file(self.upstreams_file, services, self)
+        return services
+
+
+def split_urls(value: str) -> list[str]:
+    return [url.strip() for url in value.split(",") if url.strip()]
+
+
+def load_upstreams_file(path: str, services: dict[str, Service], settings: BaseSettings):
+    """
+    Override or add services from a JSON file, e.g.
+    {"user": {"instances": ["http://user-1:8001", "http://user-2:8001"], "balancer": "p2c", "health_path": "/"}}
+    """
+    with open(path) as f:
+        entries = json.load(f)
+
+    for key, entry in entries.items():
+        service = services.get(key)
+        if service is None:
+            service = Service(
+                name=f"{key}_service",
+                instances=[],
+                slag=key,
+                balancer=settings.load_balancer,
+                policy=settings.resilience_policy()
+            )
+            services[key] = service
+
+        service.instances = entry.get("instances", service.instances)
+        service.balancer = entry.get("balancer", service.balancer)
+        service.health_path = entry.get("health_path", service.health_path)
@@ -0,0 +1,35 @@
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True, slots=True)
+class RateLimit:
+    requests: int
+    period: float
+
+    @property
+    def refill_per_second(self) -> float:
+        return self.requests / self.period
+
+
+@dataclass(frozen=True, slots=True)
+class RouteOptions:
+    auth_required: bool = True
+    connect_timeout: float | None = None
+    read_timeout: float | None = None
+    cache_policy: str | None = None
+    rate_limit: RateLimit | None = None
+    # Bytes, None means unlimited
+    max_body_size: int | None = None
+    compress: bool = True
+    # Concurrent identical GETs share one upstream call. The "token" scope only
+    # merges requests with the same credentials, "shared" merges every caller's
+    coalesce: bool = False
+    coalesce_scope: str = "token"
+
+
+@dataclass(frozen=True, slots=True)
+class Route:
+    prefix: str
+    service: str
+    strip_prefix: str
+    options: RouteOptions = RouteOptions()
@@ -1,7 +1,26 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+
+
+@dataclass
+class ResiliencePolicy:
+    connect_timeout: float = 2.0
+    read_timeout: float = 10.0
+    max_retries: int = 2
+    retry_backoff: float = 0.05
+    retry_budget_ratio: float = 0.2
+    retry_min_per_second: float = 3.0
+    breaker_failure_threshold: int = 5
+    breaker_reset_timeout: float = 30.0
+    breaker_half_open_max_calls: int = 1
+    max_concurrency: int = 50
+    max_queue_wait: float = 0.1
+
 
 @dataclass
 class Service:
     name: str
-    url: str
-    slag: str
\ No newline at end of file
+    instances: list[str]
+    slag: str
+    health_path: str = "/health"
+    balancer: str = "round_robin"
+    policy: ResiliencePolicy = field(default_factory=ResiliencePolicy)
@@ -1,17 +1,141 @@
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from contextlib import asynccontextmanager
 from middleware.auth_middlleware import AuthMiddleware
+from middleware.compression_middleware import CompressionMiddleware
+from middleware.rate_limiter_middleware import RateLimitMiddleware
+from middleware.timing_middleware import TimingMiddleware, RequestMetrics, queued_access_logger
+from utils.tracing import tracer, create_exporter, TracingMiddleware
+from utils.debug import LoopLagMonitor, create_debug_router
 from fastapi.routing import APIRouter
+from routers.gateway_router import router as gateway_router, upstreams, settings, route_table, coalescer
+from utils.health_checker import HealthChecker
+from utils.config_watcher import ConfigWatcher
+from utils.rate_limit_backends import create_rate_limit_backend
+from use_cases.jwks import JWKSKeySet
 
 router = APIRouter()
-app = FastAPI()
+request_metrics = RequestMetrics("gateway")
+loop_monitor = LoopLagMonitor(threshold=settings.loop_lag_threshold_ms / 1000)
+tracer.configure(
+    "gateway",
+    create_exporter(settings.tracing_exporter, settings.tracing_file),
+    sample_rate=settings.tracing_sample_rate,
+)
+rate_limit_backend = create_rate_limit_backend(
+    settings.rate_limit_backend,
+    redis_url=settings.rate_limit_redis_url,
+    max_keys=settings.rate_limit_max_keys,
+)
+jwks = JWKSKeySet(
+    settings.jwks_source,
+    refresh_interval=settings.jwks_refresh_interval,
+    min_refetch_interval=settings.jwks_min_refetch_interval,
+    issuer=settings.jwt_issuer,
+    audience=settings.jwt_audience,
+    leeway=settings.jwt_leeway_seconds,
+) if settings.jwks_source else None
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    health_checker = HealthChecker(
+        upstreams,
+        interval=settings.health_check_interval,
+        timeout=settings.health_check_timeout,
+    )
+    config_watcher = ConfigWatcher(upstreams, route_table, settings)
+    health_checker.start()
+    config_watcher.start()
+    if settings.loop_lag_monitor_enabled:
+        loop_monitor.start()
+    if jwks:
+        await jwks.start()
 
+    yield
 
-app.add_middleware(AuthMiddleware)
+    if jwks:
+        await jwks.stop()
+    await loop_monitor.stop()
+    await config_watcher.stop()
+    await health_checker.stop()
+    await rate_limit_backend.aclose()
+    # Close the pooled upstream connections
+    await upstreams.aclose()
+    tracer.exporter.shutdown()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+
+
+
+
+# Added first so it runs after AuthMiddleware has identified the client
+app.add_middleware(
+    RateLimitMiddleware,
+    backend=rate_limit_backend,
+    trust_forwarded_for=settings.trust_forwarded_for,
+)
+app.add_middleware(AuthMiddleware, key_set=jwks)
+
+
+def route_compression(scope: dict) -> bool:
+    """Routes opt out of compression with `"compress": false`"""
+    route = scope.get("state", {}).get("route")
+    return route is None or route.options.compress
+
+
+if settings.compression_enabled:
+    app.add_middleware(
+        CompressionMiddleware,
+        algorithms=settings.compression_algorithms.split(","),
+        min_size=settings.compression_min_size,
+        content_types=[value.strip() for value in settings.compression_content_types.split(",") if value.strip()],
+        gzip_level=settings.compression_gzip_level,
+        brotli_quality=settings.compression_brotli_quality,
+        route_filter=route_compression,
+    )
+
+
+def route_label(scope: dict) -> str | None:
+    """Label proxied requests by gateway route prefix rather than the catch-all path"""
+    route = scope.get("state", {}).get("route")
+    return route.route.prefix if route else None
+
+
+# Outermost, so auth and rate limiting are part of the measured latency
+app.add_middleware(
+    TimingMiddleware,
+    metrics=request_metrics,
+    access_log=queued_access_logger("gateway.access"),
+    sample_rate=settings.access_log_sample_rate,
+    slow_request_threshold=settings.slow_request_threshold,
+    route_label=route_label,
+)
+# Starts (or continues) the trace before anything else runs
+app.add_middleware(TracingMiddleware)
 
 @router.get("/health")
 async def health_check():
-    return {"status": "ok"}
+    return {
+        "status": "degraded" if upstreams.is_degraded() else "ok",
+        "upstreams": upstreams.snapshot(),
+        "jwks": jwks.stats() if jwks else None,
+    }
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return request_metrics.render_prometheus() + coalescer.render_prometheus("gateway")
+
+@router.get("/metrics/summary")
+async def metrics_summary():
+    return request_metrics.summary()
+
+@router.get("/metrics/coalescing")
+async def metrics_coalescing():
+    """Upstream calls made for coalescable GETs and requests merged into them, per route"""
+    return coalescer.stats()
 
-app.include_router(router)
\ No newline at end of file
+app.include_router(router)
+app.include_router(create_debug_router(settings.debug_admin_token, loop_monitor))
+app.include_router(gateway_router)
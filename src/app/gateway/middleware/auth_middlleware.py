@@ -1,27 +1,49 @@
-from use_cases.validate_token import validate_token
-from fastapi import FastAPI, Request, HTTPException
+from use_cases.validate_token import validate_token_refetching
+from use_cases.jwks import JWKSKeySet
+from use_cases.exceptions import InvalidTokenError, MissingTokenError
+from fastapi import Request
+from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
+from routers.gateway_router import route_table, settings
 
 
 class AuthMiddleware(BaseHTTPMiddleware):
 
     PUBLIC_PATHS = ["/login", "/signup", "/public","/health"]
+    # The gateway's own endpoints, matched exactly so /api/<service>/metrics still needs a token
+    LOCAL_PUBLIC_PATHS = {"/metrics", "/metrics/summary", "/metrics/coalescing"}
+    # Checked against the admin debug token by the debug router instead of a JWT
+    ADMIN_PREFIXES = ("/debug/",)
+
+    def __init__(self, app, key_set: JWKSKeySet | None = None):
+        super().__init__(app)
+        self.key_set = key_set
 
     async def dispatch(self, request: Request, call_next):
 
-        if request.url.path.endswith(tuple(self.PUBLIC_PATHS)):
+        # Resolve the route once, the proxy reuses it from request.state
+        route = route_table.match(request.url.path)
+        request.state.route = route
+
+        if (request.url.path.endswith(tuple(self.PUBLIC_PATHS)) or request.url.path in self.LOCAL_PUBLIC_PATHS
+                or request.url.path.startswith(self.ADMIN_PREFIXES)
+                or (route and not route.options.auth_required)):
             response = await call_next(request)
             return response
         
         auth_header = request.headers.get("Authorization")
         if not auth_header:
-            raise HTTPException(status_code=401, detail="Authorization header missing")
+            return JSONResponse(status_code=401, content={"detail": "Authorization header missing"})
 
         token = auth_header.split(" ")[1] if " " in auth_header else auth_header
 
-        is_valid = await validate_token(token)
-        if not is_valid:
-            raise HTTPException(status_code=401, detail="Invalid or expired token")
+        try:
+            payload = await validate_token_refetching(token, settings, self.key_set)
+        except (InvalidTokenError, MissingTokenError) as e:
+            return JSONResponse(status_code=401, content={"detail": str(e) or "Invalid or expired token"})
+
+        # Lets the rate limiter bucket by user instead of by IP
+        request.state.subject = payload.get("sub")
 
         response = await call_next(request)
         return response
@@ -0,0 +1,197 @@
+import logging
+import zlib
+from typing import Callable, Iterable, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+logger = logging.getLogger(__name__)
+
+# Responses that never carry a body worth compressing
+BODYLESS_STATUSES = frozenset({204, 304})
+# Streams whose events must reach the client as they are sent, not once min_size bytes piled up
+STREAMING_CONTENT_TYPES = ("text/event-stream",)
+
+
+class GzipEncoder:
+    name = "gzip"
+
+    def __init__(self, level: int):
+        # wbits=31 writes a gzip header and trailer rather than a raw zlib stream
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        # Emits everything compressed so far, the client can decode it before the next chunk
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class BrotliEncoder:
+    name = "br"
+
+    def __init__(self, quality: int):
+        import brotli
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+def parse_accept_encoding(value: str) -> dict[str, float]:
+    """'br;q=1.0, gzip;q=0.8, *;q=0' -> {'br': 1.0, 'gzip': 0.8, '*': 0.0}"""
+    accepted = {}
+    for part in value.split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    return accepted
+
+
+def available_algorithms(names: Iterable[str]) -> tuple[str, ...]:
+    algorithms = []
+    for name in names:
+        name = name.strip().lower()
+        if name == "br":
+            try:
+                import brotli  # noqa: F401
+            except ImportError:
+                logger.warning("Brotli compression needs the 'brotli' package, falling back to gzip")
+                continue
+        elif name != "gzip":
+            raise ValueError(f"Unknown compression algorithm '{name}', expected 'br' or 'gzip'")
+        algorithms.append(name)
+    return tuple(algorithms)
+
+
+class CompressionMiddleware:
+    """
+    Pure ASGI middleware compressing responses with the first algorithm of
+    `algorithms` the client accepts. Bodies are compressed as they stream,
+    once at least `min_size` bytes are known to follow, and every chunk is
+    flushed so the client can decode it without waiting for the next one.
+    Event streams and responses that already have a Content-Encoding,
+    typically relayed from an upstream that compressed them, are passed
+    through untouched.
+    """
+
+    def __init__(
+        self,
+        app,
+        algorithms: Iterable[str] = ("br", "gzip"),
+        min_size: int = 1024,
+        content_types: Iterable[str] = ("application/json", "text/"),
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        route_filter: Optional[Callable[[dict], bool]] = None,
+    ):
+        self.app = app
+        self.algorithms = available_algorithms(algorithms)
+        self.min_size = min_size
+        self.content_types = tuple(content_types)
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.route_filter = route_filter
+
+    def negotiate(self, accept_encoding: str) -> Optional[str]:
+        accepted = parse_accept_encoding(accept_encoding)
+        wildcard = accepted.get("*", 0.0)
+        for name in self.algorithms:
+            if accepted.get(name, wildcard) > 0:
+                return name
+        return None
+
+    def create_encoder(self, name: str):
+        if name == "br":
+            return BrotliEncoder(self.brotli_quality)
+        return GzipEncoder(self.gzip_level)
+
+    def compressible(self, scope, headers: Headers, status: int) -> bool:
+        if status in BODYLESS_STATUSES or "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "")
+        if not content_type.startswith(self.content_types) or content_type.startswith(STREAMING_CONTENT_TYPES):
+            return False
+        content_length = headers.get("content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) < self.min_size:
+            return False
+        return self.route_filter is None or self.route_filter(scope)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD" or not self.algorithms:
+            await self.app(scope, receive, send)
+            return
+
+        encoding = self.negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        # None until decided, then False to pass through or the encoder in use
+        encoder = None
+        pending = []
+        pending_size = 0
+
+        def encode(body: bytes, more_body: bool) -> bytes:
+            return encoder.compress(body) + (encoder.flush() if more_body else encoder.finish())
+
+        async def send_compressed(body: bytes, more_body: bool):
+            nonlocal encoder
+            encoder = self.create_encoder(encoding)
+            headers = MutableHeaders(scope=start_message)
+            del headers["content-length"]
+            headers["content-encoding"] = encoding
+            headers.add_vary_header("Accept-Encoding")
+            await send(start_message)
+            await send({"type": "http.response.body", "body": encode(body, more_body), "more_body": more_body})
+
+        async def send_wrapper(message):
+            nonlocal start_message, encoder, pending_size
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                if not self.compressible(scope, Headers(raw=message.get("headers", [])), message["status"]):
+                    encoder = False
+                    await send(message)
+                return
+
+            if message["type"] != "http.response.body" or encoder is False:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if encoder is not None:
+                await send({"type": "http.response.body", "body": encode(body, more_body), "more_body": more_body})
+                return
+
+            # Hold the first chunks until the body is known to reach min_size
+            pending.append(body)
+            pending_size += len(body)
+            if pending_size >= self.min_size:
+                await send_compressed(b"".join(pending), more_body)
+            elif not more_body:
+                encoder = False
+                await send(start_message)
+                await send({"type": "http.response.body", "body": b"".join(pending), "more_body": False})
+
+        await self.app(scope, receive, send_wrapper)
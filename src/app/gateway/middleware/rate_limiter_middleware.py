@@ -0,0 +1,62 @@
+import math
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from domain.entities.rate_limit import RateLimitDecision
+from ports.rate_limit_port import RateLimitBackend
+from routers.gateway_router import route_table
+
+
+def rate_limit_headers(decision: RateLimitDecision) -> dict[str, str]:
+    return {
+        "RateLimit-Limit": str(decision.limit),
+        "RateLimit-Remaining": str(decision.remaining),
+        "RateLimit-Reset": str(math.ceil(decision.reset_after)),
+    }
+
+
+class RateLimitMiddleware(BaseHTTPMiddleware):
+    """
+    Token bucket admission control per client and per route, applied before the
+    request is proxied. Clients are identified by their JWT subject (set by
+    AuthMiddleware) and fall back to their IP address.
+    """
+
+    def __init__(self, app, backend: RateLimitBackend, trust_forwarded_for: bool = False):
+        super().__init__(app)
+        self.backend = backend
+        self.trust_forwarded_for = trust_forwarded_for
+
+    def _client_key(self, request: Request) -> str:
+        subject = getattr(request.state, "subject", None)
+        if subject:
+            return f"sub:{subject}"
+
+        if self.trust_forwarded_for:
+            forwarded_for = request.headers.get("X-Forwarded-For")
+            if forwarded_for:
+                return f"ip:{forwarded_for.split(',')[0].strip()}"
+        return f"ip:{request.client.host if request.client else 'unknown'}"
+
+    async def dispatch(self, request: Request, call_next):
+        route = getattr(request.state, "route", None)
+        if route is None:
+            route = route_table.match(request.url.path)
+            request.state.route = route
+
+        limit = route.options.rate_limit if route else None
+        if limit is None:
+            return await call_next(request)
+
+        decision = await self.backend.acquire(f"{route.route.prefix}|{self._client_key(request)}", limit)
+        headers = rate_limit_headers(decision)
+
+        if not decision.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(decision.retry_after)))
+            return JSONResponse(status_code=429, content={"detail": "Too many requests"}, headers=headers)
+
+        response = await call_next(request)
+        response.headers.update(headers)
+        return response
@@ -0,0 +1,211 @@
+import bisect
+import logging
+import logging.handlers
+import queue
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Log-linear latency buckets (4 per power of two) from 100µs to ~53s, in seconds
+LATENCY_BUCKETS: Tuple[float, ...] = tuple(0.0001 * 2 ** (i / 4) for i in range(77))
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class LatencyHistogram:
+    """Fixed-bucket histogram, cheap enough to update on every request."""
+
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        """Estimate the q-th quantile, interpolating inside the bucket that holds it"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = LATENCY_BUCKETS[index - 1] if index > 0 else 0.0
+                upper = LATENCY_BUCKETS[index] if index < len(LATENCY_BUCKETS) else self.max
+                estimate = lower + (upper - lower) * (rank - seen) / bucket_count
+                return min(estimate, self.max)
+            seen += bucket_count
+        return self.max
+
+
+class RequestMetrics:
+    """Per-route latency histograms, status counters and the in-flight gauge."""
+
+    def __init__(self, service: str):
+        self.service = service
+        self.in_flight = 0
+        self._histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self._statuses: Dict[Tuple[str, str, int], int] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, method: str, route: str, status: int, seconds: float):
+        key = (method, route)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = LatencyHistogram()
+            histogram.observe(seconds)
+            status_key = (method, route, status)
+            self._statuses[status_key] = self._statuses.get(status_key, 0) + 1
+
+    def summary(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {
+                    "method": method,
+                    "route": route,
+                    "count": histogram.count,
+                    "mean_ms": round(histogram.sum / histogram.count * 1000, 3),
+                    "p50_ms": round(histogram.quantile(0.50) * 1000, 3),
+                    "p90_ms": round(histogram.quantile(0.90) * 1000, 3),
+                    "p99_ms": round(histogram.quantile(0.99) * 1000, 3),
+                    "max_ms": round(histogram.max * 1000, 3),
+                }
+                for (method, route), histogram in sorted(self._histograms.items())
+            ]
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format"""
+        service = self.service
+        lines = [
+            "# HELP http_requests_in_flight Requests currently being served",
+            "# TYPE http_requests_in_flight gauge",
+            f'http_requests_in_flight{{service="{service}"}} {self.in_flight}',
+            "# HELP http_requests_total Requests served, by status code",
+            "# TYPE http_requests_total counter",
+        ]
+        with self._lock:
+            for (method, route, status), count in sorted(self._statuses.items()):
+                lines.append(
+                    f'http_requests_total{{service="{service}",method="{method}",route="{route}",status="{status}"}} {count}'
+                )
+
+            lines.append("# HELP http_request_duration_seconds Request latency")
+            lines.append("# TYPE http_request_duration_seconds histogram")
+            for (method, route), histogram in sorted(self._histograms.items()):
+                labels = f'service="{service}",method="{method}",route="{route}"'
+                cumulative = 0
+                for bound, bucket_count in zip(LATENCY_BUCKETS, histogram.counts):
+                    cumulative += bucket_count
+                    lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound:.6g}"}} {cumulative}')
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f"http_request_duration_seconds_sum{{{labels}}} {histogram.sum:.6f}")
+                lines.append(f"http_request_duration_seconds_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def queued_access_logger(name: str = "access") -> Callable[[Dict[str, Any]], None]:
+    """
+    Access log sink that hands records to a QueueListener thread, so writing
+    the log line never happens on the event loop.
+    """
+    log_queue: "queue.Queue" = queue.Queue(maxsize=10000)
+    handler = logging.handlers.QueueHandler(log_queue)
+    access_logger = logging.getLogger(name)
+    access_logger.addHandler(handler)
+    access_logger.propagate = False
+    access_logger.setLevel(logging.INFO)
+
+    listener = logging.handlers.QueueListener(log_queue, logging.StreamHandler(), respect_handler_level=False)
+    listener.start()
+
+    def sink(entry: Dict[str, Any]):
+        access_logger.info(
+            "%(method)s %(path)s %(status)s %(duration_ms).2fms" % entry,
+            extra={"access": entry},
+        )
+
+    return sink
+
+
+class TimingMiddleware:
+    """
+    Pure ASGI middleware measuring every HTTP request with perf_counter_ns.
+    Latency lands in the per-route histograms of `metrics`; a sample of requests
+    (plus every 5xx and every slow one) is sent to `access_log`.
+    """
+
+    def __init__(
+        self,
+        app,
+        metrics: RequestMetrics,
+        access_log: Optional[Callable[[Dict[str, Any]], None]] = None,
+        sample_rate: float = 0.01,
+        slow_request_threshold: float = 1.0,
+        route_label: Optional[Callable[[dict], Optional[str]]] = None,
+        exclude_paths: Tuple[str, ...] = ("/metrics",),
+    ):
+        self.app = app
+        self.metrics = metrics
+        self.access_log = access_log
+        self.sample_rate = sample_rate
+        self.slow_request_threshold = slow_request_threshold
+        self.route_label = route_label
+        self.exclude_paths = exclude_paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        metrics = self.metrics
+        metrics.in_flight += 1
+        start = time.perf_counter_ns()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = (time.perf_counter_ns() - start) / 1e9
+            metrics.in_flight -= 1
+
+            route = self._route(scope)
+            method = scope["method"]
+            metrics.observe(method, route, status, duration)
+
+            if self.access_log is not None and (
+                status >= 500
+                or duration >= self.slow_request_threshold
+                or random.random() < self.sample_rate
+            ):
+                self.access_log({
+                    "method": method,
+                    "path": scope["path"],
+                    "route": route,
+                    "status": status,
+                    "duration_ms": duration * 1000,
+                })
+
+    def _route(self, scope) -> str:
+        if self.route_label is not None:
+            label = self.route_label(scope)
+            if label:
+                return label
+        # Set by the router once the request matched, a template keeps label cardinality low
+        route = scope.get("route")
+        return getattr(route, "path", None) or UNMATCHED_ROUTE
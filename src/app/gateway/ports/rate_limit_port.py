@@ -0,0 +1,16 @@
+from abc import ABC, abstractmethod
+
+from domain.entities.rate_limit import RateLimitDecision
+from domain.entities.route import RateLimit
+
+
+class RateLimitBackend(ABC):
+
+    @abstractmethod
+    async def acquire(self, key: str, limit: RateLimit, cost: int = 1) -> RateLimitDecision:
+        """Take `cost` tokens from the bucket identified by `key`"""
+        pass
+
+    async def aclose(self):
+        """Release backend resources"""
+        pass
@@ -1,29 +1,158 @@
+from dataclasses import dataclass
+
+import httpx
 from config.settings import BaseSettings
 from fastapi import APIRouter, HTTPException, Request
-from utils.http_client import proxy_request
+from fastapi.responses import Response, StreamingResponse
+from use_cases.exceptions import CircuitOpenError, BulkheadFullError, UpstreamTimeoutError, UpstreamUnavailableError
+from use_cases.route_table import RouteTableHolder, build_route_table
+from utils.resilience import UpstreamRegistry
+from utils.single_flight import SingleFlight
+
+# The upstream body is relayed as raw bytes, so its encoding and length still hold
+PASSTHROUGH_HEADERS = (
+    "content-type", "content-encoding", "content-length",
+    "cache-control", "etag", "last-modified", "location", "vary",
+)
+# Request headers the upstream response can depend on, part of the coalescing key
+COALESCE_KEY_HEADERS = ("accept", "accept-encoding", "accept-language")
+# Only part of the key for routes coalescing in the "token" scope
+CREDENTIAL_HEADERS = ("authorization", "cookie")
 
 router = APIRouter()
 settings = BaseSettings()
+upstreams = UpstreamRegistry(
+    settings.service_mapping,
+    ejection_threshold=settings.ejection_threshold,
+    ejection_duration=settings.ejection_duration,
+)
+route_table = RouteTableHolder(build_route_table(settings))
+coalescer = SingleFlight()
+
+
+@dataclass(frozen=True, slots=True)
+class BufferedResponse:
+    """An upstream response read in full, shared by coalesced requests"""
+    status_code: int
+    headers: dict[str, str]
+    body: bytes
+
+
+def resolve_route(request: Request):
+    """Route matched by the middleware stack, or matched here if none ran."""
+    route = getattr(request.state, "route", None)
+    if route is None:
+        route = route_table.match(request.url.path)
+        request.state.route = route
+    return route
+
+
+async def read_body(request: Request, limit: int | None) -> bytes:
+    """
+    Read the request body as it arrives, answering 413 as soon as it is known to
+    be over `limit`: from Content-Length before reading, else once enough arrived.
+    """
+    if limit is not None:
+        declared = request.headers.get("content-length")
+        if declared is not None and declared.isdigit() and int(declared) > limit:
+            raise HTTPException(status_code=413, detail=f"Request body exceeds {limit} bytes")
+
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if limit is not None and size > limit:
+            raise HTTPException(status_code=413, detail=f"Request body exceeds {limit} bytes")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+async def relay_body(upstream_response: httpx.Response):
+    """Upstream body as received, still compressed if the upstream compressed it"""
+    try:
+        async for chunk in upstream_response.aiter_raw():
+            yield chunk
+    finally:
+        await upstream_response.aclose()
 
-@router.api_route("/api/{service}/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS", "HEAD"])
-async def gateway_proxy(service: str,path: str, request: Request):
 
-    if service not in settings.service_mapping:
+def passthrough_headers(upstream_response: httpx.Response) -> dict[str, str]:
+    return {name: upstream_response.headers[name] for name in PASSTHROUGH_HEADERS if name in upstream_response.headers}
+
+
+def coalesce_key(route, path: str, headers: dict[str, str]) -> tuple:
+    key = (route.service, path) + tuple(headers.get(name) for name in COALESCE_KEY_HEADERS)
+    if route.options.coalesce_scope == "token":
+        key += tuple(headers.get(name) for name in CREDENTIAL_HEADERS)
+    return key
+
+
+async def fetch_buffered(upstream, service: str, path: str, headers: dict[str, str], timeout) -> BufferedResponse:
+    upstream_response = await upstream.request(method="GET", path=path, body=None, headers=headers, timeout=timeout, stream=True)
+    try:
+        body = b"".join([chunk async for chunk in relay_body(upstream_response)])
+    except httpx.HTTPError:
+        raise UpstreamUnavailableError(service, "unavailable (response interrupted)")
+    return BufferedResponse(upstream_response.status_code, passthrough_headers(upstream_response), body)
+
+
+def upstream_http_error(error: UpstreamUnavailableError) -> HTTPException:
+    if isinstance(error, UpstreamTimeoutError):
+        return HTTPException(status_code=504, detail=str(error))
+    if isinstance(error, (CircuitOpenError, BulkheadFullError)):
+        return HTTPException(status_code=503, detail=str(error), headers={"Retry-After": "1"})
+    return HTTPException(status_code=502, detail=str(error))
+
+
+@router.api_route("/api/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS", "HEAD"])
+async def gateway_proxy(request: Request):
+
+    route = resolve_route(request)
+    upstream = upstreams.get(route.service) if route else None
+    if upstream is None:
         raise HTTPException(status_code=404, detail="Service not found")
 
-    service_obj = settings.service_mapping[service]
+    # 4. Forward the raw request body, the upstream validates it
+    body = await read_body(request, route.options.max_body_size) if request.method in ["POST", "PUT", "PATCH"] else None
+
+    # The upstream may only compress in an encoding the client accepts,
+    # httpx would otherwise ask for gzip on the client's behalf
+    headers = dict(request.headers)
+    headers.setdefault("accept-encoding", "identity")
 
-    target_url = f"{service_obj.url}/{path}"
+    path = route.upstream_path(request.url.path)
+    if request.url.query:
+        path = f"{path}?{request.url.query}"
 
-    # 4. Extract request body if needed
-    body = await request.json() if request.method in ["POST", "PUT"] else None
+    # 5. Proxy the request to one of the service's instances. Identical GETs
+    # in flight at the same time share one upstream call and its buffered body.
+    try:
+        if request.method == "GET" and route.options.coalesce:
+            buffered = await coalescer.do(
+                coalesce_key(route, path, headers),
+                lambda: fetch_buffered(upstream, route.service, path, headers, route.timeout),
+                label=route.route.prefix,
+            )
+            response = Response(buffered.body, status_code=buffered.status_code, headers=buffered.headers)
+        else:
+            upstream_response = await upstream.request(
+                method=request.method,
+                path=path,
+                body=body,
+                headers=headers,
+                timeout=route.timeout,
+                stream=True
+            )
+            # 6. Stream the upstream bytes through without decoding and re-encoding them
+            response = StreamingResponse(
+                relay_body(upstream_response),
+                status_code=upstream_response.status_code,
+                headers=passthrough_headers(upstream_response),
+            )
+    except UpstreamUnavailableError as e:
+        raise upstream_http_error(e)
 
-    # 5. Proxy the request
-    response = await proxy_request(
-        method=request.method,
-        url=target_url,
-        body=body,
-        headers=request.headers
-    )
+    for name, value in route.response_headers:
+        response.headers[name] = value
 
-    return response.json()
\ No newline at end of file
+    return response
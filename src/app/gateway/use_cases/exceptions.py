@@ -9,4 +9,31 @@ class NotAuthorizedException(Exception):
 
 class MissingTokenError(Exception):
     def __str__(self):
-        return "Token is missing"
\ No newline at end of file
+        return "Token is missing"
+
+class UpstreamUnavailableError(Exception):
+    def __init__(self, service: str, reason: str = "unavailable"):
+        self.service = service
+        self.reason = reason
+        super().__init__(f"Service {service} is {reason}")
+
+
+class CircuitOpenError(UpstreamUnavailableError):
+    def __init__(self, service: str):
+        super().__init__(service, "unavailable (circuit open)")
+
+
+class BulkheadFullError(UpstreamUnavailableError):
+    def __init__(self, service: str):
+        super().__init__(service, "overloaded (too many concurrent requests)")
+
+
+class UpstreamTimeoutError(UpstreamUnavailableError):
+    def __init__(self, service: str):
+        super().__init__(service, "not responding (timeout)")
+
+
+class UnknownKeyError(InvalidTokenError):
+    def __init__(self, kid: str | None):
+        self.kid = kid
+        super().__init__("Token signed with an unknown key")
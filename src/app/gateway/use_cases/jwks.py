@@ -0,0 +1,213 @@
+import asyncio
+import base64
+import contextlib
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any
+
+import httpx
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import ed448, ed25519, padding, rsa
+
+from .exceptions import InvalidTokenError, UnknownKeyError
+
+logger = logging.getLogger(__name__)
+
+RSA_HASHES = {"RS256": hashes.SHA256, "RS384": hashes.SHA384, "RS512": hashes.SHA512}
+ASYMMETRIC_ALGORITHMS = tuple(RSA_HASHES) + ("EdDSA",)
+OKP_CURVES = {"Ed25519": ed25519.Ed25519PublicKey, "Ed448": ed448.Ed448PublicKey}
+
+
+def b64url_decode(value: str) -> bytes:
+    return base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+
+
+def b64url_int(value: str) -> int:
+    return int.from_bytes(b64url_decode(value), "big")
+
+
+@dataclass(frozen=True)
+class VerificationKey:
+    """A JWK parsed once into a `cryptography` public key, with its padding and hash for RSA"""
+    kid: str
+    algorithm: str
+    public_key: Any
+    verify_args: tuple = ()
+
+    def verify(self, signature: bytes, data: bytes):
+        """Raises InvalidSignature when the signature doesn't match"""
+        self.public_key.verify(signature, data, *self.verify_args)
+
+
+def parse_jwk(jwk: dict) -> VerificationKey | None:
+    """RSA and Ed25519/Ed448 signing keys, None for anything else"""
+    if jwk.get("use", "sig") != "sig":
+        return None
+    kid = jwk.get("kid", "")
+
+    if jwk.get("kty") == "RSA":
+        algorithm = jwk.get("alg", "RS256")
+        if algorithm not in RSA_HASHES:
+            return None
+        public_key = rsa.RSAPublicNumbers(b64url_int(jwk["e"]), b64url_int(jwk["n"])).public_key()
+        return VerificationKey(kid, algorithm, public_key, (padding.PKCS1v15(), RSA_HASHES[algorithm]()))
+
+    if jwk.get("kty") == "OKP":
+        if jwk.get("crv") not in OKP_CURVES or jwk.get("alg", "EdDSA") != "EdDSA":
+            return None
+        return VerificationKey(kid, "EdDSA", OKP_CURVES[jwk["crv"]].from_public_bytes(b64url_decode(jwk["x"])))
+
+    return None
+
+
+def parse_jwks(document: dict) -> dict[str, VerificationKey]:
+    keys = {}
+    for jwk in document.get("keys", []):
+        try:
+            key = parse_jwk(jwk)
+        except (KeyError, ValueError) as e:
+            logger.warning(f"Skipping invalid JWK {jwk.get('kid')}: {e}")
+            continue
+        if key is not None:
+            keys[key.kid] = key
+    return keys
+
+
+def validate_claims(claims: dict, issuer: str = "", audience: str = "", leeway: float = 0.0):
+    now = time.time()
+    if "exp" in claims and now > float(claims["exp"]) + leeway:
+        raise InvalidTokenError("Token has expired")
+    if "nbf" in claims and now < float(claims["nbf"]) - leeway:
+        raise InvalidTokenError("Token is not valid yet")
+    if issuer and claims.get("iss") != issuer:
+        raise InvalidTokenError("Invalid token issuer")
+    if audience:
+        token_audience = claims.get("aud")
+        audiences = token_audience if isinstance(token_audience, list) else [token_audience]
+        if audience not in audiences:
+            raise InvalidTokenError("Invalid token audience")
+
+
+class JWKSKeySet:
+    """
+    Public keys for RS256/EdDSA tokens by `kid`, from a JWKS file or URL.
+    Keys are parsed once when the set is loaded, so verifying a token is a
+    dict lookup and a signature check. The set is reloaded every
+    `refresh_interval` in the background, keeping the previous keys if that
+    fails. A token signed with an unknown kid (a key rotated in since the
+    last load) triggers a reload, at most one per `min_refetch_interval`
+    and shared by the requests waiting on it.
+    """
+
+    def __init__(self, source: str, refresh_interval: float = 300.0, min_refetch_interval: float = 30.0,
+                 issuer: str = "", audience: str = "", leeway: float = 30.0, timeout: float = 2.0):
+        self.source = source
+        self.refresh_interval = refresh_interval
+        self.min_refetch_interval = min_refetch_interval
+        self.issuer = issuer
+        self.audience = audience
+        self.leeway = leeway
+        self.timeout = timeout
+
+        self.keys: dict[str, VerificationKey] = {}
+        self.task: asyncio.Task | None = None
+        self._refetch: asyncio.Future | None = None
+        self._last_fetch = float("-inf")
+
+        self.loaded_at: float | None = None
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.unknown_kid_refetches = 0
+        self.throttled_refetches = 0
+
+    async def _fetch(self) -> dict:
+        if self.source.startswith(("http://", "https://")):
+            async with httpx.AsyncClient(timeout=self.timeout) as client:
+                response = await client.get(self.source)
+                response.raise_for_status()
+                return response.json()
+
+        def read_file():
+            with open(self.source) as f:
+                return json.load(f)
+        return await asyncio.to_thread(read_file)
+
+    async def refresh(self) -> bool:
+        self._last_fetch = time.monotonic()
+        try:
+            keys = parse_jwks(await self._fetch())
+        except Exception as e:
+            self.refresh_failures += 1
+            logger.warning(f"Failed to load JWKS from {self.source}, keeping {len(self.keys)} keys: {e}")
+            return False
+
+        if set(keys) != set(self.keys):
+            logger.info(f"Loaded JWKS from {self.source}: kids {sorted(keys)}")
+        # Replaced in one assignment, verification never sees a half built set
+        self.keys = keys
+        self.loaded_at = time.time()
+        self.refreshes += 1
+        return True
+
+    async def refetch(self) -> bool:
+        """Reload after an unknown kid, False when throttled or the reload failed"""
+        if self._refetch is None:
+            if time.monotonic() - self._last_fetch < self.min_refetch_interval:
+                self.throttled_refetches += 1
+                return False
+            self.unknown_kid_refetches += 1
+            self._refetch = asyncio.ensure_future(self.refresh())
+            self._refetch.add_done_callback(lambda _: setattr(self, "_refetch", None))
+        return await asyncio.shield(self._refetch)
+
+    async def start(self):
+        await self.refresh()
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.task
+            self.task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            await self.refresh()
+
+    def verify(self, token: str, header: dict) -> dict:
+        """Claims of a token whose header was already decoded, raises InvalidTokenError"""
+        kid = header.get("kid")
+        key = self.keys.get(kid) if kid is not None else (next(iter(self.keys.values())) if len(self.keys) == 1 else None)
+        if key is None:
+            raise UnknownKeyError(kid)
+        if header.get("alg") != key.algorithm:
+            raise InvalidTokenError("Invalid token")
+
+        signing_input, _, signature = token.rpartition(".")
+        try:
+            key.verify(b64url_decode(signature), signing_input.encode())
+            claims = json.loads(b64url_decode(signing_input.partition(".")[2]))
+        except (InvalidSignature, ValueError):
+            raise InvalidTokenError("Invalid token")
+        if not isinstance(claims, dict):
+            raise InvalidTokenError("Invalid token")
+
+        validate_claims(claims, self.issuer, self.audience, self.leeway)
+        return claims
+
+    def stats(self) -> dict:
+        return {
+            "source": self.source,
+            "kids": sorted(self.keys),
+            "loaded_at": self.loaded_at,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "unknown_kid_refetches": self.unknown_kid_refetches,
+            "throttled_refetches": self.throttled_refetches,
+        }
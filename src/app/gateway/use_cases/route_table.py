@@ -0,0 +1,175 @@
+import json
+from dataclasses import dataclass
+
+import httpx
+
+from config.settings import BaseSettings
+from domain.entities.route import RateLimit, Route, RouteOptions
+from domain.entities.service import ResiliencePolicy
+
+RATE_LIMIT_PERIODS = {"second": 1.0, "minute": 60.0, "hour": 3600.0, "day": 86400.0}
+COALESCE_SCOPES = ("token", "shared")
+
+# Login and signup must be reachable without a token
+DEFAULT_PUBLIC_ROUTES = {
+    "/api/user/users/login": "user",
+}
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledRoute:
+    """A Route with everything the proxy needs precomputed."""
+    route: Route
+    service: str
+    options: RouteOptions
+    strip_length: int
+    timeout: httpx.Timeout | None
+    response_headers: tuple[tuple[str, str], ...]
+
+    def upstream_path(self, path: str) -> str:
+        return path[self.strip_length:].lstrip("/")
+
+
+def parse_rate_limit(value: str | None) -> RateLimit | None:
+    """Parse '100/minute' style limits."""
+    if not value:
+        return None
+    try:
+        requests, period = value.split("/")
+        return RateLimit(requests=int(requests), period=RATE_LIMIT_PERIODS[period.strip().rstrip("s")])
+    except (ValueError, KeyError):
+        raise ValueError(f"Invalid rate limit '{value}', expected '<n>/<second|minute|hour|day>'")
+
+
+def parse_coalesce_scope(value: str) -> str:
+    if value not in COALESCE_SCOPES:
+        raise ValueError(f"Invalid coalesce_scope '{value}', expected one of {', '.join(COALESCE_SCOPES)}")
+    return value
+
+
+def normalize_prefix(prefix: str) -> str:
+    return "/" + prefix.strip("/")
+
+
+class RouteTable:
+    """
+    Immutable routing table with segment-wise longest prefix matching:
+    '/api/user/users/login' prefers '/api/user/users/login' over '/api/user'.
+    """
+
+    def __init__(self, routes: list[CompiledRoute]):
+        self._routes: dict[str, CompiledRoute] = {route.route.prefix: route for route in routes}
+        # Only try the prefix depths that exist, deepest first
+        self._depths: tuple[int, ...] = tuple(sorted(
+            {route.route.prefix.count("/") for route in routes}, reverse=True
+        ))
+
+    def __len__(self) -> int:
+        return len(self._routes)
+
+    def match(self, path: str) -> CompiledRoute | None:
+        segments = path.rstrip("/").split("/")
+        for depth in self._depths:
+            if depth >= len(segments):
+                continue
+            route = self._routes.get("/".join(segments[:depth + 1]))
+            if route is not None:
+                return route
+        return None
+
+    def routes(self) -> list[Route]:
+        return [route.route for route in self._routes.values()]
+
+
+class RouteTableHolder:
+    """Points at the current RouteTable, swapped atomically on reload."""
+
+    def __init__(self, table: RouteTable):
+        self.table = table
+
+    def match(self, path: str) -> CompiledRoute | None:
+        return self.table.match(path)
+
+    def swap(self, table: RouteTable):
+        self.table = table
+
+
+def compile_route(route: Route, policy: ResiliencePolicy) -> CompiledRoute:
+    options = route.options
+    timeout = None
+    if options.connect_timeout is not None or options.read_timeout is not None:
+        # Only build a per-route timeout when the route overrides the service policy
+        connect_timeout = options.connect_timeout if options.connect_timeout is not None else policy.connect_timeout
+        read_timeout = options.read_timeout if options.read_timeout is not None else policy.read_timeout
+        timeout = httpx.Timeout(
+            connect=connect_timeout,
+            read=read_timeout,
+            write=read_timeout,
+            pool=connect_timeout,
+        )
+
+    response_headers = (("cache-control", options.cache_policy),) if options.cache_policy else ()
+
+    return CompiledRoute(
+        route=route,
+        service=route.service,
+        options=options,
+        strip_length=len(route.strip_prefix),
+        timeout=timeout,
+        response_headers=response_headers,
+    )
+
+
+def load_routes_file(path: str) -> list[dict]:
+    """
+    Routes file is a JSON list, e.g.
+    [{"prefix": "/api/user/users", "service": "user", "read_timeout": 2, "rate_limit": "100/minute",
+      "cache_policy": "private, max-age=5", "auth_required": true, "max_body_size": 65536, "compress": true,
+      "coalesce": true, "coalesce_scope": "token"}]
+    """
+    with open(path) as f:
+        return json.load(f)
+
+
+def build_route_table(settings: BaseSettings) -> RouteTable:
+    services = settings.service_mapping
+
+    entries: dict[str, dict] = {}
+    for key in services:
+        entries[f"/api/{key}"] = {"service": key}
+    for prefix, key in DEFAULT_PUBLIC_ROUTES.items():
+        if key in services:
+            entries[prefix] = {"service": key, "auth_required": False}
+    if settings.routes_file:
+        for entry in load_routes_file(settings.routes_file):
+            entries[normalize_prefix(entry["prefix"])] = entry
+
+    # An explicit `"rate_limit": null` in the routes file disables limiting for that route
+    default_rate_limit = settings.rate_limit_default if settings.rate_limit_enabled else None
+    default_max_body_size = settings.max_body_size or None
+
+    routes = []
+    for prefix, entry in entries.items():
+        service = entry["service"]
+        if service not in services:
+            raise ValueError(f"Route {prefix} points to unknown service '{service}'")
+
+        route = Route(
+            prefix=normalize_prefix(prefix),
+            service=service,
+            strip_prefix=normalize_prefix(entry.get("strip_prefix", f"/api/{service}")),
+            options=RouteOptions(
+                auth_required=entry.get("auth_required", True),
+                connect_timeout=entry.get("connect_timeout"),
+                read_timeout=entry.get("read_timeout"),
+                cache_policy=entry.get("cache_policy"),
+                rate_limit=parse_rate_limit(entry.get("rate_limit", default_rate_limit)),
+                max_body_size=entry.get("max_body_size", default_max_body_size) or None,
+                compress=entry.get("compress", True),
+                coalesce=entry.get("coalesce", settings.coalesce_enabled),
+                coalesce_scope=parse_coalesce_scope(entry.get("coalesce_scope", "token")),
+            ),
+        )
+        routes.append(compile_route(route, services[service].policy))
+
+    return RouteTable(routes)
@@ -1,26 +1,48 @@
-from .exceptions import MissingTokenError, InvalidTokenError
+from .exceptions import MissingTokenError, InvalidTokenError, UnknownKeyError
+from .jwks import ASYMMETRIC_ALGORITHMS, JWKSKeySet
 from jose import jwt, JWTError, ExpiredSignatureError
 from config.settings import BaseSettings
 
 
-def validate_token(token: str, settings: BaseSettings) -> bool:
-    
+def validate_token(token: str, settings: BaseSettings, key_set: JWKSKeySet | None = None) -> dict:
+    """
+    RS256/EdDSA tokens are checked against `key_set` when one is configured,
+    other tokens against the shared jwt_secret_key
+    """
     if token is None or token == "":
         raise MissingTokenError
-    
+
+    if key_set is not None:
+        try:
+            header = jwt.get_unverified_header(token)
+        except JWTError:
+            raise InvalidTokenError("Invalid token")
+        if header.get("alg") in ASYMMETRIC_ALGORITHMS:
+            return key_set.verify(token, header)
+
     try:
         payload = jwt.decode(
             token,
             settings.jwt_secret_key,
             algorithms=[settings.jwt_algorithm]
         )
-        return True
-        
+        return payload
+
     except ExpiredSignatureError:
         raise InvalidTokenError("Token has expired")
-    
+
     except JWTError:
         raise InvalidTokenError("Invalid token")
-    
+
     except Exception as e:
-        raise InvalidTokenError(f"Token validation failed: {str(e)}")
\ No newline at end of file
+        raise InvalidTokenError(f"Token validation failed: {str(e)}")
+
+
+async def validate_token_refetching(token: str, settings: BaseSettings, key_set: JWKSKeySet | None = None) -> dict:
+    """validate_token, reloading the key set once when the token names a kid it doesn't have yet"""
+    try:
+        return validate_token(token, settings, key_set)
+    except UnknownKeyError:
+        if key_set is None or not await key_set.refetch():
+            raise
+    return validate_token(token, settings, key_set)
@@ -0,0 +1,82 @@
+import asyncio
+import contextlib
+import logging
+import os
+import signal
+
+from dotenv import load_dotenv
+
+from config.settings import BaseSettings
+from use_cases.route_table import RouteTableHolder, build_route_table
+
+logger = logging.getLogger(__name__)
+
+
+class ConfigWatcher:
+    """
+    Reloads the upstream instances and the route table without a restart, when
+    UPSTREAMS_FILE or ROUTES_FILE changes on disk or when the process receives
+    SIGHUP (re-reads the .env file as well).
+    """
+
+    def __init__(self, registry, route_table: RouteTableHolder, settings: BaseSettings):
+        self.registry = registry
+        self.route_table = route_table
+        self.settings = settings
+
+        self.task: asyncio.Task | None = None
+        self._mtime = self._file_mtimes()
+
+    def _file_mtimes(self) -> tuple:
+        mtimes = []
+        for path in (self.settings.upstreams_file, self.settings.routes_file):
+            mtime = None
+            if path:
+                with contextlib.suppress(OSError):
+                    mtime = os.stat(path).st_mtime
+            mtimes.append(mtime)
+        return tuple(mtimes)
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        if hasattr(signal, "SIGHUP"):
+            try:
+                loop.add_signal_handler(signal.SIGHUP, lambda: asyncio.ensure_future(self.reload(reload_env=True)))
+            except (RuntimeError, NotImplementedError, ValueError) as e:
+                # Only the main thread's loop can take signals (not under TestClient or an embedded server)
+                logger.warning(f"SIGHUP reload disabled, the config files are still watched: {e}")
+        if self.task is None:
+            self.task = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.task
+            self.task = None
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.settings.config_reload_interval)
+            mtime = self._file_mtimes()
+            if mtime != self._mtime:
+                self._mtime = mtime
+                await self.reload()
+
+    async def reload(self, reload_env: bool = False):
+        try:
+            if reload_env:
+                load_dotenv('../.env', override=True)
+                self.settings = BaseSettings()
+            # Build the new table first so a bad routes file leaves everything untouched
+            table = build_route_table(self.settings)
+            removed = self.registry.update(self.settings.service_mapping)
+            # Swapped before the removed guards are closed, no new request routes to them
+            self.route_table.swap(table)
+            for guard in removed:
+                await guard.aclose()
+            self._mtime = self._file_mtimes()
+            logger.info(f"Gateway configuration reloaded ({len(table)} routes)")
+        except Exception as e:
+            # Keep serving with the previous configuration
+            logger.error(f"Failed to reload upstream configuration: {e}", exc_info=True)
@@ -0,0 +1,68 @@
+import asyncio
+import contextlib
+import logging
+
+import httpx
+
+from .load_balancer import UpstreamInstance
+
+logger = logging.getLogger(__name__)
+
+
+class HealthChecker:
+    """Periodically probes the health route of every upstream instance."""
+
+    def __init__(self, registry, interval: float = 5.0, timeout: float = 1.0, unhealthy_threshold: int = 2):
+        self.registry = registry
+        self.interval = interval
+        self.timeout = timeout
+        self.unhealthy_threshold = unhealthy_threshold
+
+        self.task: asyncio.Task | None = None
+        self._failures: dict[str, int] = {}
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.task
+            self.task = None
+
+    async def _run(self):
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            while True:
+                probes = [
+                    self._probe(client, instance, guard.pool.service.health_path)
+                    for guard in self.registry.guards.values()
+                    for instance in guard.pool.instances
+                ]
+                await asyncio.gather(*probes)
+                await asyncio.sleep(self.interval)
+
+    async def _probe(self, client: httpx.AsyncClient, instance: UpstreamInstance, health_path: str):
+        try:
+            response = await client.get(f"{instance.url}{health_path}")
+            ok = response.status_code < 500
+        except httpx.HTTPError:
+            ok = False
+        except Exception as e:
+            # A bad reloaded url must not end the checker task for every upstream
+            logger.warning(f"Health check of {instance.url} failed: {e!r}")
+            ok = False
+
+        if ok:
+            if not instance.healthy:
+                logger.info(f"Upstream {instance.url} is healthy again")
+            self._failures[instance.url] = 0
+            instance.healthy = True
+            return
+
+        failures = self._failures.get(instance.url, 0) + 1
+        self._failures[instance.url] = failures
+        if failures >= self.unhealthy_threshold and instance.healthy:
+            logger.warning(f"Upstream {instance.url} failed {failures} health checks, marking unhealthy")
+            instance.healthy = False
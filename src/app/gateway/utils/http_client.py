@@ -1,12 +1,30 @@
 import httpx
 from .http_methods import HttpMethod
+from .tracing import tracer
 
 async def proxy_request(
         method: HttpMethod,
         url: str,
         headers: dict[str, str] | None = None,
         body: bytes | None = None,
+        client: httpx.AsyncClient | None = None,
+        timeout: httpx.Timeout | None = None,
+        stream: bool = False,
     ) -> httpx.Response:
+    # Forward the current span as the upstream's parent
+    headers = tracer.inject(dict(headers or {}))
+
+    if client is not None:
+        request = client.build_request(
+            method=method,
+            url=url,
+            headers=headers,
+            content=body,
+            timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT
+        )
+        # With stream=True only the headers are read, the caller reads and closes the body
+        return await client.send(request, stream=stream)
+
     async with httpx.AsyncClient() as client:
         response = await client.request(
             method=method,
@@ -14,4 +32,4 @@ async def proxy_request(
             headers=headers,
             content=body
         )
-    return response
\ No newline at end of file
+    return response
@@ -0,0 +1,138 @@
+import itertools
+import random
+import time
+from abc import ABC, abstractmethod
+
+from domain.entities.service import Service
+
+
+class UpstreamInstance:
+    """Runtime state of one instance of an upstream service."""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.outstanding = 0
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.total_requests = 0
+        self.total_failures = 0
+
+    @property
+    def ejected(self) -> bool:
+        return self.ejected_until > time.monotonic()
+
+    @property
+    def available(self) -> bool:
+        return self.healthy and not self.ejected
+
+    def snapshot(self) -> dict:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "ejected": self.ejected,
+            "outstanding": self.outstanding,
+            "total_requests": self.total_requests,
+            "total_failures": self.total_failures,
+        }
+
+
+class Balancer(ABC):
+
+    @abstractmethod
+    def pick(self, instances: list[UpstreamInstance]) -> UpstreamInstance:
+        """Choose an instance from a non-empty list"""
+        pass
+
+
+class RoundRobinBalancer(Balancer):
+
+    def __init__(self):
+        self._counter = itertools.count()
+
+    def pick(self, instances: list[UpstreamInstance]) -> UpstreamInstance:
+        return instances[next(self._counter) % len(instances)]
+
+
+class LeastOutstandingBalancer(Balancer):
+
+    def pick(self, instances: list[UpstreamInstance]) -> UpstreamInstance:
+        return min(instances, key=lambda instance: instance.outstanding)
+
+
+class PowerOfTwoChoicesBalancer(Balancer):
+    """Least outstanding of two random instances, avoids herding on a single 'best' one."""
+
+    def pick(self, instances: list[UpstreamInstance]) -> UpstreamInstance:
+        if len(instances) == 1:
+            return instances[0]
+        first, second = random.sample(instances, 2)
+        return first if first.outstanding <= second.outstanding else second
+
+
+BALANCERS: dict[str, type[Balancer]] = {
+    "round_robin": RoundRobinBalancer,
+    "least_outstanding": LeastOutstandingBalancer,
+    "p2c": PowerOfTwoChoicesBalancer,
+}
+
+
+def create_balancer(name: str) -> Balancer:
+    if name not in BALANCERS:
+        raise ValueError(f"Unknown load balancer '{name}', expected one of {list(BALANCERS)}")
+    return BALANCERS[name]()
+
+
+class UpstreamPool:
+    """
+    Instances of one service. Instances failing `ejection_threshold` requests in a
+    row are ejected for `ejection_duration` seconds (passive health checking), the
+    HealthChecker flips `healthy` from active probes.
+    """
+
+    def __init__(self, service: Service, ejection_threshold: int = 3, ejection_duration: float = 30.0):
+        self.service = service
+        self.ejection_threshold = ejection_threshold
+        self.ejection_duration = ejection_duration
+        self.balancer = create_balancer(service.balancer)
+        self.instances: list[UpstreamInstance] = [UpstreamInstance(url) for url in service.instances]
+
+    def update(self, service: Service):
+        """Swap in a new instance list, keeping the state of instances that are still present"""
+        current = {instance.url: instance for instance in self.instances}
+        instances = []
+        for url in service.instances:
+            url = url.rstrip("/")
+            instances.append(current.get(url) or UpstreamInstance(url))
+
+        if service.balancer != self.service.balancer:
+            self.balancer = create_balancer(service.balancer)
+        self.service = service
+        self.instances = instances
+
+    def pick(self) -> UpstreamInstance | None:
+        available = [instance for instance in self.instances if instance.available]
+        if not available:
+            # Every instance looks down: try them anyway rather than failing every request
+            available = self.instances
+        if not available:
+            return None
+        return self.balancer.pick(available)
+
+    def record_success(self, instance: UpstreamInstance):
+        instance.total_requests += 1
+        instance.consecutive_failures = 0
+
+    def record_failure(self, instance: UpstreamInstance):
+        instance.total_requests += 1
+        instance.total_failures += 1
+        instance.consecutive_failures += 1
+        if instance.consecutive_failures >= self.ejection_threshold:
+            instance.ejected_until = time.monotonic() + self.ejection_duration
+            instance.consecutive_failures = 0
+
+    def snapshot(self) -> dict:
+        return {
+            "balancer": self.service.balancer,
+            "instances": [instance.snapshot() for instance in self.instances],
+        }
@@ -0,0 +1,119 @@
+import logging
+import math
+import time
+from collections import OrderedDict
+
+from domain.entities.rate_limit import RateLimitDecision
+from domain.entities.route import RateLimit
+from ports.rate_limit_port import RateLimitBackend
+
+logger = logging.getLogger(__name__)
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """
+    Token buckets held in this process. Used for single replica setups and as the
+    local stand-in for the shared backend. The number of tracked keys is bounded,
+    least recently seen clients are dropped first (a dropped client starts full).
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        # key -> [tokens, last refill timestamp]
+        self._buckets: "OrderedDict[str, list[float]]" = OrderedDict()
+
+    async def acquire(self, key: str, limit: RateLimit, cost: int = 1) -> RateLimitDecision:
+        now = time.monotonic()
+        capacity = limit.requests
+        rate = limit.refill_per_second
+
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [float(capacity), now]
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+
+        allowed = bucket[0] >= cost
+        if allowed:
+            bucket[0] -= cost
+        return make_decision(allowed, capacity, bucket[0], rate, cost)
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """
+    Token buckets shared by every gateway replica, updated atomically by a Lua script.
+    Requires the optional `redis` package. Fails open if Redis is unreachable.
+    """
+
+    SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local cost = tonumber(ARGV[3])
+    local t = redis.call('TIME')
+    local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(bucket[1])
+    local ts = tonumber(bucket[2])
+    if tokens == nil then
+        tokens = capacity
+        ts = now
+    end
+
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    local allowed = 0
+    if tokens >= cost then
+        tokens = tokens - cost
+        allowed = 1
+    end
+
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, url: str, key_prefix: str = "gateway:ratelimit:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package") from e
+
+        self.key_prefix = key_prefix
+        self.client = redis.from_url(url)
+        self.script = self.client.register_script(self.SCRIPT)
+
+    async def acquire(self, key: str, limit: RateLimit, cost: int = 1) -> RateLimitDecision:
+        capacity = limit.requests
+        rate = limit.refill_per_second
+        try:
+            allowed, tokens = await self.script(keys=[self.key_prefix + key], args=[capacity, rate, cost])
+        except Exception as e:
+            logger.warning(f"Rate limit backend unavailable, letting request through: {e}")
+            return make_decision(True, capacity, capacity, rate, cost)
+        return make_decision(bool(allowed), capacity, float(tokens), rate, cost)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+def make_decision(allowed: bool, capacity: int, tokens: float, rate: float, cost: int) -> RateLimitDecision:
+    return RateLimitDecision(
+        allowed=allowed,
+        limit=capacity,
+        remaining=max(0, math.floor(tokens)),
+        reset_after=(capacity - tokens) / rate,
+        retry_after=0.0 if allowed else (cost - tokens) / rate,
+    )
+
+
+def create_rate_limit_backend(name: str, redis_url: str = "", max_keys: int = 100_000) -> RateLimitBackend:
+    if name == "memory":
+        return InMemoryRateLimitBackend(max_keys=max_keys)
+    if name == "redis":
+        return RedisRateLimitBackend(redis_url)
+    raise ValueError(f"Unknown rate limit backend '{name}', expected 'memory' or 'redis'")
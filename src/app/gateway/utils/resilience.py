@@ -0,0 +1,410 @@
+import asyncio
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from enum import Enum
+
+import httpx
+
+from domain.entities.service import Service, ResiliencePolicy
+from use_cases.exceptions import BulkheadFullError, CircuitOpenError, UpstreamTimeoutError, UpstreamUnavailableError
+from .http_client import proxy_request
+from .http_methods import HttpMethod
+from .load_balancer import UpstreamInstance, UpstreamPool
+from .tracing import tracer
+
+# Methods that are safe to send twice (RFC 9110, section 9.2.2)
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+# Upstream statuses that count as a failure and may be retried
+RETRYABLE_STATUSES = frozenset({502, 503, 504})
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures, rejects calls for
+    `reset_timeout` seconds, then lets `half_open_max_calls` probes through.
+    A successful probe closes the circuit, a failed one opens it again.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, half_open_max_calls: int = 1):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._half_open_since = 0.0
+        self._half_open_calls = 0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> CircuitState:
+        if self._state == CircuitState.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._enter_half_open()
+        return self._state
+
+    def _enter_half_open(self):
+        self._state = CircuitState.HALF_OPEN
+        self._half_open_since = time.monotonic()
+        self._half_open_calls = 0
+
+    def allow_request(self) -> bool:
+        state = self.state
+        if state == CircuitState.CLOSED:
+            return True
+        if state == CircuitState.HALF_OPEN:
+            # A probe that never reported back (e.g. a cancelled request) must not wedge the circuit
+            if self._half_open_calls >= self.half_open_max_calls \
+                    and time.monotonic() - self._half_open_since >= self.reset_timeout:
+                self._enter_half_open()
+            if self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                return True
+        return False
+
+    def record_success(self):
+        self._failures = 0
+        self._state = CircuitState.CLOSED
+
+    def record_failure(self):
+        self._failures += 1
+        if self._state == CircuitState.HALF_OPEN or self._failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self):
+        self._state = CircuitState.OPEN
+        self._opened_at = time.monotonic()
+        self.times_opened += 1
+
+    def snapshot(self) -> dict:
+        state = self.state
+        return {
+            "state": state.value,
+            "consecutive_failures": self._failures,
+            "times_opened": self.times_opened,
+            "retry_in": round(max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at)), 2)
+                if state == CircuitState.OPEN else 0.0,
+        }
+
+
+class RetryBudget:
+    """
+    Caps retries to a ratio of recent requests, plus a small floor per second,
+    so retries can't multiply load on an upstream that is already struggling.
+    """
+
+    def __init__(self, ratio: float, min_per_second: float, window: float = 10.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.window = window
+
+        self._requests: deque[float] = deque()
+        self._retries: deque[float] = deque()
+        self.exhausted = 0
+
+    def _prune(self, now: float):
+        cutoff = now - self.window
+        while self._requests and self._requests[0] < cutoff:
+            self._requests.popleft()
+        while self._retries and self._retries[0] < cutoff:
+            self._retries.popleft()
+
+    def record_request(self):
+        self._requests.append(time.monotonic())
+
+    def try_acquire(self) -> bool:
+        now = time.monotonic()
+        self._prune(now)
+        allowed = self.min_per_second * self.window + self.ratio * len(self._requests)
+        if len(self._retries) >= allowed:
+            self.exhausted += 1
+            return False
+        self._retries.append(now)
+        return True
+
+    def snapshot(self) -> dict:
+        self._prune(time.monotonic())
+        return {
+            "requests": len(self._requests),
+            "retries": len(self._retries),
+            "exhausted": self.exhausted,
+        }
+
+
+class Bulkhead:
+    """Limits concurrent calls to one upstream, rejecting when no slot frees up in time."""
+
+    def __init__(self, max_concurrency: int, max_queue_wait: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue_wait = max_queue_wait
+
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.rejected = 0
+
+    async def enter(self, service: str):
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.max_queue_wait)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise BulkheadFullError(service)
+        self.in_flight += 1
+
+    def release(self):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def acquire(self, service: str):
+        await self.enter(service)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def snapshot(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "rejected": self.rejected,
+        }
+
+
+class ReleasingStream(httpx.AsyncByteStream):
+    """A response body stream that calls `release` once, when the response is closed"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, release):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            release, self._release = self._release, None
+            if release is not None:
+                release()
+
+
+def release_on_close(response: httpx.Response, release):
+    response.stream = ReleasingStream(response.stream, release)
+
+
+class UpstreamGuard:
+    """Load balancing, timeouts, retries, circuit breaker and bulkhead for a single upstream service."""
+
+    def __init__(self, service: Service, ejection_threshold: int = 3, ejection_duration: float = 30.0):
+        self.service = service
+        policy: ResiliencePolicy = service.policy
+        self.policy = policy
+
+        self.pool = UpstreamPool(service, ejection_threshold=ejection_threshold, ejection_duration=ejection_duration)
+        self.breaker = CircuitBreaker(
+            failure_threshold=policy.breaker_failure_threshold,
+            reset_timeout=policy.breaker_reset_timeout,
+            half_open_max_calls=policy.breaker_half_open_max_calls,
+        )
+        self.retry_budget = RetryBudget(
+            ratio=policy.retry_budget_ratio,
+            min_per_second=policy.retry_min_per_second,
+        )
+        self.bulkhead = Bulkhead(
+            max_concurrency=policy.max_concurrency,
+            max_queue_wait=policy.max_queue_wait,
+        )
+        # Created on first request, building the SSL context is a noticeable part of startup
+        self._client: httpx.AsyncClient | None = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            policy = self.policy
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(
+                    connect=policy.connect_timeout,
+                    read=policy.read_timeout,
+                    write=policy.read_timeout,
+                    pool=policy.connect_timeout,
+                ),
+                limits=httpx.Limits(max_connections=policy.max_concurrency),
+            )
+        return self._client
+
+    async def request(
+            self,
+            method: HttpMethod,
+            path: str,
+            headers: dict[str, str] | None = None,
+            body: bytes | None = None,
+            timeout: httpx.Timeout | None = None,
+            stream: bool = False,
+        ) -> httpx.Response:
+        name = self.service.name
+        retryable = method in IDEMPOTENT_METHODS
+        self.retry_budget.record_request()
+
+        # A streamed response keeps its bulkhead slot until its body is closed
+        await self.bulkhead.enter(name)
+        slot_held = True
+        try:
+            attempt = 0
+            while True:
+                if not self.breaker.allow_request():
+                    raise CircuitOpenError(name)
+
+                # Pick again on every attempt so a retry lands on another instance
+                instance = self.pool.pick()
+                if instance is None:
+                    raise UpstreamUnavailableError(name, "without any configured instance")
+
+                try:
+                    response = await self._send(instance, method, path, headers, body, timeout, stream)
+                except httpx.PoolTimeout as e:
+                    # No free connection in the gateway's own pool, the upstream did nothing wrong
+                    raise BulkheadFullError(name) from e
+                except httpx.TimeoutException as e:
+                    self._record_failure(instance)
+                    if not self._should_retry(retryable, attempt):
+                        raise UpstreamTimeoutError(name) from e
+                except httpx.TransportError as e:
+                    self._record_failure(instance)
+                    if not self._should_retry(retryable, attempt):
+                        raise UpstreamUnavailableError(name) from e
+                else:
+                    if response.status_code in RETRYABLE_STATUSES:
+                        self._record_failure(instance)
+                    else:
+                        self.breaker.record_success()
+                        self.pool.record_success(instance)
+                    if response.status_code not in RETRYABLE_STATUSES or not self._should_retry(retryable, attempt):
+                        if stream:
+                            release_on_close(response, self.bulkhead.release)
+                            slot_held = False
+                        return response
+                    await response.aclose()
+
+                attempt += 1
+                await asyncio.sleep(self.policy.retry_backoff * (2 ** attempt) * random.random())
+        finally:
+            if slot_held:
+                self.bulkhead.release()
+
+    async def _send(
+            self,
+            instance: UpstreamInstance,
+            method: HttpMethod,
+            path: str,
+            headers: dict[str, str] | None,
+            body: bytes | None,
+            timeout: httpx.Timeout | None = None,
+            stream: bool = False,
+        ) -> httpx.Response:
+        instance.outstanding += 1
+        attributes = {"http.method": method, "upstream.service": self.service.name, "upstream.instance": instance.url}
+        try:
+            with tracer.start_span(f"proxy {self.service.name}", kind="client", attributes=attributes) as span:
+                response = await proxy_request(
+                    method,
+                    f"{instance.url}/{path}",
+                    headers=headers,
+                    body=body,
+                    client=self.client,
+                    timeout=timeout,
+                    stream=stream,
+                )
+                span.set_attribute("http.status_code", response.status_code)
+        except BaseException:
+            instance.outstanding -= 1
+            raise
+
+        # A streamed body is still being read from the instance until the response is closed
+        def release():
+            instance.outstanding -= 1
+
+        if stream:
+            release_on_close(response, release)
+        else:
+            release()
+        return response
+
+    def _record_failure(self, instance: UpstreamInstance):
+        self.breaker.record_failure()
+        self.pool.record_failure(instance)
+
+    def _should_retry(self, retryable: bool, attempt: int) -> bool:
+        return retryable and attempt < self.policy.max_retries and self.retry_budget.try_acquire()
+
+    def snapshot(self) -> dict:
+        return {
+            "circuit": self.breaker.snapshot(),
+            "bulkhead": self.bulkhead.snapshot(),
+            "retry_budget": self.retry_budget.snapshot(),
+            "pool": self.pool.snapshot(),
+        }
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class UpstreamRegistry:
+    """One UpstreamGuard per entry of `service_mapping`."""
+
+    def __init__(self, services: dict[str, Service], ejection_threshold: int = 3, ejection_duration: float = 30.0):
+        self.ejection_threshold = ejection_threshold
+        self.ejection_duration = ejection_duration
+        self.guards: dict[str, UpstreamGuard] = {key: self._create_guard(service) for key, service in services.items()}
+
+    def _create_guard(self, service: Service) -> UpstreamGuard:
+        return UpstreamGuard(
+            service,
+            ejection_threshold=self.ejection_threshold,
+            ejection_duration=self.ejection_duration,
+        )
+
+    def get(self, key: str) -> UpstreamGuard | None:
+        return self.guards.get(key)
+
+    def update(self, services: dict[str, Service]) -> list[UpstreamGuard]:
+        """
+        Apply a new service mapping without a restart. Instance lists are swapped in place,
+        breaker and bulkhead state is kept; policy changes only apply to new services.
+        Returns the guards of the removed services, for the caller to close once
+        nothing routes to them any more.
+        """
+        guards = {}
+        for key, service in services.items():
+            guard = self.guards.get(key)
+            if guard is None:
+                guard = self._create_guard(service)
+            else:
+                guard.pool.update(service)
+            guards[key] = guard
+
+        removed = [guard for key, guard in self.guards.items() if key not in guards]
+        self.guards = guards
+        return removed
+
+    def snapshot(self) -> dict:
+        return {key: guard.snapshot() for key, guard in self.guards.items()}
+
+    def is_degraded(self) -> bool:
+        return any(guard.breaker.state != CircuitState.CLOSED for guard in self.guards.values())
+
+    async def aclose(self):
+        for guard in self.guards.values():
+            await guard.aclose()
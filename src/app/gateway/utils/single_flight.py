@@ -0,0 +1,60 @@
+import asyncio
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    """
+    Runs one call per key at a time: callers arriving while a call for their
+    key is in flight wait for it and get the same result or exception. The call
+    runs in its own task, so the caller that started it can go away (client
+    disconnect) without failing the others. Counters are kept per `label`.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Task] = {}
+        self.calls: dict[str, int] = defaultdict(int)
+        self.merged: dict[str, int] = defaultdict(int)
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[Any]], label: str = "") -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(call())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+            self.calls[label] += 1
+        else:
+            self.merged[label] += 1
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Marks the exception retrieved when every waiter has gone away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight(),
+            "routes": {
+                label: {"upstream_calls": self.calls[label], "merged": self.merged.get(label, 0)}
+                for label in sorted(self.calls)
+            },
+        }
+
+    def render_prometheus(self, service: str) -> str:
+        lines = [
+            "# HELP gateway_coalesced_upstream_calls_total Upstream calls made for coalescable requests",
+            "# TYPE gateway_coalesced_upstream_calls_total counter",
+        ]
+        for label in sorted(self.calls):
+            lines.append(f'gateway_coalesced_upstream_calls_total{{service="{service}",route="{label}"}} {self.calls[label]}')
+        lines.append("# HELP gateway_coalesced_requests_total Requests served from another request's upstream call")
+        lines.append("# TYPE gateway_coalesced_requests_total counter")
+        for label in sorted(self.calls):
+            lines.append(f'gateway_coalesced_requests_total{{service="{service}",route="{label}"}} {self.merged.get(label, 0)}')
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,22 @@
+from fastapi import APIRouter, HTTPException, status
+
+from schema import PreferenceUpdateRequest, PreferenceResponse
+from services.preferences import preference_service
+
+
+router = APIRouter(prefix="/preferences", tags=["preferences"])
+
+
+@router.get("/{user_id}", response_model=PreferenceResponse)
+def get_preferences(user_id: int):
+    """Get the notification preferences of a user"""
+    preferences = preference_service.get(user_id)
+    if preferences is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No preferences for user {user_id}")
+    return preferences
+
+
+@router.put("/{user_id}", response_model=PreferenceResponse)
+def update_preferences(user_id: int, request: PreferenceUpdateRequest):
+    """Opt in or out of channels and set quiet hours"""
+    return preference_service.update(user_id, request.model_dump(exclude_unset=True))
@@ -0,0 +1,31 @@
+from fastapi import APIRouter, HTTPException, Request, status
+
+from services.user_projection import user_projection
+
+
+router = APIRouter(prefix="/projection/users", tags=["projection"])
+
+
+@router.get("/stats")
+def projection_stats(request: Request):
+    """Users in the local projection and whether it is being kept up to date"""
+    consumer = getattr(request.app.state, "user_snapshot_consumer", None)
+    return {"users": user_projection.count(), "consumer_running": consumer is not None and consumer.running}
+
+
+@router.post("/rebuild", status_code=status.HTTP_202_ACCEPTED)
+async def rebuild_projection(request: Request):
+    """Drop the projection and replay the users topic from offset zero"""
+    consumer = getattr(request.app.state, "user_snapshot_consumer", None)
+    if consumer is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="User projection is not consumed by this process")
+    await consumer.rebuild()
+    return {"status": "rebuilding"}
+
+
+@router.get("/{user_id}")
+def get_projected_user(user_id: int):
+    profile = user_projection.get(user_id)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"User {user_id} not found")
+    return profile
@@ -0,0 +1,38 @@
+from fastapi import APIRouter, HTTPException, status
+
+from schema import ScheduleRequest, ScheduleResponse
+from services.scheduler import scheduled_queue, scheduler_worker
+from services.templates import template_registry
+from domain.exception import TemplateNotFoundError
+
+
+router = APIRouter(prefix="/scheduled", tags=["scheduled"])
+
+
+@router.post("/", response_model=ScheduleResponse, status_code=status.HTTP_201_CREATED)
+def schedule_notification(request: ScheduleRequest):
+    """Schedule a notification, or add it to the user's digest"""
+    try:
+        template_registry.get(request.event_type, request.channel, request.locale)
+    except TemplateNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if request.digest_key:
+        item_id = scheduled_queue.schedule_digest(
+            request.user_id, request.channel, request.event_type, request.context,
+            digest_key=request.digest_key, at=request.due_at, locale=request.locale,
+        )
+    elif request.due_at:
+        item_id = scheduled_queue.schedule(
+            request.user_id, request.channel, request.event_type, request.context,
+            due_at=request.due_at, locale=request.locale,
+        )
+    else:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="due_at or digest_key is required")
+    return ScheduleResponse(id=item_id)
+
+
+@router.get("/stats")
+def scheduler_stats():
+    """Items per status and worker counters"""
+    return scheduler_worker.stats()
@@ -19,5 +19,70 @@ class AppConfig:
     KAFKA_BOOTSTRAP_SERVERS = [s.strip() for s in os.getenv('KAFKA_BOOTSTRAP_SERVERS', 'kafka:9093').split(',')]
     KAFKA_NOTIFICATION_TOPIC = os.getenv('KAFKA_NOTIFICATION_TOPIC', 'notification')
     KAFKA_GROUP_ID = os.getenv('KAFKA_GROUP_ID', 'notification-service')
+    # Compacted topic of user snapshots, read into the local user projection
+    KAFKA_USERS_TOPIC = os.getenv('KAFKA_USERS_TOPIC', 'users')
+    USER_PROJECTION_ENABLED = os.getenv('USER_PROJECTION_ENABLED', 'True').lower() == 'true'
+    USER_PROJECTION_GROUP_ID = os.getenv('USER_PROJECTION_GROUP_ID', 'notification-user-projection')
+    # KAFKA_TRANSPORT is kafka, or memory for an in-process broker (local runs, tests, benchmarks)
+    KAFKA_TRANSPORT = os.getenv('KAFKA_TRANSPORT', 'kafka')
+    KAFKA_MEMORY_PARTITIONS = int(os.getenv('KAFKA_MEMORY_PARTITIONS', 1))
+    # Records fetched per getmany() call, offsets are committed after each batch
+    KAFKA_MAX_BATCH_SIZE = int(os.getenv('KAFKA_MAX_BATCH_SIZE', 500))
+    KAFKA_POLL_TIMEOUT_MS = int(os.getenv('KAFKA_POLL_TIMEOUT_MS', 1000))
+    # Partition assignment (sticky, roundrobin or range) and static membership: workers
+    # started by `python worker.py` join as <KAFKA_GROUP_INSTANCE_ID or hostname>-<index>,
+    # so a restart within KAFKA_SESSION_TIMEOUT_MS doesn't rebalance the group
+    KAFKA_PARTITION_ASSIGNMENT = os.getenv('KAFKA_PARTITION_ASSIGNMENT', 'sticky')
+    KAFKA_GROUP_INSTANCE_ID = os.getenv('KAFKA_GROUP_INSTANCE_ID', '')
+    KAFKA_SESSION_TIMEOUT_MS = int(os.getenv('KAFKA_SESSION_TIMEOUT_MS', 30000))
+    # Seconds a stopping consumer waits for its current batch to finish and commit
+    KAFKA_DRAIN_TIMEOUT = float(os.getenv('KAFKA_DRAIN_TIMEOUT', 30))
+    # CONSUMER_MODE is embedded (consumers run in the HTTP app) or supervisor (`python worker.py`
+    # runs CONSUMER_WORKERS consumer processes, 0 for one per core, and the HTTP app runs none)
+    CONSUMER_MODE = os.getenv('CONSUMER_MODE', 'embedded')
+    CONSUMER_WORKERS = int(os.getenv('CONSUMER_WORKERS', 0))
+
+    # Notification templates: built-in defaults, overridden by the optional JSON file
+    NOTIFICATION_TEMPLATES_FILE = os.getenv('NOTIFICATION_TEMPLATES_FILE', '')
+    TEMPLATE_RELOAD_INTERVAL = float(os.getenv('TEMPLATE_RELOAD_INTERVAL', 5))
+    DEFAULT_LOCALE = os.getenv('DEFAULT_LOCALE', 'en')
+
+    # Notification preferences cache
+    PREFERENCE_CACHE_MAX_SIZE = int(os.getenv('PREFERENCE_CACHE_MAX_SIZE', 10000))
+    PREFERENCE_CACHE_TTL_SECONDS = float(os.getenv('PREFERENCE_CACHE_TTL_SECONDS', 300))
+
+    # Scheduled and digest notifications
+    SCHEDULER_ENABLED = os.getenv('SCHEDULER_ENABLED', 'True').lower() == 'true'
+    SCHEDULER_BATCH_SIZE = int(os.getenv('SCHEDULER_BATCH_SIZE', 100))
+    SCHEDULER_HORIZON_SECONDS = float(os.getenv('SCHEDULER_HORIZON_SECONDS', 60))
+    SCHEDULER_POLL_INTERVAL = float(os.getenv('SCHEDULER_POLL_INTERVAL', 5))
+    SCHEDULER_CLAIM_TIMEOUT = float(os.getenv('SCHEDULER_CLAIM_TIMEOUT', 300))
+    DIGEST_WINDOW_SECONDS = float(os.getenv('DIGEST_WINDOW_SECONDS', 3600))
+
+    # Retention: days to keep each notification type, expired rows are archived then deleted.
+    # NOTIFICATION_ARCHIVE_TARGET is file (gzipped JSON lines), table (notifications_archive) or none
+    NOTIFICATION_RETENTION_DAYS = os.getenv('NOTIFICATION_RETENTION_DAYS', 'EMAIL=365,SMS=90,PUSH=30')
+    RETENTION_ENABLED = os.getenv('RETENTION_ENABLED', 'True').lower() == 'true'
+    RETENTION_INTERVAL_SECONDS = float(os.getenv('RETENTION_INTERVAL_SECONDS', 3600))
+    RETENTION_BATCH_SIZE = int(os.getenv('RETENTION_BATCH_SIZE', 1000))
+    NOTIFICATION_ARCHIVE_TARGET = os.getenv('NOTIFICATION_ARCHIVE_TARGET', 'file')
+    NOTIFICATION_ARCHIVE_DIR = os.getenv('NOTIFICATION_ARCHIVE_DIR', 'archive/notifications')
+    # Monthly range partitions of notifications on created_at, Postgres only, applies when the table is created
+    NOTIFICATION_PARTITIONING = os.getenv('NOTIFICATION_PARTITIONING', 'False').lower() == 'true'
+    NOTIFICATION_PARTITIONS_AHEAD = int(os.getenv('NOTIFICATION_PARTITIONS_AHEAD', 3))
+
+    # Tracing: TRACING_EXPORTER is one of none, memory, log, file
+    TRACING_EXPORTER = os.getenv('TRACING_EXPORTER', 'none')
+    TRACING_FILE = os.getenv('TRACING_FILE', 'traces/notification-service.jsonl')
+    TRACING_SAMPLE_RATE = float(os.getenv('TRACING_SAMPLE_RATE', 1.0))
+
+    # Request metrics and access log sampling
+    ACCESS_LOG_SAMPLE_RATE = float(os.getenv('ACCESS_LOG_SAMPLE_RATE', 0.01))
+    SLOW_REQUEST_THRESHOLD = float(os.getenv('SLOW_REQUEST_THRESHOLD', 1.0))
+
+    # /debug endpoints need an X-Debug-Token header equal to DEBUG_ADMIN_TOKEN, unset disables them
+    DEBUG_ADMIN_TOKEN = os.getenv('DEBUG_ADMIN_TOKEN', '')
+    LOOP_LAG_MONITOR_ENABLED = os.getenv('LOOP_LAG_MONITOR_ENABLED', 'True').lower() == 'true'
+    LOOP_LAG_THRESHOLD_MS = float(os.getenv('LOOP_LAG_THRESHOLD_MS', 100))
 
 AppConfig = AppConfig()
\ No newline at end of file
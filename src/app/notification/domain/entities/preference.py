@@ -0,0 +1,74 @@
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta, timezone
+from functools import lru_cache
+from typing import ClassVar, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+
+@lru_cache(maxsize=256)
+def _zone(name: str):
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return timezone.utc
+
+
+@dataclass(frozen=True)
+class UserPreferences:
+    """Where and when a user accepts notifications"""
+
+    # Quiet hours hold back the channels that interrupt the user, email is not affected
+    QUIET_CHANNELS: ClassVar[frozenset] = frozenset({"SMS", "PUSH"})
+
+    user_id: int
+    email: Optional[str] = None
+    phone_number: Optional[str] = None
+    locale: Optional[str] = None
+    timezone: str = "UTC"
+    email_enabled: bool = True
+    sms_enabled: bool = True
+    push_enabled: bool = True
+    quiet_hours_start: Optional[time] = None
+    quiet_hours_end: Optional[time] = None
+
+    def is_enabled(self, channel: str) -> bool:
+        return {
+            "EMAIL": self.email_enabled,
+            "SMS": self.sms_enabled,
+            "PUSH": self.push_enabled,
+        }.get(channel.upper(), False)
+
+    def get_recipient(self, channel: str) -> Optional[str]:
+        return {"EMAIL": self.email, "SMS": self.phone_number}.get(channel.upper())
+
+    def in_quiet_hours(self, at: Optional[datetime] = None) -> bool:
+        if self.quiet_hours_start is None or self.quiet_hours_end is None:
+            return False
+        at = at or datetime.now(timezone.utc)
+        if at.tzinfo is None:
+            at = at.replace(tzinfo=timezone.utc)
+        local = at.astimezone(_zone(self.timezone)).time()
+        start, end = self.quiet_hours_start, self.quiet_hours_end
+        if start <= end:
+            return start <= local < end
+        # The window wraps around midnight, e.g. 22:00-07:00
+        return local >= start or local < end
+
+    def quiet_hours_end_at(self, at: Optional[datetime] = None) -> datetime:
+        """The next end of the quiet hours after `at`, in UTC"""
+        at = at or datetime.now(timezone.utc)
+        if at.tzinfo is None:
+            at = at.replace(tzinfo=timezone.utc)
+        zone = _zone(self.timezone)
+        local = at.astimezone(zone)
+        end = datetime.combine(local.date(), self.quiet_hours_end or time(0), tzinfo=zone)
+        if end <= local:
+            end += timedelta(days=1)
+        return end.astimezone(timezone.utc)
+
+    def allows(self, channel: str, at: Optional[datetime] = None) -> bool:
+        """True if a notification on `channel` should be delivered now"""
+        channel = channel.upper()
+        if not self.is_enabled(channel) or not self.get_recipient(channel):
+            return False
+        return channel not in self.QUIET_CHANNELS or not self.in_quiet_hours(at)
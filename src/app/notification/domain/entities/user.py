@@ -0,0 +1,23 @@
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+
+@dataclass(frozen=True)
+class UserProfile:
+    """A user as last published by the user service"""
+
+    user_id: int
+    username: str
+    email: str
+    full_name: Optional[str] = None
+    role: Optional[str] = None
+    is_active: bool = True
+
+    def to_context(self) -> Dict[str, Any]:
+        """Template values for this user"""
+        return {
+            "user_id": self.user_id,
+            "username": self.username,
+            "email": self.email,
+            "full_name": self.full_name or self.username,
+        }
@@ -3,4 +3,18 @@
 class NotificationError(Exception):
     """Base exception for notification errors."""
     pass
-    
+
+
+class TemplateNotFoundError(NotificationError):
+    """No template registered for an (event type, channel, locale)."""
+
+    def __init__(self, event_type: str, channel: str, locale: str):
+        super().__init__(f"No template for event={event_type} channel={channel} locale={locale}")
+        self.event_type = event_type
+        self.channel = channel
+        self.locale = locale
+
+
+class TemplateRenderError(NotificationError):
+    """A template could not be compiled or a placeholder has no value."""
+    pass
@@ -1,27 +1,51 @@
 import json
 import asyncio
 import logging
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 import contextlib
-from aiokafka import AIOKafkaConsumer
-from aiokafka.errors import KafkaError
+from config.config import AppConfig
+from tracing import tracer, parse_traceparent, TRACEPARENT_HEADER
+from .transport import create_consumer
 
 
 logger = logging.getLogger(__name__)
 
+
+def deserialize_json(raw: Optional[bytes]) -> Any:
+    # Tombstones on compacted topics have no value
+    return json.loads(raw.decode()) if raw is not None else None
+
+
 class AsyncEventConsumer:
     """
     Base class for async Kafka consumers.
     """
 
-    def __init__(self, bootstrap_servers: list, topic: str, group_id: str):
+    def __init__(
+        self,
+        bootstrap_servers: list,
+        topic: str,
+        group_id: str,
+        transport: Optional[str] = None,
+        max_batch_size: int = AppConfig.KAFKA_MAX_BATCH_SIZE,
+        poll_timeout_ms: int = AppConfig.KAFKA_POLL_TIMEOUT_MS,
+        group_instance_id: Optional[str] = None,
+        drain_timeout: float = AppConfig.KAFKA_DRAIN_TIMEOUT,
+    ):
         self.bootstrap_servers = bootstrap_servers
         self.topic = topic
         self.group_id = group_id
-
-        self.consumer: Optional[AIOKafkaConsumer] = None
+        self.transport = transport or AppConfig.KAFKA_TRANSPORT
+        self.max_batch_size = max_batch_size
+        self.poll_timeout_ms = poll_timeout_ms
+        # Static membership, must be unique within the group
+        self.group_instance_id = group_instance_id
+        self.drain_timeout = drain_timeout
+
+        self.consumer = None
         self.task: Optional[asyncio.Task] = None
         self.running: bool = False
+        self._replay_pending: bool = False
 
     async def start(self):
         """Start Kafka consumer"""
@@ -30,20 +54,25 @@ class AsyncEventConsumer:
             return
 
         try:
-            self.consumer = AIOKafkaConsumer(
+            options = {"group_instance_id": self.group_instance_id} if self.group_instance_id else {}
+            self.consumer = create_consumer(
                 self.topic,
                 bootstrap_servers=self.bootstrap_servers,
                 group_id=self.group_id,
-                value_deserializer=lambda m: json.loads(m.decode()),
+                value_deserializer=deserialize_json,
+                transport=self.transport,
                 auto_offset_reset="earliest",
-                enable_auto_commit=True,
+                # Offsets are committed once a batch has been processed
+                enable_auto_commit=False,
+                **options,
             )
 
-            logger.info(f"Connecting to Kafka: {self.bootstrap_servers}, topic={self.topic}")
+            logger.info(f"Connecting to Kafka ({self.transport}): {self.bootstrap_servers}, topic={self.topic}")
             await self.consumer.start()
 
             self.running = True
-            self.task = asyncio.create_task(self._consume_loop())
+            # Named so loop lag warnings and task dumps point at the consumer
+            self.task = asyncio.create_task(self._consume_loop(), name=f"consumer:{self.topic}")
             logger.info("Kafka consumer started")
 
         except Exception as e:
@@ -51,15 +80,27 @@ class AsyncEventConsumer:
             await self.stop()
             raise
 
+    def replay(self):
+        """Read the topic again from offset zero, once partitions are assigned"""
+        self._replay_pending = True
+
     async def stop(self):
-        """Gracefully stop Kafka consumer"""
+        """
+        Gracefully stop Kafka consumer: the batch in progress is finished and
+        committed, it is only cancelled if that takes over `drain_timeout`.
+        """
         logger.info("Stopping Kafka consumer...")
         self.running = False
 
         if self.task:
-            self.task.cancel()
-            with contextlib.suppress(asyncio.CancelledError):
-                await self.task
+            try:
+                await asyncio.wait_for(asyncio.shield(self.task), self.drain_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"⚠️ Batch on {self.topic} still running after {self.drain_timeout}s, cancelling it")
+                self.task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await self.task
+            self.task = None
 
         if self.consumer:
             with contextlib.suppress(Exception):
@@ -72,26 +113,51 @@ class AsyncEventConsumer:
         logger.info("🔄 Listening for messages...")
 
         try:
-            async for msg in self.consumer:
-                if not self.running:
-                    break
+            while self.running:
+                if self._replay_pending and self.consumer.assignment():
+                    await self.consumer.seek_to_beginning()
+                    self._replay_pending = False
+                    logger.info(f"⏪ Replaying {self.topic} from offset zero")
 
-                logger.debug(f"📩 Msg offset={msg.offset}, partition={msg.partition}")
-                await self._process_message(msg.value)
+                batches = await self.consumer.getmany(
+                    timeout_ms=self.poll_timeout_ms,
+                    max_records=self.max_batch_size,
+                )
+                if not batches:
+                    continue
+
+                for tp, messages in batches.items():
+                    logger.debug(f"📩 {len(messages)} msgs partition={tp.partition}, offsets {messages[0].offset}-{messages[-1].offset}")
+                    await self.process_batch(messages)
+
+                await self.consumer.commit()
 
         except asyncio.CancelledError:
             logger.info("↩️ Consumer loop cancelled")
-        except KafkaError as e:
-            logger.error(f"⚠️ Kafka error: {e}", exc_info=True)
         except Exception as e:
             logger.error(f"❌ Unexpected error in consumer loop: {e}", exc_info=True)
 
-    async def _process_message(self, data: Dict[str, Any]):
-        """Call subclass handler"""
-        try:
-            await self.process_event(data)
-        except Exception as e:
-            logger.error(f"❌ Error processing event: {data} | {e}", exc_info=True)
+    async def process_batch(self, messages: List[Any]):
+        """Handle the records of one partition fetched together, in offset order"""
+        for msg in messages:
+            await self._process_message(msg.value, msg)
+
+    async def _process_message(self, data: Dict[str, Any], msg=None):
+        """Call subclass handler inside a consumer span continuing the producer's trace"""
+        parent = None
+        attributes = {"messaging.destination": self.topic}
+        if msg is not None:
+            headers = dict(msg.headers or ())
+            traceparent = headers.get(TRACEPARENT_HEADER)
+            parent = parse_traceparent(traceparent.decode() if traceparent else None)
+            attributes.update({"messaging.partition": msg.partition, "messaging.offset": msg.offset})
+
+        with tracer.start_span(f"consume {self.topic}", kind="consumer", parent=parent, attributes=attributes) as span:
+            try:
+                await self.process_event(data)
+            except Exception as e:
+                span.record_exception(e)
+                logger.error(f"❌ Error processing event: {data} | {e}", exc_info=True)
 
     async def process_event(self, event: Dict[str, Any]):
         """To be overridden by child consumers"""
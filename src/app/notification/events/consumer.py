@@ -1,22 +1,66 @@
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
+import asyncio
 import logging
 from services.notification_service import NotificationService
+from services.preferences import preference_service
+from services.scheduler import scheduled_queue
+from services.templates import template_registry
+from services.user_projection import user_projection
+from domain.entities.preference import UserPreferences
+from domain.entities.user import UserProfile
 from models import Notification
-from datetime import datetime
+from config.config import AppConfig
+from datetime import datetime, timezone
 
 from .event import UserCreatedEvent
 from .base_consumer import AsyncEventConsumer
 
 logger = logging.getLogger(__name__)
 
+# Channels a welcome notification can go out on, in order
+WELCOME_CHANNELS = ("EMAIL", "SMS")
+REQUIRED_FIELDS = ("user_id", "username", "email")
+
 
 class UserEventConsumer(AsyncEventConsumer):
     """Handle user events"""
 
+    # Preferences and projected profiles of the users in the batch being handled
+    preferences: Dict[int, UserPreferences] = {}
+    profiles: Dict[int, UserProfile] = {}
+
+    async def process_batch(self, messages: List[Any]):
+        """
+        Sync the preferences and load the projected profiles of every user in
+        the batch at once, then handle each event
+        """
+        contacts = [
+            msg.value for msg in messages
+            if isinstance(msg.value, dict) and all(field in msg.value for field in REQUIRED_FIELDS)
+        ]
+        if contacts:
+            try:
+                self.preferences = await asyncio.to_thread(preference_service.sync_contacts, contacts)
+            except Exception as e:
+                # Events are still handled, preferences are looked up again per user
+                logger.error(f"❌ Failed to sync preferences for {len(contacts)} users: {e}", exc_info=True)
+
+            try:
+                self.profiles = await asyncio.to_thread(user_projection.get_many, [int(c["user_id"]) for c in contacts])
+            except Exception as e:
+                # Events are still handled, the context just lacks the profile fields
+                logger.error(f"❌ Failed to load {len(contacts)} user profiles: {e}", exc_info=True)
+
+        try:
+            await super().process_batch(messages)
+        finally:
+            self.preferences = {}
+            self.profiles = {}
+
     async def process_event(self, event_data: Dict[str, Any]):
         logger.info(f"📨 Event received: {event_data}")
 
-        if not all(field in event_data for field in ("user_id", "username", "email")):
+        if not all(field in event_data for field in REQUIRED_FIELDS):
             logger.warning(f"⚠️ Invalid event format: {event_data}")
             return
 
@@ -26,12 +70,117 @@ class UserEventConsumer(AsyncEventConsumer):
 
     async def _on_user_created(self, event: UserCreatedEvent):
         logger.info(f"👤 User created: {event.username} | {event.email}")
-        await NotificationService.create(
-            db_obj=Notification(
-                notification_type="SMS",
-                user_id=event.user_id,
-                message=f"Welcome {event.username}! Your account has been created.",
-                is_read=False,
-                created_at=datetime.now()
-            ),
-        )
\ No newline at end of file
+        preferences = self.preferences.get(event.user_id)
+        if preferences is None:
+            # Not synced with the batch, a cache miss queries the DB
+            preferences = await asyncio.to_thread(preference_service.get, event.user_id)
+        preferences = preferences or UserPreferences(
+            user_id=event.user_id,
+            email=event.email,
+            phone_number=event.phone_number,
+            locale=event.locale,
+        )
+
+        now = datetime.now(timezone.utc)
+        context = event.model_dump()
+        # Fill in what the event doesn't carry from the local user projection
+        profile = self.profiles.get(event.user_id)
+        if profile is not None:
+            context = {**profile.to_context(), **{key: value for key, value in context.items() if value is not None}}
+        else:
+            context["full_name"] = event.username
+        for channel in WELCOME_CHANNELS:
+            if not preferences.allows(channel, now):
+                if preferences.is_enabled(channel) and preferences.get_recipient(channel) and preferences.in_quiet_hours(now):
+                    # Wanted, just not now: deliver when the quiet hours end
+                    await asyncio.to_thread(
+                        scheduled_queue.schedule, event.user_id, channel, "user_created", context,
+                        due_at=preferences.quiet_hours_end_at(now), locale=preferences.locale,
+                    )
+                else:
+                    logger.debug(f"Skipping {channel} for user {event.user_id}")
+                continue
+
+            rendered = template_registry.render("user_created", channel, context, locale=preferences.locale)
+            await NotificationService.create(
+                db_obj=Notification(
+                    notification_type=channel,
+                    user_id=event.user_id,
+                    message=rendered.body,
+                    is_read=False,
+                    created_at=datetime.now()
+                ),
+            )
+
+
+
+class UserSnapshotConsumer(AsyncEventConsumer):
+    """
+    Keep the local user projection in step with the compacted users topic.
+    The records of a batch are collapsed to the latest one per user and written
+    in a single transaction, an empty projection is rebuilt from offset zero.
+    The DB work runs in threads, the user event consumer shares this loop.
+    """
+
+    async def start(self):
+        if await asyncio.to_thread(user_projection.count) == 0:
+            self.replay()
+        await super().start()
+
+    async def rebuild(self):
+        """Drop the projection and read every snapshot again"""
+        await asyncio.to_thread(user_projection.clear)
+        self.replay()
+
+    async def process_batch(self, messages: List[Any]):
+        snapshots: Dict[int, Optional[Dict[str, Any]]] = {}
+        for msg in messages:
+            try:
+                user_id = int(msg.key.decode()) if msg.key else int(msg.value["user_id"])
+            except (ValueError, KeyError, TypeError):
+                logger.warning(f"⚠️ User snapshot without a user id at offset {msg.offset}")
+                continue
+            snapshots[user_id] = msg.value
+
+        if not snapshots:
+            return
+        try:
+            await asyncio.to_thread(user_projection.apply, snapshots)
+        except Exception as e:
+            logger.error(f"❌ Failed to apply {len(snapshots)} user snapshots: {e}", exc_info=True)
+            return
+
+        # Contact details follow the user, not only the values of the creation event
+        contacts = [
+            {"user_id": user_id, "email": snapshot.get("email")}
+            for user_id, snapshot in snapshots.items() if snapshot is not None
+        ]
+        if contacts:
+            try:
+                await asyncio.to_thread(preference_service.sync_contacts, contacts)
+            except Exception as e:
+                logger.error(f"❌ Failed to sync preferences for {len(contacts)} users: {e}", exc_info=True)
+
+
+def create_consumers(group_instance_id: Optional[str] = None) -> List[AsyncEventConsumer]:
+    """
+    The consumers a notification process runs, the user event consumer first.
+    `group_instance_id` gives each of them a static membership in its group.
+    """
+    consumers: List[AsyncEventConsumer] = [
+        UserEventConsumer(
+            bootstrap_servers=AppConfig.KAFKA_BOOTSTRAP_SERVERS,
+            topic=AppConfig.KAFKA_NOTIFICATION_TOPIC,
+            group_id=AppConfig.KAFKA_GROUP_ID,
+            group_instance_id=group_instance_id,
+        )
+    ]
+    # Local copy of the users, read from the compacted users topic
+    if AppConfig.USER_PROJECTION_ENABLED:
+        consumers.append(UserSnapshotConsumer(
+            bootstrap_servers=AppConfig.KAFKA_BOOTSTRAP_SERVERS,
+            topic=AppConfig.KAFKA_USERS_TOPIC,
+            group_id=AppConfig.USER_PROJECTION_GROUP_ID,
+            group_instance_id=group_instance_id,
+        ))
+    return consumers
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 from datetime import datetime
 
 class KafkaEvent(BaseModel):
@@ -13,3 +13,5 @@ class UserCreatedEvent(BaseModel):
     user_id: int    
     username: str
     email: str
+    phone_number: Optional[str] = None
+    locale: Optional[str] = None
@@ -0,0 +1,68 @@
+"""
+Consumer transports selected by KAFKA_TRANSPORT: `kafka` connects aiokafka to
+the cluster, `memory` reads from an in-process broker (local runs, tests, benchmarks).
+"""
+from typing import Any, Callable, Optional
+
+from config.config import AppConfig
+from .memory_broker import InMemoryBroker, InMemoryConsumer
+
+_memory_broker: Optional[InMemoryBroker] = None
+
+
+def memory_broker() -> InMemoryBroker:
+    """The process-wide in-memory broker"""
+    global _memory_broker
+    if _memory_broker is None:
+        _memory_broker = InMemoryBroker(AppConfig.KAFKA_MEMORY_PARTITIONS)
+    return _memory_broker
+
+
+def partition_assignor(name: str):
+    """
+    aiokafka assignor class by name. aiokafka has no cooperative protocol, sticky
+    still rebalances eagerly but hands every member back the partitions it had.
+    """
+    if name == "sticky":
+        from aiokafka.coordinator.assignors.sticky.sticky_assignor import StickyPartitionAssignor
+        return StickyPartitionAssignor
+    if name == "roundrobin":
+        from aiokafka.coordinator.assignors.roundrobin import RoundRobinPartitionAssignor
+        return RoundRobinPartitionAssignor
+    if name == "range":
+        from aiokafka.coordinator.assignors.range import RangePartitionAssignor
+        return RangePartitionAssignor
+    raise ValueError(f"Unknown KAFKA_PARTITION_ASSIGNMENT: {name}")
+
+
+def create_consumer(
+    topic: str,
+    bootstrap_servers: list,
+    group_id: str,
+    value_deserializer: Callable[[bytes], Any],
+    transport: Optional[str] = None,
+    **options,
+):
+    """Build a consumer exposing the aiokafka API (start, stop, getmany, commit)"""
+    transport = transport or AppConfig.KAFKA_TRANSPORT
+
+    if transport == "memory":
+        return InMemoryConsumer(
+            topic,
+            broker=memory_broker(),
+            group_id=group_id,
+            value_deserializer=value_deserializer,
+            **options,
+        )
+    if transport == "kafka":
+        from aiokafka import AIOKafkaConsumer
+        return AIOKafkaConsumer(
+            topic,
+            bootstrap_servers=bootstrap_servers,
+            group_id=group_id,
+            value_deserializer=value_deserializer,
+            partition_assignment_strategy=(partition_assignor(AppConfig.KAFKA_PARTITION_ASSIGNMENT),),
+            session_timeout_ms=AppConfig.KAFKA_SESSION_TIMEOUT_MS,
+            **options,
+        )
+    raise ValueError(f"Unknown KAFKA_TRANSPORT: {transport}")
@@ -1,8 +1,18 @@
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from contextlib import asynccontextmanager
-from database import Base as base , engine
+from database import engine
 from config.config import AppConfig
-from events.consumer import UserEventConsumer
+from events.consumer import UserSnapshotConsumer, create_consumers
+from apis.preference_controller import router as preference_router
+from services.templates import template_registry
+from services.scheduler import scheduler_worker
+from services.retention import retention_job
+from apis.schedule_controller import router as schedule_router
+from apis.projection_controller import router as projection_router
+from middleware.timing_middleware import TimingMiddleware, RequestMetrics, queued_access_logger
+from tracing import tracer, create_exporter, instrument_sqlalchemy, TracingMiddleware
+from debug import LoopLagMonitor, create_debug_router
 import logging
 import sys
 
@@ -17,21 +27,22 @@ logging.basicConfig(
 )
 
 logger = logging.getLogger(__name__)
+request_metrics = RequestMetrics("notification-service")
+loop_monitor = LoopLagMonitor(threshold=AppConfig.LOOP_LAG_THRESHOLD_MS / 1000)
 
-# Create  consumer instance
-event_consumer = UserEventConsumer(
-    bootstrap_servers=AppConfig.KAFKA_BOOTSTRAP_SERVERS,
-    topic=AppConfig.KAFKA_NOTIFICATION_TOPIC,
-    group_id="testing"
+tracer.configure(
+    "notification-service",
+    create_exporter(AppConfig.TRACING_EXPORTER, AppConfig.TRACING_FILE),
+    sample_rate=AppConfig.TRACING_SAMPLE_RATE,
 )
+instrument_sqlalchemy(engine)
+
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage application lifespan with proper startup/shutdown"""
-
-    #apply migrations.
-    base.metadata.create_all(bind=engine)
+    # The schema is created by `python migrate.py`, not on every start
 
     # Startup
     logger.info("=" * 50)
@@ -40,8 +51,24 @@ async def lifespan(app: FastAPI):
     logger.info(f"Kafka topic: {AppConfig.KAFKA_NOTIFICATION_TOPIC}")
     logger.info("=" * 50)
     
+    if AppConfig.LOOP_LAG_MONITOR_ENABLED:
+        loop_monitor.start()
+    template_registry.start(AppConfig.TEMPLATE_RELOAD_INTERVAL)
+    if AppConfig.SCHEDULER_ENABLED:
+        scheduler_worker.start()
+    if AppConfig.RETENTION_ENABLED:
+        retention_job.start()
+
+    # In supervisor mode the consumers run in the `python worker.py` processes
+    consumers = create_consumers() if AppConfig.CONSUMER_MODE == "embedded" else []
+    app.state.event_consumer = consumers[0] if consumers else None
+    app.state.user_snapshot_consumer = next(
+        (consumer for consumer in consumers if isinstance(consumer, UserSnapshotConsumer)), None
+    )
+
     try:
-        await event_consumer.start()
+        for consumer in reversed(consumers):
+            await consumer.start()
         logger.info("✅ Application startup complete")
     except Exception as e:
         logger.error(f" Failed to start consumer: {e}", exc_info=True)
@@ -51,7 +78,13 @@ async def lifespan(app: FastAPI):
     
     logger.info(" Shutting down FastAPI application...")
     try:
-        await event_consumer.stop()
+        for consumer in consumers:
+            await consumer.stop()
+        await template_registry.stop()
+        await scheduler_worker.stop()
+        await retention_job.stop()
+        await loop_monitor.stop()
+        tracer.exporter.shutdown()
         logger.info("✅ Application shutdown complete")
     except Exception as e:
         logger.error(f"Error during shutdown: {e}", exc_info=True)
@@ -66,6 +99,20 @@ app = FastAPI(
     openapi_url="/openapi.json" if AppConfig.DEBUG else None
 )
 
+app.add_middleware(
+    TimingMiddleware,
+    metrics=request_metrics,
+    access_log=queued_access_logger("notification-service.access"),
+    sample_rate=AppConfig.ACCESS_LOG_SAMPLE_RATE,
+    slow_request_threshold=AppConfig.SLOW_REQUEST_THRESHOLD,
+)
+app.add_middleware(TracingMiddleware)
+
+app.include_router(router=preference_router)
+app.include_router(router=schedule_router)
+app.include_router(router=projection_router)
+app.include_router(router=create_debug_router(AppConfig.DEBUG_ADMIN_TOKEN, loop_monitor))
+
 
 
 
@@ -75,7 +122,26 @@ def health_check():
     return {
         "status": "ok", 
         "message": "Notification service is running.",
-        "consumer_running": event_consumer.running,
+        "consumer_mode": AppConfig.CONSUMER_MODE,
+        "consumer_running": getattr(app.state, "event_consumer", None) is not None and app.state.event_consumer.running,
         "kafka_servers": AppConfig.KAFKA_BOOTSTRAP_SERVERS,
         "kafka_topic": AppConfig.KAFKA_NOTIFICATION_TOPIC
-    }
\ No newline at end of file
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Request latency histograms in Prometheus format"""
+    return request_metrics.render_prometheus()
+
+
+@app.get("/metrics/summary")
+def metrics_summary():
+    """p50/p90/p99 latency per route"""
+    return request_metrics.summary()
+
+
+@app.get("/retention/stats")
+def retention_stats():
+    """Retention per notification type and rows archived since start"""
+    return retention_job.stats()
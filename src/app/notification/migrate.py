@@ -0,0 +1,29 @@
+"""
+Create the database schema. Run once per deploy, before starting the app:
+    python migrate.py
+Creating tables and indexes is idempotent, create_all leaves existing tables
+as they are so indexes added to a model since are created one by one.
+"""
+from sqlalchemy import text
+
+from config.config import AppConfig
+from database import Base, engine
+import models  # noqa: F401  registers the tables on Base.metadata
+
+
+def run_migrations():
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+        # Replaced by indexes matching how notifications are read, dropped only once they exist
+        conn.execute(text("DROP INDEX IF EXISTS ix_notifications_message"))
+    if models.PARTITIONED:
+        from services.retention import ensure_partitions
+        ensure_partitions(AppConfig.NOTIFICATION_PARTITIONS_AHEAD)
+
+
+if __name__ == "__main__":
+    run_migrations()
+    print(f"Schema is up to date: {', '.join(sorted(Base.metadata.tables))}")
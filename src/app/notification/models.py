@@ -1,15 +1,93 @@
 from database import Base
-from sqlalchemy import Column, Integer, String, Boolean, DateTime,Enum
+from sqlalchemy import Column, Integer, String, Boolean, DateTime,Enum, Time, JSON, Index
 from datetime import datetime
+from config.config import AppConfig
 from domain.enum.not_type import NotificationType
 
+# Range partitioning needs the partition key in the primary key
+PARTITIONED = AppConfig.NOTIFICATION_PARTITIONING and AppConfig.DATABASE_URL.startswith("postgresql")
+
 
 class Notification(Base):
     __tablename__ = "notifications"
+    __table_args__ = (
+        # A user's inbox, newest first, and their unread count
+        Index("ix_notifications_user_id_created_at", "user_id", "created_at"),
+        Index("ix_notifications_user_id_is_read", "user_id", "is_read"),
+        # Retention scans expired rows of one type
+        Index("ix_notifications_type_created_at", "notification_type", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"} if PARTITIONED else {},
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, index=True)
-    message = Column(String, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer)
+    message = Column(String)
     notification_type = Column(Enum(NotificationType), nullable=False,default=NotificationType.EMAIL)
     is_read = Column(Boolean, default=False)
-    created_at = Column(DateTime, default=datetime.time)
\ No newline at end of file
+    created_at = Column(DateTime, nullable=False, default=datetime.now, primary_key=PARTITIONED)
+
+
+class NotificationArchive(Base):
+    """Expired notifications, when NOTIFICATION_ARCHIVE_TARGET=table"""
+    __tablename__ = "notifications_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, index=True)
+    message = Column(String)
+    notification_type = Column(String, nullable=False)
+    is_read = Column(Boolean)
+    created_at = Column(DateTime, nullable=False)
+    archived_at = Column(DateTime, nullable=False, default=datetime.now)
+
+
+class NotificationPreference(Base):
+    __tablename__ = "notification_preferences"
+
+    user_id = Column(Integer, primary_key=True)
+    email = Column(String, nullable=True)
+    phone_number = Column(String, nullable=True)
+    locale = Column(String, nullable=True)
+    timezone = Column(String, nullable=False, default="UTC")
+    email_enabled = Column(Boolean, nullable=False, default=True)
+    sms_enabled = Column(Boolean, nullable=False, default=True)
+    push_enabled = Column(Boolean, nullable=False, default=True)
+    quiet_hours_start = Column(Time, nullable=True)
+    quiet_hours_end = Column(Time, nullable=True)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+
+class ScheduledNotification(Base):
+    """A notification to render and deliver later, due_at is in UTC"""
+    __tablename__ = "scheduled_notifications"
+    __table_args__ = (
+        # The worker scans pending items in due order
+        Index("ix_scheduled_notifications_status_due_at", "status", "due_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False, index=True)
+    channel = Column(String, nullable=False)
+    event_type = Column(String, nullable=False)
+    locale = Column(String, nullable=True)
+    context = Column(JSON, nullable=False, default=dict)
+    # Items sharing a digest key and due time are delivered as one message
+    digest_key = Column(String, nullable=True)
+    due_at = Column(DateTime, nullable=False)
+    status = Column(String, nullable=False, default="pending")
+    claimed_by = Column(String, nullable=True)
+    claimed_at = Column(DateTime, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.now)
+
+
+class UserProjection(Base):
+    """Local copy of the users topic, kept by UserSnapshotConsumer"""
+    __tablename__ = "user_projections"
+
+    user_id = Column(Integer, primary_key=True)
+    username = Column(String, nullable=False)
+    email = Column(String, nullable=False, index=True)
+    full_name = Column(String, nullable=True)
+    role = Column(String, nullable=True)
+    is_active = Column(Boolean, nullable=False, default=True)
+    updated_at = Column(DateTime, nullable=True)
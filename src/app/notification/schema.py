@@ -0,0 +1,47 @@
+from datetime import datetime, time
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class PreferenceUpdateRequest(BaseModel):
+    """Fields a user can change, omitted fields are left as they are"""
+    phone_number: Optional[str] = Field(None, pattern=r"^\+[0-9]{6,15}$")
+    locale: Optional[str] = Field(None, max_length=16)
+    timezone: Optional[str] = Field(None, max_length=64)
+    email_enabled: Optional[bool] = None
+    sms_enabled: Optional[bool] = None
+    push_enabled: Optional[bool] = None
+    quiet_hours_start: Optional[time] = None
+    quiet_hours_end: Optional[time] = None
+
+
+class PreferenceResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    user_id: int
+    email: Optional[str] = None
+    phone_number: Optional[str] = None
+    locale: Optional[str] = None
+    timezone: str
+    email_enabled: bool
+    sms_enabled: bool
+    push_enabled: bool
+    quiet_hours_start: Optional[time] = None
+    quiet_hours_end: Optional[time] = None
+
+
+class ScheduleRequest(BaseModel):
+    """A deferred notification, or an item of a digest when digest_key is set"""
+    user_id: int
+    channel: str = Field(..., pattern=r"^(EMAIL|SMS|PUSH)$")
+    event_type: str = Field(..., min_length=1, max_length=64)
+    context: Dict[str, Any] = Field(default_factory=dict)
+    locale: Optional[str] = Field(None, max_length=16)
+    # Required unless digest_key is set, digests are due at the end of the current window
+    due_at: Optional[datetime] = None
+    digest_key: Optional[str] = Field(None, max_length=64)
+
+
+class ScheduleResponse(BaseModel):
+    id: int
@@ -3,10 +3,6 @@ from domain.entities.notification import EmailNotification, SMSNotification
 from config.config import AppConfig
 
 
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
-
-
 class EmailNotificationAdapter(NotificationPort):
     
     def __init__(self,email_info:EmailNotification):
@@ -18,6 +14,9 @@ class EmailNotificationAdapter(NotificationPort):
         
         # Logic for sending emails 
         def send_email_via_sendgrid(to_email, subject, content):
+            from sendgrid import SendGridAPIClient
+            from sendgrid.helpers.mail import Mail
+
             message = Mail(
                 from_email="ahmed.zater@univ-constantine2.dz",
                 to_emails=to_email,
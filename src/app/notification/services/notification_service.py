@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from models import Notification
 from database import get_db, SessionLocal
 from fastapi import Depends
+from typing import List
 
 class NotificationService:
 
@@ -21,4 +22,18 @@ class NotificationService:
             session.refresh(db_obj)
         finally:
             session.close()
+        return True
+
+    @staticmethod
+    def create_many(db_objs: List[Notification]) -> bool:
+        """Insert several notifications in one transaction, blocking, run it off the event loop"""
+        session = SessionLocal()
+        try:
+            session.add_all(db_objs)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
         return True
\ No newline at end of file
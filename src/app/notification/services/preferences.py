@@ -0,0 +1,139 @@
+from typing import Any, Dict, Iterable, List, Optional
+
+from config.config import AppConfig
+from database import SessionLocal
+from domain.entities.preference import UserPreferences
+from models import NotificationPreference
+from .cache import LRUCache
+
+PREFERENCE_FIELDS = (
+    "email", "phone_number", "locale", "timezone",
+    "email_enabled", "sms_enabled", "push_enabled",
+    "quiet_hours_start", "quiet_hours_end",
+)
+# Contact details carried by user events, the opt-in flags belong to the user
+CONTACT_FIELDS = ("email", "phone_number", "locale")
+
+
+def to_preferences(row: NotificationPreference) -> UserPreferences:
+    return UserPreferences(user_id=row.user_id, **{field: getattr(row, field) for field in PREFERENCE_FIELDS})
+
+
+class PreferenceService:
+    """
+    Notification preferences behind an LRU cache. `get_many` answers a whole
+    consumer batch with at most one query for the users that are not cached.
+    """
+
+    def __init__(self, cache: LRUCache):
+        self.cache = cache
+
+    def get(self, user_id: int) -> Optional[UserPreferences]:
+        return self.get_many([user_id]).get(user_id)
+
+    def get_many(self, user_ids: Iterable[int]) -> Dict[int, UserPreferences]:
+        found: Dict[int, UserPreferences] = {}
+        missing: List[int] = []
+        for user_id in set(user_ids):
+            preferences = self.cache.get(user_id)
+            if preferences is None:
+                missing.append(user_id)
+            else:
+                found[user_id] = preferences
+
+        if not missing:
+            return found
+
+        version = self.cache.version
+        session = SessionLocal()
+        try:
+            rows = session.query(NotificationPreference).filter(NotificationPreference.user_id.in_(missing)).all()
+        finally:
+            session.close()
+
+        for row in rows:
+            preferences = to_preferences(row)
+            self.cache.set(row.user_id, preferences, version=version)
+            found[row.user_id] = preferences
+        return found
+
+    def sync_contacts(self, contacts: Iterable[Dict[str, Any]]) -> Dict[int, UserPreferences]:
+        """
+        Create or refresh preferences from user events, one dict per user with
+        `user_id` and any of CONTACT_FIELDS. Only rows whose contact details
+        changed are written, all of them in a single commit.
+        """
+        latest: Dict[int, Dict[str, Any]] = {}
+        for contact in contacts:
+            latest[contact["user_id"]] = contact
+
+        current = self.get_many(latest)
+        changed: Dict[int, Dict[str, Any]] = {}
+        for user_id, contact in latest.items():
+            values = {field: contact.get(field) for field in CONTACT_FIELDS if contact.get(field) is not None}
+            preferences = current.get(user_id)
+            if preferences is None or any(getattr(preferences, field) != value for field, value in values.items()):
+                changed[user_id] = values
+
+        if not changed:
+            return current
+
+        session = SessionLocal()
+        try:
+            rows = {
+                row.user_id: row
+                for row in session.query(NotificationPreference).filter(NotificationPreference.user_id.in_(changed))
+            }
+            for user_id, values in changed.items():
+                row = rows.get(user_id)
+                if row is None:
+                    row = NotificationPreference(user_id=user_id, timezone="UTC", email_enabled=True,
+                                                 sms_enabled=True, push_enabled=True)
+                    session.add(row)
+                    rows[user_id] = row
+                for field, value in values.items():
+                    setattr(row, field, value)
+            # Read before commit, which would expire the rows and reload them one by one
+            updated = {user_id: to_preferences(rows[user_id]) for user_id in changed}
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+        for user_id, preferences in updated.items():
+            self.cache.invalidate(user_id)
+            self.cache.set(user_id, preferences)
+        current.update(updated)
+        return current
+
+    def update(self, user_id: int, changes: Dict[str, Any]) -> UserPreferences:
+        """Apply a user's own changes, creating their preferences if needed"""
+        session = SessionLocal()
+        try:
+            row = session.get(NotificationPreference, user_id)
+            if row is None:
+                row = NotificationPreference(user_id=user_id, timezone="UTC", email_enabled=True,
+                                             sms_enabled=True, push_enabled=True)
+                session.add(row)
+            for field, value in changes.items():
+                if field in PREFERENCE_FIELDS:
+                    setattr(row, field, value)
+            preferences = to_preferences(row)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+        self.cache.invalidate(user_id)
+        self.cache.set(user_id, preferences)
+        return preferences
+
+
+preference_service = PreferenceService(LRUCache(
+    max_size=AppConfig.PREFERENCE_CACHE_MAX_SIZE,
+    ttl_seconds=AppConfig.PREFERENCE_CACHE_TTL_SECONDS,
+))
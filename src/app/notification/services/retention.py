@@ -0,0 +1,261 @@
+"""
+Notification retention: each NotificationType is kept for its own number of
+days, expired rows are archived and deleted in batches by RetentionJob.
+
+Run one pass by hand with:
+    python -m services.retention
+"""
+import asyncio
+import contextlib
+import gzip
+import json
+import logging
+import os
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, insert, select, text
+
+from config.config import AppConfig
+from database import SessionLocal, engine
+from domain.enum.not_type import NotificationType
+from models import Notification, NotificationArchive, PARTITIONED
+
+logger = logging.getLogger(__name__)
+
+# NotificationType also has a `values` member, these are the real ones
+NOTIFICATION_TYPES = (NotificationType.EMAIL, NotificationType.SMS, NotificationType.PUSH)
+
+
+def parse_retention(value: str) -> Dict[NotificationType, timedelta]:
+    """'EMAIL=365,SMS=90' -> days to keep per type, types left out are kept forever"""
+    policies = {}
+    for part in value.split(","):
+        if not part.strip():
+            continue
+        name, _, days = part.partition("=")
+        try:
+            notification_type = NotificationType[name.strip().upper()]
+            if notification_type not in NOTIFICATION_TYPES:
+                raise KeyError(name)
+            policies[notification_type] = timedelta(days=float(days))
+        except (KeyError, ValueError):
+            raise ValueError(f"Invalid retention '{part}', expected <EMAIL|SMS|PUSH>=<days>")
+    return policies
+
+
+def to_archive_record(row: Notification) -> Dict[str, Any]:
+    return {
+        "id": row.id,
+        "user_id": row.user_id,
+        "message": row.message,
+        "notification_type": row.notification_type.name,
+        "is_read": row.is_read,
+        "created_at": row.created_at,
+    }
+
+
+class FileArchive:
+    """One gzipped JSON lines file per batch, under <directory>/<type>/<yyyy-mm>/"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def write(self, session, records: List[Dict[str, Any]]):
+        first = records[0]
+        folder = os.path.join(self.directory, first["notification_type"].lower(), first["created_at"].strftime("%Y-%m"))
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"notifications-{first['id']}-{records[-1]['id']}.jsonl.gz")
+
+        # Written aside and renamed, so a crash never leaves a truncated archive behind.
+        # If the delete then fails, the same batch is written again to the same file.
+        tmp_path = path + ".tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps({**record, "created_at": record["created_at"].isoformat()}) + "\n")
+        os.replace(tmp_path, path)
+
+
+class TableArchive:
+    """Archived rows are inserted in the same transaction that deletes them"""
+
+    def write(self, session, records: List[Dict[str, Any]]):
+        session.execute(insert(NotificationArchive), records)
+
+
+class NoArchive:
+    def write(self, session, records: List[Dict[str, Any]]):
+        pass
+
+
+def create_archive(target: str, directory: str):
+    if target == "file":
+        return FileArchive(directory)
+    if target == "table":
+        return TableArchive()
+    if target == "none":
+        return NoArchive()
+    raise ValueError(f"Unknown NOTIFICATION_ARCHIVE_TARGET: {target}")
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def next_month(day: date) -> date:
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def partition_name(month: date) -> str:
+    return f"notifications_y{month.year}m{month.month:02d}"
+
+
+def ensure_partitions(months_ahead: int, today: Optional[date] = None):
+    """Create the monthly partitions up to `months_ahead` months from now, and a default one"""
+    month = month_start(today or date.today())
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE IF NOT EXISTS notifications_default PARTITION OF notifications DEFAULT"))
+        for _ in range(months_ahead + 1):
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF notifications "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month(month).isoformat()}')"
+            ))
+            month = next_month(month)
+
+
+def drop_expired_partitions(before: datetime) -> List[str]:
+    """Drop the monthly partitions ending before `before` that archival has emptied"""
+    dropped = []
+    with engine.begin() as conn:
+        names = conn.execute(text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON pg_inherits.inhparent = parent.oid "
+            "JOIN pg_class child ON pg_inherits.inhrelid = child.oid "
+            "WHERE parent.relname = 'notifications' AND child.relname LIKE 'notifications_y%'"
+        )).scalars().all()
+        for name in names:
+            month = date(int(name[len("notifications_y"):][:4]), int(name[-2:]), 1)
+            if datetime.combine(next_month(month), datetime.min.time()) > before:
+                continue
+            if conn.execute(text(f"SELECT 1 FROM {name} LIMIT 1")).first() is None:
+                conn.execute(text(f"DROP TABLE {name}"))
+                dropped.append(name)
+    return dropped
+
+
+class RetentionJob:
+    """
+    Moves expired notifications to the archive in batches of `batch_size`,
+    oldest first, each batch in its own short transaction so inserts and
+    inbox reads are never blocked for long. On a partitioned table, monthly
+    partitions are created ahead of time and dropped once archival emptied them.
+    """
+
+    def __init__(self, policies: Dict[NotificationType, timedelta], archive, batch_size: int = 1000,
+                 interval: float = 3600.0, partitions_ahead: int = 3):
+        self.policies = policies
+        self.archive = archive
+        self.batch_size = batch_size
+        self.interval = interval
+        self.partitions_ahead = partitions_ahead
+        self.task: Optional[asyncio.Task] = None
+
+        self.archived: Dict[str, int] = {notification_type.name: 0 for notification_type in policies}
+        self.last_run_at: Optional[datetime] = None
+
+    def archive_batch(self, notification_type: NotificationType, cutoff: datetime) -> int:
+        session = SessionLocal()
+        try:
+            query = (
+                select(Notification)
+                .where(Notification.notification_type == notification_type, Notification.created_at < cutoff)
+                .order_by(Notification.created_at, Notification.id)
+                .limit(self.batch_size)
+            )
+            if engine.dialect.name == "postgresql":
+                # Several replicas can run the job, each takes its own rows
+                query = query.with_for_update(skip_locked=True)
+            rows = session.execute(query).scalars().all()
+            if not rows:
+                return 0
+
+            records = [to_archive_record(row) for row in rows]
+            self.archive.write(session, records)
+            # created_at lets Postgres prune the partitions that can't hold these rows
+            session.execute(delete(Notification).where(
+                Notification.id.in_([record["id"] for record in records]),
+                Notification.created_at < cutoff,
+            ))
+            session.commit()
+            return len(records)
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def run_once(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        now = now or datetime.now()
+        archived = {}
+        for notification_type, keep_for in self.policies.items():
+            cutoff = now - keep_for
+            total = 0
+            while True:
+                count = self.archive_batch(notification_type, cutoff)
+                total += count
+                if count < self.batch_size:
+                    break
+            archived[notification_type.name] = total
+            self.archived[notification_type.name] += total
+
+        if PARTITIONED:
+            ensure_partitions(self.partitions_ahead, now.date())
+            # Partitions hold every type, only drop those past the longest retention
+            if all(notification_type in self.policies for notification_type in NOTIFICATION_TYPES):
+                for name in drop_expired_partitions(now - max(self.policies.values())):
+                    logger.info(f"Dropped empty partition {name}")
+
+        self.last_run_at = now
+        if any(archived.values()):
+            logger.info(f"Archived expired notifications: {archived}")
+        return archived
+
+    def start(self):
+        if self.task is None and self.policies:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.task
+            self.task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.run_once)
+            except Exception as e:
+                logger.error(f"❌ Retention job failed: {e}", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "policies_days": {t.name: keep_for.days for t, keep_for in self.policies.items()},
+            "archived": dict(self.archived),
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            "partitioned": PARTITIONED,
+        }
+
+
+retention_job = RetentionJob(
+    parse_retention(AppConfig.NOTIFICATION_RETENTION_DAYS),
+    create_archive(AppConfig.NOTIFICATION_ARCHIVE_TARGET, AppConfig.NOTIFICATION_ARCHIVE_DIR),
+    batch_size=AppConfig.RETENTION_BATCH_SIZE,
+    interval=AppConfig.RETENTION_INTERVAL_SECONDS,
+    partitions_ahead=AppConfig.NOTIFICATION_PARTITIONS_AHEAD,
+)
+
+
+if __name__ == "__main__":
+    print(retention_job.run_once())
@@ -0,0 +1,464 @@
+import asyncio
+import contextlib
+import heapq
+import logging
+import os
+import socket
+import uuid
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, false, func, or_, select, update
+
+from config.config import AppConfig
+from database import SessionLocal, engine
+from models import Notification, ScheduledNotification
+from .notification_service import NotificationService
+from .templates import template_registry
+
+logger = logging.getLogger(__name__)
+
+WORKER_ID = f"{socket.gethostname()}-{os.getpid()}"
+
+
+def utcnow() -> datetime:
+    """Naive UTC, the way due_at is stored"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def to_utc(at: datetime) -> datetime:
+    if at.tzinfo is None:
+        return at
+    return at.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def digest_due_at(at: datetime, window_seconds: float) -> datetime:
+    """End of the digest window containing `at`, so every item of a window shares a due time"""
+    at = to_utc(at)
+    epoch = datetime(1970, 1, 1)
+    windows = int((at - epoch).total_seconds() // window_seconds) + 1
+    return epoch + timedelta(seconds=windows * window_seconds)
+
+
+@dataclass(frozen=True)
+class ScheduledItem:
+    id: int
+    user_id: int
+    channel: str
+    event_type: str
+    locale: Optional[str]
+    context: Dict[str, Any]
+    digest_key: Optional[str]
+    due_at: datetime
+
+
+def group_key(row) -> Tuple:
+    """Items delivered together: a user's digest for one window, or the item alone"""
+    if row.digest_key:
+        return (row.user_id, row.channel, row.digest_key, row.due_at)
+    return ("item", row.id)
+
+
+def to_item(row: ScheduledNotification) -> ScheduledItem:
+    return ScheduledItem(
+        id=row.id,
+        user_id=row.user_id,
+        channel=row.channel,
+        event_type=row.event_type,
+        locale=row.locale,
+        context=dict(row.context or {}),
+        digest_key=row.digest_key,
+        due_at=row.due_at,
+    )
+
+
+class ScheduledQueue:
+    """
+    Notifications persisted with a due time. Several workers can claim from the
+    same table: Postgres uses FOR UPDATE SKIP LOCKED, SQLite a conditional
+    UPDATE tagged with a claim token, which its single writer serializes.
+    A digest is always claimed whole, by a single worker, so it goes out as one
+    message even when its items straddle the claim limit.
+    """
+
+    def __init__(self, claim_timeout: float = 300.0):
+        # Claimed items whose worker died are picked up again after this long
+        self.claim_timeout = claim_timeout
+        self.skip_locked = engine.dialect.name == "postgresql"
+        self._listeners: List[Any] = []
+
+    def add_listener(self, callback):
+        """`callback(item_id, due_at)` runs after every schedule(), the worker uses it to keep its heap current"""
+        self._listeners.append(callback)
+
+    def schedule(
+        self,
+        user_id: int,
+        channel: str,
+        event_type: str,
+        context: Dict[str, Any],
+        due_at: datetime,
+        locale: Optional[str] = None,
+        digest_key: Optional[str] = None,
+    ) -> int:
+        due_at = to_utc(due_at)
+        session = SessionLocal()
+        try:
+            row = ScheduledNotification(
+                user_id=user_id,
+                channel=channel.upper(),
+                event_type=event_type,
+                locale=locale,
+                context=context,
+                digest_key=digest_key,
+                due_at=due_at,
+                status="pending",
+                attempts=0,
+            )
+            session.add(row)
+            session.commit()
+            item_id = row.id
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+        for callback in self._listeners:
+            callback(item_id, due_at)
+        return item_id
+
+    def schedule_digest(
+        self,
+        user_id: int,
+        channel: str,
+        event_type: str,
+        context: Dict[str, Any],
+        digest_key: str,
+        window_seconds: float = AppConfig.DIGEST_WINDOW_SECONDS,
+        at: Optional[datetime] = None,
+        locale: Optional[str] = None,
+    ) -> int:
+        """Add an item to the user's digest for the current window"""
+        due_at = digest_due_at(at or utcnow(), window_seconds)
+        return self.schedule(user_id, channel, event_type, context, due_at, locale, digest_key)
+
+    def upcoming(self, until: datetime, limit: int) -> List[Tuple[datetime, int]]:
+        """(due_at, id) of pending items due before `until`, to fill the worker's heap"""
+        session = SessionLocal()
+        try:
+            rows = session.execute(
+                select(ScheduledNotification.due_at, ScheduledNotification.id)
+                .where(ScheduledNotification.status == "pending", ScheduledNotification.due_at <= until)
+                .order_by(ScheduledNotification.due_at)
+                .limit(limit)
+            ).all()
+        finally:
+            session.close()
+        return [(due_at, item_id) for due_at, item_id in rows]
+
+    def _claimable(self, now: datetime):
+        stale = now - timedelta(seconds=self.claim_timeout)
+        return and_(
+            ScheduledNotification.due_at <= now,
+            or_(
+                ScheduledNotification.status == "pending",
+                and_(ScheduledNotification.status == "claimed", ScheduledNotification.claimed_at < stale),
+            ),
+        )
+
+    @staticmethod
+    def _in_groups(keys) -> Any:
+        """Rows of the given digest groups"""
+        return or_(false(), *(
+            and_(
+                ScheduledNotification.user_id == user_id,
+                ScheduledNotification.channel == channel,
+                ScheduledNotification.digest_key == digest_key,
+                ScheduledNotification.due_at == due_at,
+            )
+            for user_id, channel, digest_key, due_at in keys
+        ))
+
+    def claim_due(self, limit: int, now: Optional[datetime] = None) -> List[ScheduledItem]:
+        """
+        Claim up to `limit` due items for this worker, oldest first, plus the
+        rest of any digest the limit cut through
+        """
+        now = now or utcnow()
+        session = SessionLocal()
+        try:
+            if self.skip_locked:
+                rows = session.scalars(
+                    select(ScheduledNotification)
+                    .where(self._claimable(now))
+                    .order_by(ScheduledNotification.due_at)
+                    .limit(limit)
+                    .with_for_update(skip_locked=True)
+                ).all()
+                # Only the worker holding a digest's advisory lock claims it, the
+                # others leave the rows they locked for it pending
+                digests = {group_key(row) for row in rows if row.digest_key}
+                locked = {
+                    key for key in digests
+                    if session.scalar(select(func.pg_try_advisory_xact_lock(zlib.crc32(repr(key).encode()))))
+                }
+                rows = [row for row in rows if not row.digest_key or group_key(row) in locked]
+                if locked:
+                    rows += session.scalars(
+                        select(ScheduledNotification)
+                        .where(self._claimable(now), self._in_groups(locked),
+                               ScheduledNotification.id.not_in([row.id for row in rows]))
+                        .with_for_update()
+                    ).all()
+                for row in rows:
+                    row.status = "claimed"
+                    row.claimed_by = WORKER_ID
+                    row.claimed_at = now
+                    row.attempts += 1
+                items = [to_item(row) for row in rows]
+                session.commit()
+                return items
+
+            rows = session.execute(
+                select(
+                    ScheduledNotification.id, ScheduledNotification.user_id, ScheduledNotification.channel,
+                    ScheduledNotification.digest_key, ScheduledNotification.due_at,
+                )
+                .where(self._claimable(now))
+                .order_by(ScheduledNotification.due_at)
+                .limit(limit)
+            ).all()
+            if not rows:
+                return []
+            ids = [row.id for row in rows if not row.digest_key]
+            digests = {group_key(row) for row in rows if row.digest_key}
+            token = f"{WORKER_ID}-{uuid.uuid4().hex}"
+            # Digests are matched by group, not by id, so one UPDATE takes all their items
+            session.execute(
+                update(ScheduledNotification)
+                .where(or_(ScheduledNotification.id.in_(ids), self._in_groups(digests)), self._claimable(now))
+                .values(
+                    status="claimed",
+                    claimed_by=token,
+                    claimed_at=now,
+                    attempts=ScheduledNotification.attempts + 1,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            session.commit()
+            rows = session.scalars(
+                select(ScheduledNotification)
+                .where(ScheduledNotification.claimed_by == token)
+                .order_by(ScheduledNotification.due_at)
+            ).all()
+            return [to_item(row) for row in rows]
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def complete(self, ids: List[int], status: str = "sent"):
+        if not ids:
+            return
+        session = SessionLocal()
+        try:
+            session.execute(
+                update(ScheduledNotification)
+                .where(ScheduledNotification.id.in_(ids))
+                .values(status=status)
+                .execution_options(synchronize_session=False)
+            )
+            session.commit()
+        finally:
+            session.close()
+
+    def stats(self) -> Dict[str, int]:
+        session = SessionLocal()
+        try:
+            rows = session.execute(
+                select(ScheduledNotification.status, func.count()).group_by(ScheduledNotification.status)
+            ).all()
+        finally:
+            session.close()
+        return {status: count for status, count in rows}
+
+
+def render_group(items: List[ScheduledItem]) -> Notification:
+    """One notification for a group of items, a digest when there is more than one"""
+    first = items[0]
+    if len(items) == 1:
+        body = template_registry.render(first.event_type, first.channel, first.context, locale=first.locale).body
+    else:
+        lines = [
+            template_registry.render(item.event_type, item.channel, item.context, locale=item.locale).body
+            for item in items
+        ]
+        body = template_registry.render(
+            "digest",
+            first.channel,
+            {"count": len(items), "items": "\n".join(f"- {line}" for line in lines)},
+            locale=first.locale,
+        ).body
+
+    return Notification(
+        notification_type=first.channel,
+        user_id=first.user_id,
+        message=body,
+        is_read=False,
+        created_at=datetime.now(),
+    )
+
+
+class SchedulerWorker:
+    """
+    Delivers scheduled notifications when they are due. Items due within
+    `horizon` seconds are kept in a min-heap so the worker sleeps exactly until
+    the next one instead of polling the table, the table is re-read every
+    `poll_interval` for items scheduled by other processes.
+    """
+
+    def __init__(
+        self,
+        queue: ScheduledQueue,
+        batch_size: int = 100,
+        horizon: float = 60.0,
+        poll_interval: float = 5.0,
+    ):
+        self.queue = queue
+        self.batch_size = batch_size
+        self.horizon = horizon
+        self.poll_interval = poll_interval
+
+        self._heap: List[Tuple[datetime, int]] = []
+        self._queued: set = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.task: Optional[asyncio.Task] = None
+
+        self.delivered = 0
+        self.digested = 0
+        self.failed = 0
+
+        queue.add_listener(self._on_scheduled)
+
+    def start(self):
+        if self.task is None:
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.task
+            self.task = None
+
+    def _push(self, due_at: datetime, item_id: int):
+        if item_id not in self._queued:
+            self._queued.add(item_id)
+            heapq.heappush(self._heap, (due_at, item_id))
+
+    def _on_scheduled(self, item_id: int, due_at: datetime):
+        if self._loop is None or due_at > utcnow() + timedelta(seconds=self.horizon):
+            return
+        # schedule() may run outside the event loop thread
+        self._loop.call_soon_threadsafe(self._push_and_wake, due_at, item_id)
+
+    def _push_and_wake(self, due_at: datetime, item_id: int):
+        earliest = self._heap[0][0] if self._heap else None
+        self._push(due_at, item_id)
+        if earliest is None or due_at < earliest:
+            self._wakeup.set()
+
+    async def _refill(self):
+        until = utcnow() + timedelta(seconds=self.horizon)
+        for due_at, item_id in await asyncio.to_thread(self.queue.upcoming, until, self.batch_size * 10):
+            self._push(due_at, item_id)
+
+    async def _run(self):
+        next_refill = utcnow()
+        while True:
+            try:
+                now = utcnow()
+                refill = now >= next_refill
+                if refill:
+                    await self._refill()
+                    next_refill = now + timedelta(seconds=self.poll_interval)
+
+                # Claiming on every refill also recovers items left claimed by a dead worker
+                if refill or (self._heap and self._heap[0][0] <= now):
+                    await self._deliver_due(now)
+
+                wake_at = next_refill
+                if self._heap:
+                    wake_at = min(wake_at, self._heap[0][0])
+                delay = max((wake_at - utcnow()).total_seconds(), 0.0)
+                self._wakeup.clear()
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Scheduler error: {e}", exc_info=True)
+                await asyncio.sleep(self.poll_interval)
+
+    async def _deliver_due(self, now: datetime):
+        while self._heap and self._heap[0][0] <= now:
+            _, item_id = heapq.heappop(self._heap)
+            self._queued.discard(item_id)
+
+        while True:
+            items = await asyncio.to_thread(self.queue.claim_due, self.batch_size, now)
+            if not items:
+                return
+            await self._deliver(items)
+            if len(items) < self.batch_size:
+                return
+
+    async def _deliver(self, items: List[ScheduledItem]):
+        groups: Dict[Tuple, List[ScheduledItem]] = {}
+        for item in items:
+            groups.setdefault(group_key(item), []).append(item)
+
+        notifications, sent, failed = [], [], []
+        for group in groups.values():
+            ids = [item.id for item in group]
+            try:
+                notifications.append(render_group(group))
+                sent.extend(ids)
+            except Exception as e:
+                logger.error(f"❌ Failed to render scheduled notifications {ids}: {e}")
+                failed.extend(ids)
+
+        if notifications:
+            await asyncio.to_thread(NotificationService.create_many, notifications)
+        await asyncio.to_thread(self.queue.complete, sent, "sent")
+        await asyncio.to_thread(self.queue.complete, failed, "failed")
+
+        self.delivered += len(notifications)
+        self.digested += len(sent) - len(notifications)
+        self.failed += len(failed)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "heap_size": len(self._heap),
+            "next_due_at": self._heap[0][0].isoformat() if self._heap else None,
+            "delivered": self.delivered,
+            "collapsed_by_digest": self.digested,
+            "failed": self.failed,
+            "queue": self.queue.stats(),
+        }
+
+
+scheduled_queue = ScheduledQueue(claim_timeout=AppConfig.SCHEDULER_CLAIM_TIMEOUT)
+scheduler_worker = SchedulerWorker(
+    scheduled_queue,
+    batch_size=AppConfig.SCHEDULER_BATCH_SIZE,
+    horizon=AppConfig.SCHEDULER_HORIZON_SECONDS,
+    poll_interval=AppConfig.SCHEDULER_POLL_INTERVAL,
+)
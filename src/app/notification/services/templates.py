@@ -0,0 +1,294 @@
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from string import Formatter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config.config import AppConfig
+from domain.entities.notification import SMSNotification
+from domain.exception import TemplateNotFoundError, TemplateRenderError
+
+logger = logging.getLogger(__name__)
+
+# Built-in templates, a templates file can override or extend them.
+DEFAULT_TEMPLATES = [
+    {
+        "event": "user_created",
+        "channel": "SMS",
+        "locale": "en",
+        "body": "Welcome {username}! Your account has been created.",
+    },
+    {
+        "event": "user_created",
+        "channel": "EMAIL",
+        "locale": "en",
+        "subject": "Welcome, {username}",
+        "body": "Hi {username},\n\nYour account has been created. You can now sign in with {email}.",
+    },
+    {
+        "event": "user_created",
+        "channel": "PUSH",
+        "locale": "en",
+        "subject": "Welcome!",
+        "body": "Welcome {username}! Your account has been created.",
+    },
+    {
+        "event": "user_created",
+        "channel": "SMS",
+        "locale": "fr",
+        "body": "Bienvenue {username} ! Votre compte a été créé.",
+    },
+    {
+        "event": "user_created",
+        "channel": "EMAIL",
+        "locale": "fr",
+        "subject": "Bienvenue, {username}",
+        "body": "Bonjour {username},\n\nVotre compte a été créé. Vous pouvez vous connecter avec {email}.",
+    },
+    {
+        "event": "digest",
+        "channel": "EMAIL",
+        "locale": "en",
+        "subject": "You have {count} new notifications",
+        "body": "Here is what happened since your last update:\n\n{items}",
+    },
+    {
+        "event": "digest",
+        "channel": "EMAIL",
+        "locale": "fr",
+        "subject": "Vous avez {count} nouvelles notifications",
+        "body": "Voici ce qui s'est passé depuis votre dernière mise à jour :\n\n{items}",
+    },
+    {
+        "event": "digest",
+        "channel": "SMS",
+        "locale": "en",
+        "body": "You have {count} new notifications.",
+    },
+    {
+        "event": "digest",
+        "channel": "PUSH",
+        "locale": "en",
+        "subject": "{count} new notifications",
+        "body": "You have {count} new notifications.",
+    },
+]
+
+# GSM 03.38 basic character set, anything outside it forces UCS-2 encoding.
+GSM7_CHARSET = frozenset(
+    "@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
+    "¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
+)
+# A concatenated SMS loses room in each part to the user data header.
+SMS_LIMITS = {"gsm7": (SMSNotification.MAX_LENGTH, 153), "ucs2": (70, 67)}
+
+
+def segment_sms(text: str) -> List[str]:
+    """Split a message into SMS parts, breaking on whitespace when possible"""
+    encoding = "gsm7" if all(char in GSM7_CHARSET for char in text) else "ucs2"
+    single, multipart = SMS_LIMITS[encoding]
+    if len(text) <= single:
+        return [text]
+
+    segments = []
+    while len(text) > multipart:
+        cut = text.rfind(" ", 0, multipart + 1)
+        if cut <= 0:
+            cut = multipart
+        segments.append(text[:cut])
+        text = text[cut:].lstrip(" ")
+    if text:
+        segments.append(text)
+    return segments
+
+
+class CompiledTemplate:
+    """A template string parsed once into literal and placeholder parts"""
+
+    __slots__ = ("source", "parts", "fields")
+
+    def __init__(self, source: str):
+        self.source = source
+        self.parts: List[Tuple[str, Optional[str], str]] = []
+        try:
+            for literal, field, spec, conversion in Formatter().parse(source):
+                if field is not None and (not field.isidentifier() or conversion):
+                    # Attribute and index lookups would let a template reach into the context objects
+                    raise TemplateRenderError(f"Unsupported placeholder {{{field}}} in template: {source!r}")
+                self.parts.append((literal, field, spec or ""))
+        except ValueError as e:
+            raise TemplateRenderError(f"Invalid template {source!r}: {e}") from e
+        self.fields = frozenset(field for _, field, _ in self.parts if field)
+
+    def render(self, context: Dict[str, Any]) -> str:
+        out = []
+        for literal, field, spec in self.parts:
+            out.append(literal)
+            if field is None:
+                continue
+            try:
+                value = context[field]
+            except KeyError:
+                raise TemplateRenderError(f"Missing value for {{{field}}} in template: {self.source!r}") from None
+            out.append(format(value, spec) if spec else str(value))
+        return "".join(out)
+
+
+@dataclass(frozen=True)
+class RenderedMessage:
+    channel: str
+    locale: str
+    body: str
+    subject: Optional[str] = None
+    # SMS bodies longer than one message, empty for the other channels
+    segments: Tuple[str, ...] = ()
+
+
+class NotificationTemplate:
+
+    __slots__ = ("event", "channel", "locale", "subject", "body")
+
+    def __init__(self, event: str, channel: str, locale: str, body: str, subject: Optional[str] = None):
+        self.event = event
+        self.channel = channel.upper()
+        self.locale = locale.lower()
+        self.body = CompiledTemplate(body)
+        self.subject = CompiledTemplate(subject) if subject else None
+
+    def render(self, context: Dict[str, Any]) -> RenderedMessage:
+        body = self.body.render(context)
+        subject = self.subject.render(context) if self.subject else None
+        segments = tuple(segment_sms(body)) if self.channel == "SMS" else ()
+        return RenderedMessage(self.channel, self.locale, body, subject, segments)
+
+
+def compile_templates(entries: Iterable[Dict[str, Any]]) -> Dict[Tuple[str, str, str], NotificationTemplate]:
+    templates = {}
+    for entry in entries:
+        template = NotificationTemplate(
+            event=entry["event"],
+            channel=entry["channel"],
+            locale=entry.get("locale", "en"),
+            body=entry["body"],
+            subject=entry.get("subject"),
+        )
+        templates[(template.event, template.channel, template.locale)] = template
+    return templates
+
+
+def load_templates_file(path: str) -> List[Dict[str, Any]]:
+    """Read template entries from a JSON list of {event, channel, locale, subject, body}"""
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+    if not isinstance(entries, list):
+        raise TemplateRenderError(f"{path} must contain a JSON list of templates")
+    return entries
+
+
+class TemplateRegistry:
+    """
+    Templates keyed by (event type, channel, locale), compiled once.
+    Locale lookups fall back from `fr-CA` to `fr` to the default locale, the
+    resolved template is cached so rendering is a dict lookup plus substitution.
+    """
+
+    def __init__(self, templates_file: Optional[str] = None, default_locale: str = "en"):
+        self.templates_file = templates_file
+        self.default_locale = default_locale.lower()
+
+        self._templates: Dict[Tuple[str, str, str], NotificationTemplate] = {}
+        self._resolved: Dict[Tuple[str, str, str], NotificationTemplate] = {}
+        self._mtime: Optional[float] = None
+        self._lock = threading.Lock()
+        self._loaded = False
+        self.task: Optional[asyncio.Task] = None
+
+    def reload(self):
+        """Recompile the templates, the previous set stays active if the file is invalid"""
+        entries = list(DEFAULT_TEMPLATES)
+        mtime = None
+        if self.templates_file and os.path.exists(self.templates_file):
+            mtime = os.path.getmtime(self.templates_file)
+            entries.extend(load_templates_file(self.templates_file))
+
+        templates = compile_templates(entries)
+        with self._lock:
+            self._templates = templates
+            self._resolved = {}
+            self._mtime = mtime
+            self._loaded = True
+        logger.info(f"Loaded {len(templates)} notification templates")
+
+    def reload_if_changed(self) -> bool:
+        if not self.templates_file or not self._loaded:
+            return False
+        mtime = os.path.getmtime(self.templates_file) if os.path.exists(self.templates_file) else None
+        if mtime == self._mtime:
+            return False
+        try:
+            self.reload()
+        except (OSError, ValueError, KeyError, TemplateRenderError) as e:
+            logger.error(f"Keeping previous templates, reload failed: {e}")
+            return False
+        return True
+
+    def get(self, event: str, channel: str, locale: Optional[str] = None) -> NotificationTemplate:
+        if not self._loaded:
+            # Compiled on first use rather than at import
+            self.reload()
+        key = (event, channel.upper(), (locale or self.default_locale).lower())
+        template = self._resolved.get(key)
+        if template is not None:
+            return template
+
+        event, channel, locale = key
+        candidates = [locale]
+        if "-" in locale:
+            candidates.append(locale.split("-", 1)[0])
+        candidates.append(self.default_locale)
+
+        templates = self._templates
+        for candidate in candidates:
+            template = templates.get((event, channel, candidate))
+            if template is not None:
+                self._resolved[key] = template
+                return template
+        raise TemplateNotFoundError(event, channel, locale)
+
+    def render(self, event: str, channel: str, context: Dict[str, Any], locale: Optional[str] = None) -> RenderedMessage:
+        return self.get(event, channel, locale).render(context)
+
+    def render_many(
+        self,
+        event: str,
+        channel: str,
+        contexts: Iterable[Dict[str, Any]],
+        locale: Optional[str] = None,
+    ) -> List[RenderedMessage]:
+        """Render one template for many recipients, for bulk sends"""
+        template = self.get(event, channel, locale)
+        return [template.render(context) for context in contexts]
+
+    def start(self, interval: float):
+        """Poll the templates file and hot reload it when it changes"""
+        if self.task is None and self.templates_file and interval > 0:
+            self.task = asyncio.create_task(self._watch(interval))
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.task
+            self.task = None
+
+    async def _watch(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            self.reload_if_changed()
+
+
+template_registry = TemplateRegistry(AppConfig.NOTIFICATION_TEMPLATES_FILE, AppConfig.DEFAULT_LOCALE)
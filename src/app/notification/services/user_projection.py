@@ -0,0 +1,100 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+from database import SessionLocal
+from domain.entities.user import UserProfile
+from models import UserProjection
+from .scheduler import to_utc
+
+PROFILE_FIELDS = ("username", "email", "full_name", "role", "is_active")
+
+
+def to_profile(row: UserProjection) -> UserProfile:
+    return UserProfile(user_id=row.user_id, **{field: getattr(row, field) for field in PROFILE_FIELDS})
+
+
+def parse_updated_at(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return to_utc(datetime.fromisoformat(value))
+    except ValueError:
+        return None
+
+
+class UserProjectionStore:
+    """
+    Users as published on the compacted users topic, so handlers look a user up
+    by primary key in the local database instead of asking the user service.
+    """
+
+    def get(self, user_id: int) -> Optional[UserProfile]:
+        return self.get_many([user_id]).get(user_id)
+
+    def get_many(self, user_ids: Iterable[int]) -> Dict[int, UserProfile]:
+        user_ids = set(user_ids)
+        if not user_ids:
+            return {}
+        session = SessionLocal()
+        try:
+            rows = session.query(UserProjection).filter(UserProjection.user_id.in_(user_ids)).all()
+            return {row.user_id: to_profile(row) for row in rows}
+        finally:
+            session.close()
+
+    def count(self) -> int:
+        session = SessionLocal()
+        try:
+            return session.query(UserProjection).count()
+        finally:
+            session.close()
+
+    def apply(self, snapshots: Dict[int, Optional[Dict[str, Any]]]) -> int:
+        """
+        Upsert the latest snapshot of each user in one transaction, a None
+        snapshot (tombstone) deletes the user. Returns the number of rows written.
+        """
+        if not snapshots:
+            return 0
+
+        session = SessionLocal()
+        try:
+            rows = {
+                row.user_id: row
+                for row in session.query(UserProjection).filter(UserProjection.user_id.in_(snapshots))
+            }
+            for user_id, snapshot in snapshots.items():
+                row = rows.get(user_id)
+                if snapshot is None:
+                    if row is not None:
+                        session.delete(row)
+                    continue
+                if row is None:
+                    row = UserProjection(user_id=user_id)
+                    session.add(row)
+                for field in PROFILE_FIELDS:
+                    if field in snapshot:
+                        setattr(row, field, snapshot[field])
+                row.updated_at = parse_updated_at(snapshot.get("updated_at"))
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+        return len(snapshots)
+
+    def clear(self):
+        """Drop every user, before replaying the topic from offset zero"""
+        session = SessionLocal()
+        try:
+            session.query(UserProjection).delete()
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+
+user_projection = UserProjectionStore()
@@ -0,0 +1,368 @@
+import functools
+import inspect
+import json
+import logging
+import os
+import queue
+import random
+import secrets
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT_HEADER = "traceparent"
+
+
+@dataclass(frozen=True)
+class SpanContext:
+    trace_id: str
+    span_id: str
+    sampled: bool = True
+
+    def to_traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[SpanContext]:
+    """Parse a W3C traceparent header, None if it is missing or malformed"""
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or parts[0] == "ff":
+        return None
+    trace_id, span_id, flags = parts[1].lower(), parts[2].lower(), parts[3]
+    try:
+        int(trace_id, 16), int(span_id, 16)
+        sampled = bool(int(flags, 16) & 0x01)
+    except ValueError:
+        return None
+    if trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    return SpanContext(trace_id, span_id, sampled)
+
+
+class Span:
+    __slots__ = ("name", "kind", "context", "parent_span_id", "service", "start_ns", "end_ns", "attributes", "status", "error")
+
+    def __init__(self, name: str, kind: str, context: SpanContext, parent_span_id: Optional[str], service: str,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.kind = kind
+        self.context = context
+        self.parent_span_id = parent_span_id
+        self.service = service
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.status = "ok"
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def record_exception(self, exc: BaseException):
+        self.status = "error"
+        self.error = f"{type(exc).__name__}: {exc}"
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.context.trace_id,
+            "span_id": self.context.span_id,
+            "parent_span_id": self.parent_span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "service": self.service,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "status": self.status,
+            "error": self.error,
+        }
+
+
+#########################################################################################
+
+class SpanExporter(ABC):
+
+    @abstractmethod
+    def export(self, span: Span):
+        """Export one finished span, must not block"""
+        pass
+
+    def shutdown(self):
+        pass
+
+
+class NoopSpanExporter(SpanExporter):
+
+    def export(self, span: Span):
+        pass
+
+
+class InMemorySpanExporter(SpanExporter):
+    """Keeps the last `max_spans` finished spans, for tests and benchmarks."""
+
+    def __init__(self, max_spans: int = 10000):
+        self.spans: deque = deque(maxlen=max_spans)
+
+    def export(self, span: Span):
+        self.spans.append(span.to_dict())
+
+    def finished_spans(self, trace_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        return [s for s in self.spans if trace_id is None or s["trace_id"] == trace_id]
+
+    def clear(self):
+        self.spans.clear()
+
+
+class LoggingSpanExporter(SpanExporter):
+
+    def export(self, span: Span):
+        logger.info(f"span {span.name} {span.duration_ms:.2f}ms trace={span.context.trace_id}")
+
+
+class FileSpanExporter(SpanExporter):
+    """Appends spans as JSON lines from a background thread."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="span-file-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span):
+        self._queue.put(span.to_dict())
+
+    def _run(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                f.write(json.dumps(item, default=str) + "\n")
+                # Drain whatever else is queued before flushing
+                while not self._queue.empty():
+                    item = self._queue.get()
+                    if item is None:
+                        f.flush()
+                        return
+                    f.write(json.dumps(item, default=str) + "\n")
+                f.flush()
+
+    def shutdown(self):
+        self._queue.put(None)
+        self._thread.join(timeout=2)
+
+
+def create_exporter(name: str, file_path: str = "traces.jsonl") -> SpanExporter:
+    exporters = {
+        "none": NoopSpanExporter,
+        "memory": InMemorySpanExporter,
+        "log": LoggingSpanExporter,
+    }
+    if name == "file":
+        return FileSpanExporter(file_path)
+    if name not in exporters:
+        raise ValueError(f"Unknown trace exporter '{name}', expected one of {list(exporters) + ['file']}")
+    return exporters[name]()
+
+
+#########################################################################################
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+
+    def __init__(self, service_name: str = "unknown", exporter: Optional[SpanExporter] = None, sample_rate: float = 1.0):
+        self.service_name = service_name
+        self.exporter = exporter or NoopSpanExporter()
+        self.sample_rate = sample_rate
+
+    def configure(self, service_name: str, exporter: SpanExporter, sample_rate: float = 1.0):
+        self.service_name = service_name
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+
+    @property
+    def enabled(self) -> bool:
+        return not isinstance(self.exporter, NoopSpanExporter)
+
+    @staticmethod
+    def current_span() -> Optional[Span]:
+        return _current_span.get()
+
+    @contextmanager
+    def start_span(self, name: str, kind: str = "internal", parent: Optional[SpanContext] = None,
+                   attributes: Optional[Dict[str, Any]] = None) -> Iterator[Span]:
+        """Start a child of `parent`, or of the current span, or a new trace"""
+        span = self.create_span(name, kind, parent, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            self.finish_span(span)
+
+    def traced(self, name: Optional[str] = None, kind: str = "internal"):
+        """Decorator wrapping a sync or async function in a span"""
+        def decorator(func):
+            span_name = name or func.__qualname__
+
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    with self.start_span(span_name, kind):
+                        return await func(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.start_span(span_name, kind):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def create_span(self, name: str, kind: str = "internal", parent: Optional[SpanContext] = None,
+                    attributes: Optional[Dict[str, Any]] = None) -> Span:
+        if parent is None:
+            current = _current_span.get()
+            parent = current.context if current else None
+
+        if parent is not None:
+            context = SpanContext(parent.trace_id, secrets.token_hex(8), parent.sampled)
+            parent_span_id = parent.span_id
+        else:
+            context = SpanContext(secrets.token_hex(16), secrets.token_hex(8), random.random() < self.sample_rate)
+            parent_span_id = None
+        return Span(name, kind, context, parent_span_id, self.service_name, attributes)
+
+    def finish_span(self, span: Span):
+        span.end()
+        if span.context.sampled:
+            try:
+                self.exporter.export(span)
+            except Exception as e:
+                logger.warning(f"Failed to export span {span.name}: {e}")
+
+    def current_traceparent(self) -> Optional[str]:
+        span = _current_span.get()
+        return span.context.to_traceparent() if span else None
+
+    def inject(self, headers: Dict[str, str]) -> Dict[str, str]:
+        """Set the traceparent of the current span on a header dict"""
+        traceparent = self.current_traceparent()
+        if traceparent:
+            headers[TRACEPARENT_HEADER] = traceparent
+        return headers
+
+
+tracer = Tracer()
+
+
+#########################################################################################
+
+class TracingMiddleware:
+    """
+    Pure ASGI middleware starting a server span per request, continuing the
+    caller's trace when a valid `traceparent` header is present.
+    """
+
+    def __init__(self, app, tracer: Tracer = tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        parent = None
+        for name, value in scope.get("headers", ()):
+            if name == b"traceparent":
+                parent = parse_traceparent(value.decode("latin-1"))
+                break
+
+        span = self.tracer.create_span(
+            f"{scope['method']} {scope['path']}",
+            kind="server",
+            parent=parent,
+            attributes={"http.method": scope["method"], "http.target": scope["path"]},
+        )
+        traceparent = span.context.to_traceparent().encode()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                span.set_attribute("http.status_code", message["status"])
+                if message["status"] >= 500:
+                    span.status = "error"
+                # Echo the trace id so clients can quote it
+                message["headers"] = list(message.get("headers", [])) + [(b"traceparent", traceparent)]
+            await send(message)
+
+        token = _current_span.set(span)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            route = scope.get("route")
+            if route is not None and getattr(route, "path", None):
+                span.name = f"{scope['method']} {route.path}"
+                span.set_attribute("http.route", route.path)
+            self.tracer.finish_span(span)
+
+
+def instrument_sqlalchemy(engine, tracer: Tracer = tracer):
+    """Wrap every statement executed on `engine` in a 'db' span"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _current_span.get() is None:
+            return
+        span = tracer.create_span(
+            statement.split(None, 1)[0].upper() if statement else "db",
+            kind="client",
+            attributes={"db.system": engine.dialect.name, "db.statement": statement[:500]},
+        )
+        conn.info.setdefault("trace_spans", []).append(span)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get("trace_spans")
+        if spans:
+            tracer.finish_span(spans.pop())
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        conn = exception_context.connection
+        spans = conn.info.get("trace_spans") if conn is not None else None
+        if spans:
+            span = spans.pop()
+            span.record_exception(exception_context.original_exception)
+            tracer.finish_span(span)
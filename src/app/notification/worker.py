@@ -0,0 +1,176 @@
+"""
+Consumer supervisor: runs the Kafka consumers in worker processes of their own,
+apart from the HTTP workers, so consumption can use every core of the node.
+
+    python worker.py [--workers N]
+
+Set CONSUMER_MODE=supervisor on the HTTP app so it doesn't consume as well.
+Worker <i> joins its groups as <KAFKA_GROUP_INSTANCE_ID or hostname>-<i>, a
+worker restarted within KAFKA_SESSION_TIMEOUT_MS gets its partitions back
+without a rebalance. SIGTERM and SIGINT drain the in-flight batches first.
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict
+
+from config.config import AppConfig
+
+logger = logging.getLogger("consumer-supervisor")
+
+# A worker that stays up this long has its restart backoff reset
+HEALTHY_AFTER_SECONDS = 60.0
+MAX_RESTART_DELAY = 30.0
+
+
+def configure_logging():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(processName)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler(sys.stdout)],
+    )
+
+
+def group_instance_id(index: int) -> str:
+    return f"{AppConfig.KAFKA_GROUP_INSTANCE_ID or socket.gethostname()}-{index}"
+
+
+async def run_consumers(index: int) -> int:
+    """Consume until told to stop, returns the process exit code"""
+    from database import engine
+    from events.consumer import create_consumers
+    from tracing import tracer, create_exporter, instrument_sqlalchemy
+
+    tracer.configure(
+        "notification-service",
+        create_exporter(AppConfig.TRACING_EXPORTER, AppConfig.TRACING_FILE),
+        sample_rate=AppConfig.TRACING_SAMPLE_RATE,
+    )
+    instrument_sqlalchemy(engine)
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stopping.set)
+
+    consumers = create_consumers(group_instance_id(index))
+    exit_code = 0
+    try:
+        for consumer in reversed(consumers):
+            await consumer.start()
+        logger.info(f"✅ Consumer worker {index} started as {group_instance_id(index)}")
+
+        # A consumer loop only ends on its own after an unexpected error,
+        # the supervisor then restarts the whole worker
+        stop_task = asyncio.create_task(stopping.wait())
+        await asyncio.wait([stop_task] + [consumer.task for consumer in consumers], return_when=asyncio.FIRST_COMPLETED)
+        if not stopping.is_set():
+            logger.error(f"❌ A consumer loop of worker {index} ended, exiting for a restart")
+            exit_code = 1
+        stop_task.cancel()
+    finally:
+        for consumer in consumers:
+            await consumer.stop()
+        tracer.exporter.shutdown()
+    return exit_code
+
+
+def worker_main(index: int):
+    configure_logging()
+    sys.exit(asyncio.run(run_consumers(index)))
+
+
+class ConsumerSupervisor:
+    """
+    Keeps `workers` consumer processes running, each with a fixed index so its
+    static group membership survives a restart. Dead workers are restarted
+    with an exponential backoff, on shutdown every worker gets SIGTERM and
+    `drain_timeout` seconds to finish its batches before being killed.
+    """
+
+    def __init__(self, workers: int, drain_timeout: float = AppConfig.KAFKA_DRAIN_TIMEOUT):
+        self.workers = workers
+        self.drain_timeout = drain_timeout
+        self.context = multiprocessing.get_context("spawn")
+        self.processes: Dict[int, multiprocessing.process.BaseProcess] = {}
+        self.started_at: Dict[int, float] = {}
+        self.failures: Dict[int, int] = {}
+        self.restart_at: Dict[int, float] = {}
+        self.stopping = False
+
+    def spawn(self, index: int):
+        process = self.context.Process(target=worker_main, args=(index,), name=f"consumer-{index}")
+        process.start()
+        self.processes[index] = process
+        self.started_at[index] = time.monotonic()
+
+    def request_stop(self, signum, frame):
+        logger.info(f"Received signal {signum}, draining consumer workers...")
+        self.stopping = True
+
+    def check_workers(self):
+        now = time.monotonic()
+        for index, process in self.processes.items():
+            if process.is_alive():
+                continue
+            if index not in self.restart_at:
+                if now - self.started_at[index] >= HEALTHY_AFTER_SECONDS:
+                    self.failures[index] = 0
+                self.failures[index] = self.failures.get(index, 0) + 1
+                delay = min(MAX_RESTART_DELAY, 2.0 ** (self.failures[index] - 1))
+                logger.warning(f"⚠️ Consumer worker {index} exited with code {process.exitcode}, restarting in {delay:.0f}s")
+                self.restart_at[index] = now + delay
+            elif now >= self.restart_at[index]:
+                del self.restart_at[index]
+                self.spawn(index)
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+
+        logger.info(f"🚀 Starting {self.workers} consumer workers, group {AppConfig.KAFKA_GROUP_ID}")
+        for index in range(self.workers):
+            self.spawn(index)
+
+        while not self.stopping:
+            time.sleep(0.5)
+            self.check_workers()
+        self.shutdown()
+
+    def shutdown(self):
+        for process in self.processes.values():
+            if process.is_alive():
+                process.terminate()
+
+        deadline = time.monotonic() + self.drain_timeout + 5
+        for index, process in self.processes.items():
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning(f"⚠️ Consumer worker {index} did not drain in time, killing it")
+                process.kill()
+                process.join()
+        logger.info("✅ Consumer workers stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the notification Kafka consumers in worker processes")
+    parser.add_argument(
+        "--workers", type=int, default=AppConfig.CONSUMER_WORKERS or os.cpu_count() or 1,
+        help="consumer processes, defaults to CONSUMER_WORKERS or one per CPU core",
+    )
+    args = parser.parse_args()
+
+    configure_logging()
+    # Only as many workers as the topic has partitions get any records, the user
+    # service keys events by user id so they spread over all of them
+    ConsumerSupervisor(max(1, args.workers)).run()
+
+
+if __name__ == "__main__":
+    main()
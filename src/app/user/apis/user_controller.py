@@ -1,38 +1,54 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import ORJSONResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Any, List
 
 from services.user import UserService
 from services.session import UserSessionService
-from domain.exception import UserNotFoundError
-from schema import UserCreateRequest, UserUpdateRequest, UserResponse, LoginRequest
+from services.auth import AuthService, issue_access_token
+from domain.exception import UserNotFoundError, InvalidSessionError, InvalidCredentialsError, UserInactiveError
+from schema import UserCreateRequest, UserUpdateRequest, UserResponse, LoginRequest, SessionTokenRequest
 from database import get_db
 
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 
+def trusted_response(content: Any, status_code: int = status.HTTP_200_OK) -> ORJSONResponse:
+    """
+    Service dicts are built from DB columns, returning a Response skips
+    validating them again against response_model (kept for the OpenAPI schema).
+    """
+    return ORJSONResponse(content=content, status_code=status_code)
+
+
 # Dependency to get UserService
 def get_user_service(db: Session = Depends(get_db)) -> UserService:
     return UserService(db)
 
+# Dependency to get AuthService
+def get_auth_service(db: Session = Depends(get_db)) -> AuthService:
+    return AuthService(db)
+
 # Dependency to get SessionService
 def get_session_service(db: Session = Depends(get_db)) -> UserSessionService:
     return UserSessionService(db)
 
+# Plain def: both reads query the DB (or a replica) in the threadpool, get_user on a cache miss
 @router.get("/", response_model=List[UserResponse])
-async def get_all_users(user_service: UserService = Depends(get_user_service)):
+def get_all_users(user_service: UserService = Depends(get_user_service)):
     """Get all users"""
-    return user_service.get_all()
+    return trusted_response(user_service.get_all())
 
 
 
 @router.get("/{user_id}", response_model=UserResponse)
-async def get_user(user_id: int, user_service: UserService = Depends(get_user_service)):
+def get_user(user_id: int, user_service: UserService = Depends(get_user_service)):
     """Get a user by ID"""
     try:
         user = user_service.get_by_id(user_id)
-        return user
+        return trusted_response(user)
     except UserNotFoundError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except Exception as e:
@@ -53,7 +69,7 @@ async def create_user(
         # Service handles business validation
         
         user = await user_service.create(**user_dict)
-        return user 
+        return trusted_response(user, status_code=status.HTTP_201_CREATED)
     except ValueError as e:  # Service validation errors
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
@@ -62,8 +78,9 @@ async def create_user(
 
 
 
+# Plain def: the DB writes, cache invalidation and event publishing run in the threadpool
 @router.put("/{user_id}", response_model=UserResponse)
-async def update_user(
+def update_user(
     user_id: int, 
     update_data: UserUpdateRequest,  # Use Pydantic validator instead of dict
     user_service: UserService = Depends(get_user_service)
@@ -79,7 +96,7 @@ async def update_user(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"User with id {user_id} not found"
             )
-        return updated_user
+        return trusted_response(updated_user)
         
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
@@ -89,7 +106,7 @@ async def update_user(
 
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_user(user_id: int, user_service: UserService = Depends(get_user_service)):
+def delete_user(user_id: int, user_service: UserService = Depends(get_user_service)):
     """Delete a user"""
     success = user_service.delete(user_id)
     if not success:
@@ -104,19 +121,42 @@ async def delete_user(user_id: int, user_service: UserService = Depends(get_user
 @router.post("/login")
 async def login_user(
     credentials: LoginRequest,  # Use Pydantic validator instead of dict
-    user_service: UserService = Depends(get_user_service),
+    auth_service: AuthService = Depends(get_auth_service),
     session_service: UserSessionService = Depends(get_session_service)
 ):
-    """Login a user and create a session"""
+    """Login a user, returning a JWT for the gateway and a session token"""
     try:
-        # Authentication logic would go here
-        # For now, placeholder
-        user_id = 1  # Replace with actual user ID from authentication
-        
-        # Create a session token
-        token = session_service.create_session(user_id)
-        
-        return {"token": token}
-        
-    except Exception as e:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
\ No newline at end of file
+        user = await auth_service.authenticate(credentials.username, credentials.password)
+    except (InvalidCredentialsError, UserInactiveError):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+
+    # Issued before create_session commits, which expires the loaded user
+    access_token = issue_access_token(user)
+    return {
+        **access_token,
+        "session_token": await run_in_threadpool(session_service.create_session, user.id),
+    }
+
+
+@router.post("/sessions/validate")
+def validate_session(
+    request: SessionTokenRequest,
+    session_service: UserSessionService = Depends(get_session_service)
+):
+    """Resolve a session token to its user, cached so most calls skip the DB"""
+    try:
+        user_session = session_service.validate(request.token)
+    except InvalidSessionError as e:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e))
+    return {"user_id": user_session.user_id, "expires_at": user_session.expires_at}
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+def logout_user(
+    request: SessionTokenRequest,
+    session_service: UserSessionService = Depends(get_session_service)
+):
+    """Revoke a session"""
+    if not session_service.revoke(request.token):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Session is invalid.")
+    return None
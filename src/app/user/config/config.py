@@ -13,6 +13,77 @@ class AppConfig:
     PORT = int(os.getenv('PORT', 8000))
     DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///./test.db')
     HOST = os.getenv('HOST', 'localhost')
-    
+
+    # Database pool, applied to the primary and every replica
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 5))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'True').lower() == 'true'
+
+    # Read replicas, comma separated. Read-only queries go to them round-robin, skipping
+    # replicas more than REPLICA_MAX_LAG_SECONDS behind, and rows written in the last
+    # READ_YOUR_WRITES_SECONDS are read from the primary
+    DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    REPLICA_MAX_LAG_SECONDS = float(os.getenv('REPLICA_MAX_LAG_SECONDS', 5))
+    REPLICA_LAG_CHECK_INTERVAL = float(os.getenv('REPLICA_LAG_CHECK_INTERVAL', 5))
+    READ_YOUR_WRITES_SECONDS = float(os.getenv('READ_YOUR_WRITES_SECONDS', 5))
+
+    # Kafka settings
+    KAFKA_BOOTSTRAP_SERVERS = os.getenv('KAFKA_BOOTSTRAP_SERVERS', 'kafka:9093')
+    KAFKA_USER_UPDATED_TOPIC = os.getenv('KAFKA_USER_UPDATED_TOPIC', 'user-updated')
+    # Log-compacted topic holding the latest snapshot of every user, keyed by user id
+    KAFKA_USERS_TOPIC = os.getenv('KAFKA_USERS_TOPIC', 'users')
+    # KAFKA_TRANSPORT is kafka, or memory for an in-process broker (local runs, tests, benchmarks)
+    KAFKA_TRANSPORT = os.getenv('KAFKA_TRANSPORT', 'kafka')
+    KAFKA_MEMORY_PARTITIONS = int(os.getenv('KAFKA_MEMORY_PARTITIONS', 1))
+    # Sends don't wait for the broker, pending messages get this long at shutdown
+    KAFKA_PRODUCER_FLUSH_TIMEOUT = float(os.getenv('KAFKA_PRODUCER_FLUSH_TIMEOUT', 5))
+
+    # Fluentd logging settings
+    FLUENTD_HOST = os.getenv('FLUENTD_HOST', 'fluentd')
+    FLUENTD_PORT = int(os.getenv('FLUENTD_PORT', 24224))
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+    LOG_BATCH_SIZE = int(os.getenv('LOG_BATCH_SIZE', 200))
+    LOG_FLUSH_INTERVAL = float(os.getenv('LOG_FLUSH_INTERVAL', 0.5))
+    LOG_OVERFLOW_POLICY = os.getenv('LOG_OVERFLOW_POLICY', 'drop_oldest')
+
+    # Request metrics and access log sampling
+    ACCESS_LOG_SAMPLE_RATE = float(os.getenv('ACCESS_LOG_SAMPLE_RATE', 0.01))
+    SLOW_REQUEST_THRESHOLD = float(os.getenv('SLOW_REQUEST_THRESHOLD', 1.0))
+
+    # /debug endpoints need an X-Debug-Token header equal to DEBUG_ADMIN_TOKEN, unset disables them
+    DEBUG_ADMIN_TOKEN = os.getenv('DEBUG_ADMIN_TOKEN', '')
+    LOOP_LAG_MONITOR_ENABLED = os.getenv('LOOP_LAG_MONITOR_ENABLED', 'True').lower() == 'true'
+    LOOP_LAG_THRESHOLD_MS = float(os.getenv('LOOP_LAG_THRESHOLD_MS', 100))
+
+    # Tracing: TRACING_EXPORTER is one of none, memory, log, file
+    TRACING_EXPORTER = os.getenv('TRACING_EXPORTER', 'none')
+    TRACING_FILE = os.getenv('TRACING_FILE', 'traces/user-service.jsonl')
+    TRACING_SAMPLE_RATE = float(os.getenv('TRACING_SAMPLE_RATE', 1.0))
+
+    # User lookup cache settings
+    USER_CACHE_MAX_SIZE = int(os.getenv('USER_CACHE_MAX_SIZE', 10000))
+    USER_CACHE_TTL_SECONDS = float(os.getenv('USER_CACHE_TTL_SECONDS', 60))
+    USER_CACHE_INVALIDATION_ENABLED = os.getenv('USER_CACHE_INVALIDATION_ENABLED', 'True').lower() == 'true'
+
+    # JWT settings, must match the gateway's JWT_SECRET_KEY and JWT_ALGORITHM
+    JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'your_secret_key')
+    JWT_ALGORITHM = os.getenv('JWT_ALGORITHM', 'HS256')
+    JWT_EXPIRATION_MINUTES = int(os.getenv('JWT_EXPIRATION_MINUTES', 60))
+
+    # Password hashing: argon2 parameters, and how many hashes may run at once
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 4))
+    ARGON2_TIME_COST = int(os.getenv('ARGON2_TIME_COST', 3))
+    ARGON2_MEMORY_COST = int(os.getenv('ARGON2_MEMORY_COST', 65536))
+    ARGON2_PARALLELISM = int(os.getenv('ARGON2_PARALLELISM', 1))
+
+    # Session settings
+    SESSION_TTL_SECONDS = int(os.getenv('SESSION_TTL_SECONDS', 86400))
+    SESSION_CACHE_MAX_SIZE = int(os.getenv('SESSION_CACHE_MAX_SIZE', 50000))
+    SESSION_CACHE_TTL_SECONDS = float(os.getenv('SESSION_CACHE_TTL_SECONDS', 30))
+    SESSION_SWEEP_INTERVAL = float(os.getenv('SESSION_SWEEP_INTERVAL', 300))
+    SESSION_SWEEP_BATCH_SIZE = int(os.getenv('SESSION_SWEEP_BATCH_SIZE', 1000))
+
 
 AppConfig = AppConfig()
\ No newline at end of file
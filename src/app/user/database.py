@@ -1,17 +1,237 @@
-from sqlalchemy import create_engine
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Generator, Hashable, Iterable, List, Optional
+
+from sqlalchemy import Delete, Insert, Update, create_engine, event, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
 
 from config.config import AppConfig
 
-# Create database engine
-engine = create_engine(
-    AppConfig.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in AppConfig.DATABASE_URL else {}
+logger = logging.getLogger(__name__)
+
+# Seconds a Postgres standby is behind, 0 when it has replayed all the WAL it received
+POSTGRES_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+def create_db_engine(url: str) -> Engine:
+    if "sqlite" in url:
+        return create_engine(url, connect_args={"check_same_thread": False})
+    return create_engine(
+        url,
+        pool_size=AppConfig.DB_POOL_SIZE,
+        max_overflow=AppConfig.DB_MAX_OVERFLOW,
+        pool_timeout=AppConfig.DB_POOL_TIMEOUT,
+        pool_recycle=AppConfig.DB_POOL_RECYCLE,
+        pool_pre_ping=AppConfig.DB_POOL_PRE_PING,
+    )
+
+
+def pool_stats(engine: Engine) -> Dict[str, Any]:
+    pool = engine.pool
+    stats = {"url": engine.url.render_as_string(hide_password=True), "pool": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        if callable(getattr(pool, name, None)):
+            stats[name] = getattr(pool, name)()
+    return stats
+
+
+class Replica:
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.lag: Optional[float] = None
+        self.healthy = True
+        self.error: Optional[str] = None
+        self.reads = 0
+
+
+class ReplicaRouter:
+    """
+    Picks the engine for read-only sessions: the replicas in turn, skipping those
+    more than `max_lag` seconds behind or unreachable, the primary when none is left.
+    A thread measures the lag every `check_interval`. Keys written in the last
+    `sticky_seconds` are read from the primary so a client sees its own writes.
+    """
+
+    def __init__(self, primary: Engine, replicas: List[Engine], max_lag: float, check_interval: float,
+                 sticky_seconds: float, max_sticky_keys: int = 100000):
+        self.primary = primary
+        self.replicas = [Replica(replica) for replica in replicas]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.sticky_seconds = sticky_seconds
+        self.max_sticky_keys = max_sticky_keys
+
+        self._next = itertools.count()
+        self._written: Dict[Hashable, float] = {}
+        self._lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+        self.fallback_reads = 0
+        self.sticky_reads = 0
+
+    def choose(self) -> Engine:
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            self.fallback_reads += 1
+            return self.primary
+        replica = healthy[next(self._next) % len(healthy)]
+        replica.reads += 1
+        return replica.engine
+
+    def mark_written(self, keys: Iterable[Hashable]):
+        if not self.replicas:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if len(self._written) >= self.max_sticky_keys:
+                self._written = {key: until for key, until in self._written.items() if until > now}
+            for key in keys:
+                self._written[key] = now + self.sticky_seconds
+
+    def recently_written(self, key: Optional[Hashable]) -> bool:
+        if key is None:
+            return False
+        until = self._written.get(key)
+        if until is not None and until > time.monotonic():
+            self.sticky_reads += 1
+            return True
+        return False
+
+    def check_lag(self):
+        for replica in self.replicas:
+            was_healthy = replica.healthy
+            try:
+                with replica.engine.connect() as conn:
+                    if replica.engine.dialect.name == "postgresql":
+                        replica.lag = float(conn.execute(POSTGRES_LAG_QUERY).scalar() or 0)
+                    else:
+                        conn.execute(text("SELECT 1"))
+                        replica.lag = 0.0
+                replica.error = None
+                replica.healthy = replica.lag <= self.max_lag
+            except Exception as e:
+                replica.error = str(e)
+                replica.healthy = False
+
+            if was_healthy and not replica.healthy:
+                logger.warning(f"Replica {replica.engine.url.host} taken out of reads, lag={replica.lag} error={replica.error}")
+            elif replica.healthy and not was_healthy:
+                logger.info(f"Replica {replica.engine.url.host} back in reads, lag={replica.lag}")
+
+    def start(self):
+        if self.thread is not None or not self.replicas:
+            return
+        self._stopped.clear()
+        self.thread = threading.Thread(target=self._run, name="replica-lag-check", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stopped.set()
+        if self.thread:
+            self.thread.join(timeout)
+            self.thread = None
+
+    def _run(self):
+        self.check_lag()
+        while not self._stopped.wait(self.check_interval):
+            self.check_lag()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "primary": pool_stats(self.primary),
+            "replicas": [
+                {**pool_stats(replica.engine), "healthy": replica.healthy, "lag_seconds": replica.lag,
+                 "error": replica.error, "reads": replica.reads}
+                for replica in self.replicas
+            ],
+            "fallback_reads": self.fallback_reads,
+            "sticky_reads": self.sticky_reads,
+        }
+
+
+# Create database engines
+engine = create_db_engine(AppConfig.DATABASE_URL)
+replica_router = ReplicaRouter(
+    engine,
+    [create_db_engine(url) for url in AppConfig.DATABASE_REPLICA_URLS],
+    max_lag=AppConfig.REPLICA_MAX_LAG_SECONDS,
+    check_interval=AppConfig.REPLICA_LAG_CHECK_INTERVAL,
+    sticky_seconds=AppConfig.READ_YOUR_WRITES_SECONDS,
 )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+class RoutingSession(Session):
+    """
+    Flushes, DML statements and every query outside `replica_reads` use the
+    primary. Queries inside it use one replica for the rest of the session.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self.info.get("replica") and not self._flushing and not isinstance(clause, (Insert, Update, Delete)):
+            if "replica_bind" not in self.info:
+                self.info["replica_bind"] = replica_router.choose()
+            return self.info["replica_bind"]
+        return replica_router.primary
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def remember_flushed_rows(session, flush_context):
+    written = session.info.setdefault("written", set())
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table:
+            written.update((table, (table, getattr(obj, "id", None))))
+    session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def remember_statement_writes(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        session = orm_execute_state.session
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None:
+            session.info.setdefault("written", set()).add(table.name)
+        session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def publish_writes(session):
+    replica_router.mark_written(session.info.pop("written", ()))
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def forget_writes(session):
+    session.info.pop("written", None)
+
+
+@contextmanager
+def replica_reads(session: Session, key: Optional[Hashable] = None) -> Generator[None, None, None]:
+    """
+    Send the queries of the block to a replica, unless this session has written
+    or `key` (a table name, or a (table, id) pair) was written recently
+    """
+    if (not replica_router.replicas or session.info.get("replica") or session.info.get("wrote")
+            or replica_router.recently_written(key)):
+        yield
+        return
+
+    session.info["replica"] = True
+    try:
+        yield
+    finally:
+        session.info["replica"] = False
+
+
+SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, bind=engine)
 
 # Base class for ORM models
 Base = declarative_base()
@@ -25,4 +245,4 @@ def get_db() -> Generator[Session, None, None]:
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
@@ -0,0 +1,275 @@
+"""
+Debug endpoints for looking inside a running service: a sampling CPU profiler,
+an asyncio task dump, tracemalloc snapshots and an event loop lag monitor.
+Every endpoint needs an X-Debug-Token header matching the configured admin
+token, and none of them is served when no token is configured.
+"""
+import asyncio
+import contextlib
+import hmac
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+logger = logging.getLogger(__name__)
+
+MAX_PROFILE_SECONDS = 60.0
+# Top frame of an event loop waiting for I/O
+SELECTOR_WAIT = "select (selectors.py"
+# Top frames of threads that are waiting rather than working
+IDLE_FRAMES = (SELECTOR_WAIT, "wait (threading.py", "get (queue.py", "_worker (thread.py")
+
+
+def format_frame(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def frame_stack(frame) -> List[str]:
+    """Function names from the outermost call to `frame`"""
+    stack = []
+    while frame is not None:
+        stack.append(format_frame(frame.f_code))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+class SamplingProfiler:
+    """
+    Samples the stack of every thread each `interval` seconds. The result is in
+    collapsed-stack format, one `thread;outer;...;inner count` line per stack,
+    as read by flamegraph.pl and speedscope. One profile runs at a time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def profile(self, seconds: float, interval: float = 0.005, include_idle: bool = False) -> str:
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("A profile is already running")
+        try:
+            own = threading.get_ident()
+            names: Dict[int, str] = {}
+            counts: Counter = Counter()
+            deadline = time.perf_counter() + seconds
+            while time.perf_counter() < deadline:
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own:
+                        continue
+                    stack = frame_stack(frame)
+                    if not include_idle and stack and stack[-1].startswith(IDLE_FRAMES):
+                        continue
+                    if thread_id not in names:
+                        names = {thread.ident: thread.name for thread in threading.enumerate()}
+                    counts[";".join([names.get(thread_id, str(thread_id))] + stack)] += 1
+                time.sleep(interval)
+        finally:
+            self._lock.release()
+        return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+
+def dump_tasks(stack_limit: int = 20) -> List[Dict[str, Any]]:
+    """Every pending asyncio task with where it is suspended, must run on the loop"""
+    tasks = []
+    for task in asyncio.all_tasks():
+        coro = task.get_coro()
+        tasks.append({
+            "name": task.get_name(),
+            "coro": getattr(coro, "__qualname__", repr(coro)),
+            "stack": [
+                f"{format_frame(frame.f_code)} line {frame.f_lineno}"
+                for frame in task.get_stack(limit=stack_limit)
+            ],
+        })
+    return sorted(tasks, key=lambda task: task["name"])
+
+
+def start_memory_tracing(frames: int = 25) -> Dict[str, Any]:
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start(frames)
+    return {"tracing": True, "started": started}
+
+
+def memory_snapshot(limit: int = 20, key_type: str = "lineno") -> Dict[str, Any]:
+    """Top allocations since tracing was started"""
+    if not tracemalloc.is_tracing():
+        return {"tracing": False, "top": []}
+
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "tracing": True,
+        "current_bytes": current,
+        "peak_bytes": peak,
+        "top": [
+            {"location": str(stat.traceback[0]), "size_bytes": stat.size, "count": stat.count}
+            for stat in snapshot.statistics(key_type)[:limit]
+        ],
+    }
+
+
+class LoopLagMonitor:
+    """
+    Warns when the event loop is blocked for longer than `threshold` seconds.
+    A coroutine renews a heartbeat every `interval`, a watchdog thread notices
+    when it stops and logs the loop thread's stack while the loop is still
+    blocked, which names the sync call responsible.
+    """
+
+    def __init__(self, threshold: float = 0.1, interval: float = 0.02, max_stalls: int = 50):
+        self.threshold = threshold
+        self.interval = interval
+
+        self.max_lag = 0.0
+        self.stalls_total = 0
+        self.stalls: Deque[Dict[str, Any]] = deque(maxlen=max_stalls)
+
+        self._heartbeat = time.perf_counter()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._heartbeat = time.perf_counter()
+        self._task = asyncio.create_task(self._beat(), name="loop-lag-monitor")
+        self._thread = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        self._running = False
+        if self._task:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        if self._thread:
+            self._thread.join(1.0)
+            self._thread = None
+
+    async def _beat(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            self.max_lag = max(self.max_lag, now - expected)
+            self._heartbeat = now
+
+    def _current_task_name(self) -> Optional[str]:
+        try:
+            task = asyncio.current_task(self._loop)
+        except RuntimeError:
+            return None
+        return task.get_name() if task else None
+
+    def _watch(self):
+        stall: Optional[Dict[str, Any]] = None
+        while self._running:
+            time.sleep(self.interval)
+            heartbeat = self._heartbeat
+            blocked = time.perf_counter() - heartbeat
+            if blocked <= self.threshold:
+                stall = None
+                continue
+            if stall is not None:
+                stall["blocked_ms"] = round(blocked * 1000, 1)
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread)
+            stack = frame_stack(frame) if frame is not None else []
+            # The loop caught up between the check and the sample, or is back
+            # waiting in its selector: the stack would not show the blocking call
+            if self._heartbeat != heartbeat or (stack and stack[-1].startswith(SELECTOR_WAIT)):
+                continue
+            stall = {
+                "at": time.time(),
+                "blocked_ms": round(blocked * 1000, 1),
+                "task": self._current_task_name(),
+                "stack": stack,
+            }
+            self.stalls.append(stall)
+            self.stalls_total += 1
+            logger.warning(
+                f"Event loop blocked for over {self.threshold * 1000:.0f}ms in task {stall['task']}: "
+                + " <- ".join(reversed(stack[-8:]))
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self._running,
+            "threshold_ms": self.threshold * 1000,
+            "max_lag_ms": round(self.max_lag * 1000, 3),
+            "stalls_total": self.stalls_total,
+            "recent_stalls": list(self.stalls),
+        }
+
+
+profiler = SamplingProfiler()
+
+
+def create_debug_router(admin_token: str, monitor: Optional[LoopLagMonitor] = None) -> APIRouter:
+
+    def require_admin(x_debug_token: str = Header(default="")):
+        if not admin_token:
+            raise HTTPException(status_code=404, detail="Not Found")
+        if not hmac.compare_digest(x_debug_token.encode(), admin_token.encode()):
+            raise HTTPException(status_code=403, detail="Invalid debug token")
+
+    router = APIRouter(prefix="/debug", tags=["debug"], dependencies=[Depends(require_admin)], include_in_schema=False)
+
+    @router.get("/profile", response_class=PlainTextResponse)
+    async def cpu_profile(
+        seconds: float = Query(10.0, gt=0, le=MAX_PROFILE_SECONDS),
+        interval_ms: float = Query(5.0, ge=1, le=1000),
+        include_idle: bool = False,
+    ):
+        """Collapsed stacks sampled over `seconds`, taken off the event loop"""
+        try:
+            return await asyncio.to_thread(profiler.profile, seconds, interval_ms / 1000, include_idle)
+        except RuntimeError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+
+    @router.get("/tasks")
+    async def tasks():
+        return dump_tasks()
+
+    @router.post("/memory")
+    def start_memory(frames: int = Query(25, ge=1, le=100)):
+        """Tracing slows every allocation down, it runs until DELETE /debug/memory"""
+        return start_memory_tracing(frames)
+
+    @router.get("/memory")
+    async def memory(
+        limit: int = Query(20, ge=1, le=500),
+        key_type: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+    ):
+        return await asyncio.to_thread(memory_snapshot, limit, key_type)
+
+    @router.delete("/memory")
+    def stop_memory_tracing():
+        tracemalloc.stop()
+        return {"tracing": False}
+
+    @router.get("/loop")
+    def loop_lag():
+        return monitor.stats() if monitor else {"enabled": False}
+
+    return router
@@ -1,8 +1,12 @@
-from pydantic import BaseModel
+from dataclasses import dataclass
+from datetime import datetime
 
-class UserSession(BaseModel):
-    def __init__(self,user_id:int,token:str):
-        self.user_id=user_id
-        self.token=token
 
-    
\ No newline at end of file
+@dataclass(frozen=True)
+class UserSession:
+    id: int
+    user_id: int
+    expires_at: datetime
+
+    def is_expired(self, now: datetime) -> bool:
+        return self.expires_at <= now
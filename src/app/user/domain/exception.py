@@ -23,3 +23,12 @@ class UserInactiveError(Exception):
         super().__init__(f"User with username '{username}' is inactive.")
 
 
+class InvalidSessionError(Exception):
+    def __init__(self, reason: str = "invalid"):
+        self.reason = reason
+        super().__init__(f"Session is {reason}.")
+
+
+class InvalidCredentialsError(Exception):
+    def __init__(self):
+        super().__init__("Invalid username or password.")
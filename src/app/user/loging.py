@@ -1,11 +1,191 @@
+import atexit
 import logging
-from fluent import sender
-from fluent import event
-import json
+import socket
+import sys
+import threading
+import time
+from collections import deque
 from datetime import datetime
 
+from config.config import AppConfig
+
+
+class AsyncFluentSender:
+    """
+    Drop-in replacement for fluent.sender.FluentSender that never blocks the caller.
+    Records go to a bounded in-memory queue, a background thread packs them with
+    msgpack and ships them to Fluentd in batches (forward protocol).
+    """
+
+    OVERFLOW_POLICIES = ("drop_oldest", "block")
+
+    def __init__(
+        self,
+        tag_prefix: str,
+        host: str = 'localhost',
+        port: int = 24224,
+        max_queue_size: int = 10000,
+        batch_size: int = 200,
+        flush_interval: float = 0.5,
+        overflow_policy: str = 'drop_oldest',
+        block_timeout: float = 0.05,
+        socket_timeout: float = 3.0,
+    ):
+        if overflow_policy not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"overflow_policy must be one of {self.OVERFLOW_POLICIES}")
+
+        self.tag_prefix = tag_prefix
+        self.host = host
+        self.port = port
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+        self.socket_timeout = socket_timeout
+
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._socket = None
+        self._thread = None
+        self._running = False
+        self._last_error_report = 0.0
+
+        self.queued = 0
+        self.sent = 0
+        self.dropped = 0
+        self.send_errors = 0
+
+    def emit(self, label: str, data: dict) -> bool:
+        """Queue a record, returns False if it (or an older one) had to be dropped"""
+        self._ensure_started()
+        # Accept both full tags ('user-service.api') and labels ('api')
+        tag = label if label.startswith(f"{self.tag_prefix}.") else f"{self.tag_prefix}.{label}"
+        item = (tag, int(time.time()), data)
+
+        with self._cond:
+            dropped = False
+            if len(self._queue) >= self.max_queue_size:
+                if self.overflow_policy == 'block':
+                    # Bounded wait so a stuck Fluentd can never stall a request for long
+                    self._cond.wait_for(lambda: len(self._queue) < self.max_queue_size, self.block_timeout)
+                if len(self._queue) >= self.max_queue_size:
+                    self._queue.popleft()
+                    self.dropped += 1
+                    dropped = True
+
+            self._queue.append(item)
+            self.queued += 1
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify_all()
+        return not dropped
+
+    def _ensure_started(self):
+        if self._running:
+            return
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="fluent-sender", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._running and len(self._queue) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                if not self._running and not self._queue:
+                    break
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                # Wake up emitters waiting for room
+                self._cond.notify_all()
+
+            if batch:
+                self._send_batch(batch)
+        self._close_socket()
+
+    def _send_batch(self, batch: list):
+        import msgpack
+
+        # Forward mode: one [tag, [[time, record], ...]] message per tag
+        entries_by_tag = {}
+        for tag, timestamp, record in batch:
+            entries_by_tag.setdefault(tag, []).append([timestamp, record])
+        payload = b"".join(
+            msgpack.packb([tag, entries], default=str)
+            for tag, entries in entries_by_tag.items()
+        )
+
+        # One reconnect attempt, then the batch is dropped rather than piling up
+        for attempt in range(2):
+            try:
+                if self._socket is None:
+                    self._socket = socket.create_connection((self.host, self.port), timeout=self.socket_timeout)
+                self._socket.sendall(payload)
+                self.sent += len(batch)
+                return
+            except OSError as e:
+                self._close_socket()
+                error = e
+
+        self.send_errors += 1
+        self.dropped += len(batch)
+        self._report_error(error)
+        # Back off a little so an unreachable Fluentd doesn't spin the thread
+        time.sleep(min(self.flush_interval, 1.0))
+
+    def _report_error(self, error: Exception):
+        now = time.monotonic()
+        if now - self._last_error_report >= 60:
+            self._last_error_report = now
+            print(
+                f"[loging] Fluentd {self.host}:{self.port} unreachable ({error}), "
+                f"{self.dropped} records dropped so far",
+                file=sys.stderr,
+            )
+
+    def _close_socket(self):
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            except OSError:
+                pass
+            self._socket = None
+
+    def close(self, timeout: float = 2.0):
+        """Flush what is queued and stop the background thread"""
+        if not self._running:
+            return
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        return {
+            "queue_size": len(self._queue),
+            "max_queue_size": self.max_queue_size,
+            "overflow_policy": self.overflow_policy,
+            "queued": self.queued,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "send_errors": self.send_errors,
+        }
+
+
 # Configure Fluentd sender
-fluent_sender = sender.FluentSender('user-service', host='fluentd', port=24224)
+fluent_sender = AsyncFluentSender(
+    'user-service',
+    host=AppConfig.FLUENTD_HOST,
+    port=AppConfig.FLUENTD_PORT,
+    max_queue_size=AppConfig.LOG_QUEUE_SIZE,
+    batch_size=AppConfig.LOG_BATCH_SIZE,
+    flush_interval=AppConfig.LOG_FLUSH_INTERVAL,
+    overflow_policy=AppConfig.LOG_OVERFLOW_POLICY,
+)
+atexit.register(fluent_sender.close)
 
 class FluentHandler(logging.Handler):
     def __init__(self, tag_prefix='user-service'):
@@ -34,8 +214,8 @@ class FluentHandler(logging.Handler):
             fluent_sender.emit(tag, log_data)
             
         except Exception:
-            # Fallback to console if Fluentd is unavailable
-            pass
+            # Formatting errors only, delivery problems are counted by the sender
+            self.handleError(record)
 
 # Configure logging
 logging.basicConfig(
@@ -1,23 +1,80 @@
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from fastapi.routing import APIRouter
+from contextlib import asynccontextmanager
 from config.config import AppConfig
 
 from apis.user_controller import router as user_router
-from database import engine, Base
-from loging import log_user_action
+from database import engine, replica_router
+from loging import log_user_action, log_api_request, fluent_sender
+from middleware.timing_middleware import TimingMiddleware, RequestMetrics
+from tracing import tracer, create_exporter, instrument_sqlalchemy, TracingMiddleware
+from services.cache import user_cache, session_cache
+from services.cache_invalidation import invalidation_listener
+from services.session import session_sweeper
+from services.password import password_hasher
+from debug import LoopLagMonitor, create_debug_router
+from producer import flush_producer
 
 router = APIRouter()
 
+tracer.configure(
+    "user-service",
+    create_exporter(AppConfig.TRACING_EXPORTER, AppConfig.TRACING_FILE),
+    sample_rate=AppConfig.TRACING_SAMPLE_RATE,
+)
+instrument_sqlalchemy(engine)
+for replica in replica_router.replicas:
+    instrument_sqlalchemy(replica.engine)
+request_metrics = RequestMetrics("user-service")
+loop_monitor = LoopLagMonitor(threshold=AppConfig.LOOP_LAG_THRESHOLD_MS / 1000)
+
+
+def access_log(entry: dict):
+    log_api_request(entry["method"], entry["path"], entry["status"], duration=round(entry["duration_ms"], 3))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop background workers"""
+    # With the in-memory transport there are no other replicas to hear from
+    if AppConfig.USER_CACHE_INVALIDATION_ENABLED and AppConfig.KAFKA_TRANSPORT == "kafka":
+        invalidation_listener.start()
+    session_sweeper.start()
+    replica_router.start()
+    if AppConfig.LOOP_LAG_MONITOR_ENABLED:
+        loop_monitor.start()
+
+    yield
+
+    await loop_monitor.stop()
+    invalidation_listener.stop()
+    session_sweeper.stop()
+    replica_router.stop()
+    password_hasher.shutdown()
+    flush_producer(AppConfig.KAFKA_PRODUCER_FLUSH_TIMEOUT)
+    tracer.exporter.shutdown()
+
+
 app = FastAPI(
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
     docs_url="/docs" if AppConfig.DEBUG else None,
     redoc_url="/redoc" if AppConfig.DEBUG else None,
     openapi_url="/openapi.json" if AppConfig.DEBUG else None
 )
 
-# appply all the migrations
-Base.metadata.create_all(bind=engine)
+app.add_middleware(
+    TimingMiddleware,
+    metrics=request_metrics,
+    access_log=access_log,
+    sample_rate=AppConfig.ACCESS_LOG_SAMPLE_RATE,
+    slow_request_threshold=AppConfig.SLOW_REQUEST_THRESHOLD,
+)
+app.add_middleware(TracingMiddleware)
 
 app.include_router(router=user_router)
+app.include_router(router=create_debug_router(AppConfig.DEBUG_ADMIN_TOKEN, loop_monitor))
 
 @app.get("/")
 def health_check():
@@ -28,6 +85,39 @@ def health_check():
     } 
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Request latency histograms in Prometheus format"""
+    return request_metrics.render_prometheus()
+
+
+@app.get("/metrics/summary")
+def metrics_summary():
+    """p50/p90/p99 latency per route"""
+    return request_metrics.summary()
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    """User lookup and session cache statistics"""
+    return {
+        "users": user_cache.stats(),
+        "sessions": {**session_cache.stats(), "swept": session_sweeper.removed},
+    }
+
+
+@app.get("/db/stats")
+def db_stats():
+    """Connection pools of the primary and replicas, replica lag and read routing"""
+    return replica_router.stats()
+
+
+@app.get("/logging/stats")
+def logging_stats():
+    """Fluentd log pipeline counters"""
+    return fluent_sender.stats()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -35,4 +125,4 @@ if __name__ == "__main__":
         host=AppConfig.HOST,
         port=AppConfig.PORT,
         reload=True
-    )
\ No newline at end of file
+    )
@@ -0,0 +1,246 @@
+"""
+In-memory stand-in for a Kafka cluster, for local runs, tests and benchmarks.
+
+Topics are partitioned append-only logs. Consumers in the same group share the
+partitions of a topic and commit offsets per partition, the API mirrors the
+subset of aiokafka's AIOKafkaConsumer the services use (start, stop, getmany,
+commit, seek_to_beginning, async iteration).
+"""
+import asyncio
+import threading
+import time
+import zlib
+from collections import namedtuple
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+TopicPartition = namedtuple("TopicPartition", ["topic", "partition"])
+
+
+@dataclass
+class ConsumerRecord:
+    topic: str
+    partition: int
+    offset: int
+    timestamp: int
+    key: Optional[bytes]
+    value: Any
+    headers: List[Tuple[str, bytes]] = field(default_factory=list)
+
+
+class InMemoryBroker:
+
+    def __init__(self, default_partitions: int = 1):
+        self.default_partitions = default_partitions
+        self._logs: Dict[str, List[List[ConsumerRecord]]] = {}
+        # group -> TopicPartition -> next offset to read
+        self._committed: Dict[str, Dict[TopicPartition, int]] = {}
+        # group -> topic -> member consumers, in join order
+        self._members: Dict[str, Dict[str, List["InMemoryConsumer"]]] = {}
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._lock = threading.Lock()
+
+    def create_topic(self, topic: str, partitions: Optional[int] = None):
+        with self._lock:
+            if topic not in self._logs:
+                self._logs[topic] = [[] for _ in range(partitions or self.default_partitions)]
+
+    def partitions_for(self, topic: str) -> int:
+        self.create_topic(topic)
+        return len(self._logs[topic])
+
+    def produce(self, topic: str, key: Optional[bytes], value: bytes,
+                headers: Optional[List[Tuple[str, bytes]]] = None, partition: Optional[int] = None) -> ConsumerRecord:
+        """Append a record, keyed records always land on the same partition. Thread-safe."""
+        self.create_topic(topic)
+        with self._lock:
+            partitions = self._logs[topic]
+            if partition is None:
+                partition = zlib.crc32(key) % len(partitions) if key is not None else 0
+            log = partitions[partition]
+            record = ConsumerRecord(topic, partition, len(log), int(time.time() * 1000), key, value, list(headers or []))
+            log.append(record)
+            waiters, self._waiters = self._waiters, []
+
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(_wake, waiter)
+        return record
+
+    def read(self, tp: TopicPartition, offset: int, max_records: int) -> List[ConsumerRecord]:
+        return self._logs[tp.topic][tp.partition][offset:offset + max_records]
+
+    def end_offset(self, tp: TopicPartition) -> int:
+        return len(self._logs[tp.topic][tp.partition])
+
+    def committed(self, group_id: str, tp: TopicPartition) -> Optional[int]:
+        return self._committed.get(group_id, {}).get(tp)
+
+    def commit(self, group_id: str, offsets: Dict[TopicPartition, int]):
+        with self._lock:
+            self._committed.setdefault(group_id, {}).update(offsets)
+
+    def lag(self, group_id: str, topic: str) -> int:
+        """Records of `topic` not yet committed by `group_id`"""
+        total = 0
+        for partition in range(self.partitions_for(topic)):
+            tp = TopicPartition(topic, partition)
+            total += self.end_offset(tp) - (self.committed(group_id, tp) or 0)
+        return total
+
+    def join(self, consumer: "InMemoryConsumer"):
+        with self._lock:
+            for topic in consumer.topics:
+                self._members.setdefault(consumer.group_id, {}).setdefault(topic, []).append(consumer)
+        self._rebalance(consumer.group_id, consumer.topics)
+
+    def leave(self, consumer: "InMemoryConsumer"):
+        with self._lock:
+            for topic in consumer.topics:
+                members = self._members.get(consumer.group_id, {}).get(topic, [])
+                if consumer in members:
+                    members.remove(consumer)
+        self._rebalance(consumer.group_id, consumer.topics)
+
+    def _rebalance(self, group_id: str, topics: Tuple[str, ...]):
+        """Round robin partitions over the members of the group"""
+        for topic in topics:
+            members = self._members.get(group_id, {}).get(topic, [])
+            for member in members:
+                member._assign(topic, [])
+            for partition in range(self.partitions_for(topic)):
+                if members:
+                    members[partition % len(members)]._add_partition(TopicPartition(topic, partition))
+
+    async def wait_for_records(self, timeout: float):
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        with self._lock:
+            self._waiters.append((loop, waiter))
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+def _wake(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class InMemoryConsumer:
+
+    def __init__(
+        self,
+        *topics: str,
+        broker: InMemoryBroker,
+        group_id: Optional[str] = None,
+        value_deserializer: Optional[Callable[[bytes], Any]] = None,
+        auto_offset_reset: str = "latest",
+        enable_auto_commit: bool = True,
+        **_ignored,
+    ):
+        self.topics = tuple(topics)
+        self.broker = broker
+        # Without a group the consumer reads every partition and commits nothing
+        self.group_id = group_id
+        self.value_deserializer = value_deserializer
+        self.auto_offset_reset = auto_offset_reset
+        self.enable_auto_commit = enable_auto_commit
+
+        self._assignment: Dict[str, List[TopicPartition]] = {}
+        self._positions: Dict[TopicPartition, int] = {}
+        self._started = False
+
+    def _assign(self, topic: str, partitions: List[TopicPartition]):
+        # Positions are re-read from the committed offsets after a rebalance
+        for tp in self._assignment.get(topic, []):
+            self._positions.pop(tp, None)
+        self._assignment[topic] = list(partitions)
+
+    def _add_partition(self, tp: TopicPartition):
+        self._assignment.setdefault(tp.topic, []).append(tp)
+
+    def assignment(self) -> set:
+        return {tp for partitions in self._assignment.values() for tp in partitions}
+
+    async def start(self):
+        if self._started:
+            return
+        self._started = True
+        if self.group_id is None:
+            for topic in self.topics:
+                self._assign(topic, [TopicPartition(topic, p) for p in range(self.broker.partitions_for(topic))])
+        else:
+            self.broker.join(self)
+
+    async def stop(self):
+        if not self._started:
+            return
+        if self.enable_auto_commit:
+            await self.commit()
+        if self.group_id is not None:
+            self.broker.leave(self)
+        self._started = False
+
+    def _position(self, tp: TopicPartition) -> int:
+        if tp not in self._positions:
+            committed = self.broker.committed(self.group_id, tp) if self.group_id else None
+            if committed is not None:
+                self._positions[tp] = committed
+            else:
+                self._positions[tp] = 0 if self.auto_offset_reset == "earliest" else self.broker.end_offset(tp)
+        return self._positions[tp]
+
+    async def seek_to_beginning(self, *partitions: TopicPartition):
+        for tp in partitions or self.assignment():
+            self._positions[tp] = 0
+
+    def _fetch(self, max_records: int) -> Dict[TopicPartition, List[ConsumerRecord]]:
+        batches: Dict[TopicPartition, List[ConsumerRecord]] = {}
+        remaining = max_records
+        for tp in sorted(self.assignment()):
+            if remaining <= 0:
+                break
+            position = self._position(tp)
+            records = self.broker.read(tp, position, remaining)
+            if not records:
+                continue
+            self._positions[tp] = position + len(records)
+            remaining -= len(records)
+            if self.value_deserializer is not None:
+                records = [
+                    ConsumerRecord(r.topic, r.partition, r.offset, r.timestamp, r.key,
+                                   self.value_deserializer(r.value), r.headers)
+                    for r in records
+                ]
+            batches[tp] = records
+        return batches
+
+    async def getmany(self, *partitions: TopicPartition, timeout_ms: int = 0,
+                      max_records: Optional[int] = None) -> Dict[TopicPartition, List[ConsumerRecord]]:
+        """Records fetched since the last call, waiting up to `timeout_ms` if there are none yet"""
+        max_records = max_records or 500
+        batches = self._fetch(max_records)
+        if not batches and timeout_ms:
+            await self.broker.wait_for_records(timeout_ms / 1000)
+            batches = self._fetch(max_records)
+        if batches and self.enable_auto_commit:
+            await self.commit()
+        return batches
+
+    async def commit(self, offsets: Optional[Dict[TopicPartition, int]] = None):
+        """Commit the given offsets, or the current position of every assigned partition"""
+        if self.group_id is None:
+            return
+        if offsets is None:
+            offsets = {tp: self._positions[tp] for tp in self.assignment() if tp in self._positions}
+        self.broker.commit(self.group_id, offsets)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> ConsumerRecord:
+        while True:
+            batches = await self.getmany(timeout_ms=1000, max_records=1)
+            for records in batches.values():
+                return records[0]
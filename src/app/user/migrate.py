@@ -0,0 +1,25 @@
+"""
+Create the database schema. Run once per deploy, before starting the app:
+    python migrate.py
+Creating tables is idempotent, existing tables are left as they are. With
+KAFKA_TRANSPORT=kafka the compacted users topic is created too.
+"""
+from config.config import AppConfig
+from database import Base, engine
+import models  # noqa: F401  registers the tables on Base.metadata
+
+
+def run_migrations():
+    Base.metadata.create_all(bind=engine)
+    if AppConfig.KAFKA_TRANSPORT == "kafka":
+        from services.user_snapshots import ensure_users_topic
+        try:
+            ensure_users_topic(AppConfig.KAFKA_BOOTSTRAP_SERVERS, AppConfig.KAFKA_USERS_TOPIC)
+        except Exception as e:
+            # The broker may create it on first use instead, just without compaction
+            print(f"Could not create the {AppConfig.KAFKA_USERS_TOPIC} topic: {e}")
+
+
+if __name__ == "__main__":
+    run_migrations()
+    print(f"Schema is up to date: {', '.join(sorted(Base.metadata.tables))}")
@@ -1,5 +1,6 @@
 from database import Base  
-from sqlalchemy import Column, Integer, String, Boolean, Enum
+from sqlalchemy import Column, Integer, String, Boolean, Enum, DateTime
+from datetime import datetime
 from domain.enum.role import Role
 
 
@@ -20,6 +21,10 @@ class User(Base):
 class UserSession(Base):
     __tablename__ = 'user_sessions'
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, nullable=False)
-    session_token = Column(String, unique=True, nullable=False)
-    is_active = Column(Boolean, default=True)
\ No newline at end of file
+    user_id = Column(Integer, nullable=False, index=True)
+    # SHA-256 of the token, the token itself is only ever known to the client
+    token_hash = Column(String(64), unique=True, index=True, nullable=False)
+    is_active = Column(Boolean, default=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    revoked_at = Column(DateTime, nullable=True)
\ No newline at end of file
@@ -1,42 +1,125 @@
-from confluent_kafka import Producer
 import json
+import logging
+import threading
+from typing import List, Optional, Tuple
 
+from config.config import AppConfig
+from tracing import tracer
 
-def produce_message(topic: str, key: str, value: dict):
+logger = logging.getLogger(__name__)
+
+
+class KafkaTransport:
+    """Envoie les messages au cluster Kafka avec confluent_kafka"""
+
+    def __init__(self, bootstrap_servers: str):
+        self.bootstrap_servers = bootstrap_servers
+        self._producer = None
+        self._lock = threading.Lock()
+
+    def _get_producer(self):
+        # Un seul producer par processus, créé au premier envoi
+        if self._producer is None:
+            with self._lock:
+                if self._producer is None:
+                    from confluent_kafka import Producer
+                    self._producer = Producer({
+                        'bootstrap.servers': self.bootstrap_servers,
+                        'client.id': 'python-producer'
+                    })
+        return self._producer
+
+    @staticmethod
+    def _on_delivery(error, message):
+        # Appelé par poll()/flush() une fois le message acquitté ou abandonné
+        if error is not None:
+            logger.error(f"Échec de l'envoi sur {message.topic()} (clé {message.key()}): {error}")
+
+    def send(self, topic: str, key: bytes, value: Optional[bytes], headers: List[Tuple[str, bytes]]):
+        producer = self._get_producer()
+        try:
+            producer.produce(topic=topic, key=key, value=value, headers=headers, on_delivery=self._on_delivery)
+        except BufferError:
+            # File locale pleine: laisser partir quelques messages puis réessayer une fois
+            producer.poll(0.1)
+            producer.produce(topic=topic, key=key, value=value, headers=headers, on_delivery=self._on_delivery)
+        # Ne bloque pas: sert seulement les callbacks des envois terminés
+        producer.poll(0)
+
+    def flush(self, timeout: float) -> int:
+        """Attend les messages en attente au plus `timeout` secondes, retourne ceux restants"""
+        if self._producer is None:
+            return 0
+        remaining = self._producer.flush(timeout)
+        if remaining:
+            logger.warning(f"{remaining} messages Kafka non envoyés après {timeout}s")
+        return remaining
+
+
+class MemoryTransport:
+    """Écrit les messages dans le broker en mémoire (tests, benchmarks, exécution locale)"""
+
+    def __init__(self, broker):
+        self.broker = broker
+
+    def send(self, topic: str, key: bytes, value: Optional[bytes], headers: List[Tuple[str, bytes]]):
+        self.broker.produce(topic, key, value, headers)
+
+    def flush(self, timeout: float) -> int:
+        return 0
+
+
+_transport = None
+
+
+def get_transport():
+    """Transport choisi par KAFKA_TRANSPORT: kafka ou memory"""
+    global _transport
+    if _transport is None:
+        if AppConfig.KAFKA_TRANSPORT == "memory":
+            from memory_broker import InMemoryBroker
+            _transport = MemoryTransport(InMemoryBroker(AppConfig.KAFKA_MEMORY_PARTITIONS))
+        elif AppConfig.KAFKA_TRANSPORT == "kafka":
+            _transport = KafkaTransport(AppConfig.KAFKA_BOOTSTRAP_SERVERS)
+        else:
+            raise ValueError(f"Unknown KAFKA_TRANSPORT: {AppConfig.KAFKA_TRANSPORT}")
+    return _transport
+
+
+def set_transport(transport: Optional[object]):
+    """Remplace le transport courant, None revient à la configuration"""
+    global _transport
+    _transport = transport
+
+
+def flush_producer(timeout: float = 5.0) -> int:
+    """Envoie les messages encore en file, à appeler à l'arrêt du processus"""
+    if _transport is None:
+        return 0
+    return _transport.flush(timeout)
+
+
+def produce_message(topic: str, key: str, value: Optional[dict]):
     """
     Envoie un message à Kafka
     
     Args:
         topic: Nom du topic Kafka
         key: Clé du message
-        value: Valeur du message (dict)
+        value: Valeur du message (dict), None envoie un tombstone (topics compactés)
     """
-    # Configuration du producer
-    config = {
-        'bootstrap.servers': 'kafka:9093',
-        'client.id': 'python-producer'
-    }
-    
-    # Créer le producer
-    producer = Producer(config)
-    
-    try:
+    transport = get_transport()
+
+    with tracer.start_span(f"produce {topic}", kind="producer", attributes={"messaging.destination": topic}):
         # Convertir le message en JSON
-        message_json = json.dumps(value).encode('utf-8')
+        message_json = json.dumps(value).encode('utf-8') if value is not None else None
         key_bytes = key.encode('utf-8')
-        
+
+        # Propager le contexte de trace dans les headers Kafka
+        headers = [(name, header.encode('utf-8')) for name, header in tracer.inject({}).items()]
+
         # Envoyer le message
-        producer.produce(
-            topic=topic,
-            key=key_bytes,
-            value=message_json
-        )
-        
-        # Attendre l'envoi
-        producer.flush()
-        
-    finally:
-        producer.flush()
+        transport.send(topic, key_bytes, message_json, headers)
 
 
 # Exemple d'utilisation
@@ -45,4 +128,4 @@ if __name__ == "__main__":
         topic="user-events",
         key="user_123",
         value={"action": "login", "timestamp": "2024-01-15T10:30:00Z"}
-    )
\ No newline at end of file
+    )
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr, Field, field_validator
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, field_validator
 from typing import Optional
 from domain.enum.role import Role
 
@@ -9,6 +9,11 @@ class LoginRequest(BaseModel):
     password: str = Field(..., min_length=1)
 
 
+class SessionTokenRequest(BaseModel):
+    """An opaque session token issued at login"""
+    token: str = Field(..., min_length=1, max_length=256)
+
+
 class UserCreateRequest(BaseModel):
     """API input validation - format and basic constraints"""
     username: str = Field(..., min_length=3, max_length=50)
@@ -47,6 +52,8 @@ class UserUpdateRequest(BaseModel):
 
 class UserResponse(BaseModel):
     """API output model"""
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     username: str
     email: EmailStr
@@ -56,6 +63,3 @@ class UserResponse(BaseModel):
     is_active: bool
     is_superuser: bool
     is_verified: bool
-
-    class Config:
-        orm_mode = True
\ No newline at end of file
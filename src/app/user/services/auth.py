@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict
+
+from jose import jwt
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from config.config import AppConfig
+from domain.exception import InvalidCredentialsError, UserInactiveError
+from models import User as DbUser
+from .password import password_hasher
+
+
+def issue_access_token(user: DbUser) -> Dict[str, Any]:
+    """JWT the gateway accepts: same secret and algorithm as its validate_token"""
+    now = datetime.now(timezone.utc)
+    expires_in = AppConfig.JWT_EXPIRATION_MINUTES * 60
+    claims = {
+        "sub": str(user.id),
+        "username": user.username,
+        "role": user.role.value,
+        "iat": now,
+        "exp": now + timedelta(seconds=expires_in),
+    }
+    return {
+        "access_token": jwt.encode(claims, AppConfig.JWT_SECRET_KEY, algorithm=AppConfig.JWT_ALGORITHM),
+        "token_type": "bearer",
+        "expires_in": expires_in,
+    }
+
+
+class AuthService:
+    def __init__(self, session: Session):
+        self.session = session
+
+    def _find_user(self, username: str) -> DbUser | None:
+        return self.session.query(DbUser).filter(DbUser.username == username.lower()).first()
+
+    def _store_hash(self, user: DbUser, new_hash: str):
+        user.password = new_hash
+        self.session.commit()
+        # Reloaded here, not lazily on the event loop when the token is issued
+        self.session.refresh(user)
+
+    async def authenticate(self, username: str, password: str) -> DbUser:
+        # Queries and commits run in the threadpool, hashing in the hasher's pool
+        user = await run_in_threadpool(self._find_user, username)
+        if user is None:
+            await password_hasher.burn(password)
+            raise InvalidCredentialsError()
+
+        valid, new_hash = await password_hasher.verify(user.password, password)
+        if not valid:
+            raise InvalidCredentialsError()
+        if not user.is_active:
+            raise UserInactiveError(user.username)
+
+        if new_hash is not None:
+            # Parameters changed or the password predates hashing
+            await run_in_threadpool(self._store_hash, user, new_hash)
+        return user
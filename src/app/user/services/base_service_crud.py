@@ -1,6 +1,8 @@
 from typing import List, Dict, Any, Optional, Type
 from sqlalchemy.orm import Session
 
+from database import replica_reads
+
 class BaseService:
     def __init__(self, model: Type, session: Session):
         self.model = model
@@ -11,13 +13,15 @@ class BaseService:
         return {column.name: getattr(obj, column.name) for column in self.model.__table__.columns}
 
     def get_by_id(self, obj_id: int) -> Dict[str, Any]:
-        db_obj = self.session.query(self.model).filter(self.model.id == obj_id).first()
+        with replica_reads(self.session, (self.model.__tablename__, obj_id)):
+            db_obj = self.session.query(self.model).filter(self.model.id == obj_id).first()
         if not db_obj:
             raise ValueError(f"{self.model.__name__} {obj_id} not found")
         return self._to_response_dict(db_obj)
 
     def get_all(self) -> List[Dict[str, Any]]:
-        objs = self.session.query(self.model).all()
+        with replica_reads(self.session, self.model.__tablename__):
+            objs = self.session.query(self.model).all()
         return [self._to_response_dict(obj) for obj in objs]
 
     async def create(self, **data) -> Dict[str, Any]:
@@ -0,0 +1,125 @@
+import json
+import os
+import socket
+import threading
+from typing import List, Optional
+
+from config.config import AppConfig
+from loging import logger, log_error
+from database import replica_router
+from producer import produce_message
+from .cache import user_cache, session_cache
+
+# Identifies this process so it can skip its own invalidation events,
+# those were already applied synchronously by the writer.
+REPLICA_ID = f"{socket.gethostname()}-{os.getpid()}"
+
+
+def publish_user_updated(user_id: int, action: str = "updated"):
+    """Tell the other replicas to drop their cached copy of a user."""
+    try:
+        produce_message(
+            topic=AppConfig.KAFKA_USER_UPDATED_TOPIC,
+            key=str(user_id),
+            value={
+                "user_id": user_id,
+                "action": action,
+                "origin": REPLICA_ID,
+            }
+        )
+    except Exception as e:
+        # The local cache is already invalidated, other replicas fall back to the TTL.
+        log_error("cache_invalidation_publish_failed", str(e), {"user_id": user_id})
+
+
+def publish_sessions_revoked(token_hashes: List[str]):
+    """Tell the other replicas to forget revoked sessions before their cache TTL runs out."""
+    try:
+        produce_message(
+            topic=AppConfig.KAFKA_USER_UPDATED_TOPIC,
+            key="sessions",
+            value={
+                "action": "sessions_revoked",
+                "token_hashes": token_hashes,
+                "origin": REPLICA_ID,
+            }
+        )
+    except Exception as e:
+        log_error("cache_invalidation_publish_failed", str(e), {"sessions": len(token_hashes)})
+
+
+class CacheInvalidationListener:
+    """
+    Consumes `user-updated` events and evicts the matching users or revoked
+    sessions from the local caches.
+    Every replica uses its own consumer group so each one sees every event.
+    """
+
+    def __init__(self, bootstrap_servers: str, topic: str, poll_timeout: float = 1.0):
+        self.bootstrap_servers = bootstrap_servers
+        self.topic = topic
+        self.poll_timeout = poll_timeout
+
+        self.thread: Optional[threading.Thread] = None
+        self.running: bool = False
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="user-cache-invalidation", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout)
+            self.thread = None
+
+    def _run(self):
+        from confluent_kafka import Consumer, KafkaError
+
+        consumer = Consumer({
+            'bootstrap.servers': self.bootstrap_servers,
+            'group.id': f"user-cache-{REPLICA_ID}",
+            # Only events published after start matter, older ones are covered by the TTL
+            'auto.offset.reset': 'latest',
+            'enable.auto.commit': False,
+        })
+        consumer.subscribe([self.topic])
+        logger.info(f"Cache invalidation listener subscribed to {self.topic}")
+
+        try:
+            while self.running:
+                msg = consumer.poll(self.poll_timeout)
+                if msg is None:
+                    continue
+                if msg.error():
+                    if msg.error().code() != KafkaError._PARTITION_EOF:
+                        log_error("cache_invalidation_consume_failed", str(msg.error()))
+                    continue
+                self._handle(msg.value())
+        finally:
+            consumer.close()
+
+    def _handle(self, raw: bytes):
+        try:
+            event = json.loads(raw.decode("utf-8"))
+            if event.get("origin") == REPLICA_ID:
+                return
+            if event.get("action") == "sessions_revoked":
+                for token_hash in event["token_hashes"]:
+                    session_cache.invalidate(token_hash)
+                return
+            user_id = int(event["user_id"])
+            # The next miss must not read the old row from a lagging database replica
+            replica_router.mark_written(("users", ("users", user_id)))
+            user_cache.invalidate(user_id)
+        except (ValueError, KeyError, TypeError) as e:
+            log_error("cache_invalidation_bad_event", str(e))
+
+
+invalidation_listener = CacheInvalidationListener(
+    bootstrap_servers=AppConfig.KAFKA_BOOTSTRAP_SERVERS,
+    topic=AppConfig.KAFKA_USER_UPDATED_TOPIC,
+)
@@ -0,0 +1,77 @@
+import asyncio
+import hmac
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from argon2 import PasswordHasher as Argon2Hasher
+from argon2.exceptions import InvalidHashError, VerificationError, VerifyMismatchError
+
+from config.config import AppConfig
+
+ARGON2_PREFIX = "$argon2"
+
+
+class PasswordHasher:
+    """
+    Argon2 hashing on a bounded thread pool. argon2-cffi releases the GIL while
+    hashing, so `max_workers` hashes run in parallel and the event loop keeps
+    serving requests. Excess logins queue on the pool instead of piling up CPU work.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        time_cost: int = 3,
+        memory_cost: int = 65536,
+        parallelism: int = 1,
+    ):
+        self.hasher = Argon2Hasher(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hash")
+        # Verified against when the user doesn't exist, so both cases take as long
+        self._dummy_hash: Optional[str] = None
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.hasher.hash, password)
+
+    async def verify(self, stored: str, password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Check a password against its stored value. Returns (valid, new_hash),
+        new_hash is set when the stored value should be replaced: it was hashed
+        with older parameters, or predates hashing and is still plain text.
+        """
+        return await self._run(self._verify, stored, password)
+
+    def _verify(self, stored: str, password: str) -> Tuple[bool, Optional[str]]:
+        if not stored.startswith(ARGON2_PREFIX):
+            if hmac.compare_digest(stored.encode("utf-8"), password.encode("utf-8")):
+                return True, self.hasher.hash(password)
+            return False, None
+
+        try:
+            self.hasher.verify(stored, password)
+        except (VerifyMismatchError, VerificationError, InvalidHashError):
+            return False, None
+
+        if self.hasher.check_needs_rehash(stored):
+            return True, self.hasher.hash(password)
+        return True, None
+
+    async def burn(self, password: str):
+        """Spend the time of a real verification, for unknown usernames"""
+        if self._dummy_hash is None:
+            self._dummy_hash = await self.hash("not-a-real-password")
+        await self.verify(self._dummy_hash, password)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher(
+    max_workers=AppConfig.PASSWORD_HASH_WORKERS,
+    time_cost=AppConfig.ARGON2_TIME_COST,
+    memory_cost=AppConfig.ARGON2_MEMORY_COST,
+    parallelism=AppConfig.ARGON2_PARALLELISM,
+)
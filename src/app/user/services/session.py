@@ -1,20 +1,173 @@
+import hashlib
+import secrets
+import threading
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import delete, or_, select, update
 from sqlalchemy.orm import Session
+
+from config.config import AppConfig
+from database import SessionLocal
 from domain.entities.session import UserSession
+from domain.exception import InvalidSessionError
+from loging import logger, log_error
+from models import UserSession as DbUserSession
+from .cache import session_cache
+from .cache_invalidation import publish_sessions_revoked
+
+# Cached for unknown tokens so repeated bad tokens don't reach the DB either,
+# a token that doesn't exist now never will: new tokens are random.
+UNKNOWN_TOKEN = object()
+
+
+def hash_token(token: str) -> str:
+    """Tokens carry 256 random bits, a fast hash is enough to keep them out of the DB"""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
 
 
 class UserSessionService:
-    def __init__(self, db_session: Session):
+    def __init__(self, db_session: Session, ttl_seconds: int = AppConfig.SESSION_TTL_SECONDS):
         self.db_session = db_session
+        self.ttl_seconds = ttl_seconds
 
     def create_session(self, user_id: int) -> str:
-        new_session = UserSession(user_id=user_id)
+        token = secrets.token_urlsafe(32)
+        new_session = DbUserSession(
+            user_id=user_id,
+            token_hash=hash_token(token),
+            is_active=True,
+            expires_at=datetime.utcnow() + timedelta(seconds=self.ttl_seconds),
+        )
         self.db_session.add(new_session)
         self.db_session.commit()
-        self.db_session.refresh(new_session)
-        return new_session.token
+        return token
+
+    def validate(self, token: str) -> UserSession:
+        """The session behind `token`, served from the cache when possible"""
+        token_hash = hash_token(token)
+        now = datetime.utcnow()
+
+        cached = session_cache.get(token_hash)
+        if cached is UNKNOWN_TOKEN:
+            raise InvalidSessionError()
+        if cached is not None:
+            if cached.is_expired(now):
+                session_cache.invalidate(token_hash)
+                raise InvalidSessionError("expired")
+            return cached
+
+        version = session_cache.version
+        row = self.db_session.execute(
+            select(DbUserSession.id, DbUserSession.user_id, DbUserSession.expires_at,
+                   DbUserSession.is_active, DbUserSession.revoked_at)
+            .where(DbUserSession.token_hash == token_hash)
+        ).first()
+        if row is None:
+            session_cache.set(token_hash, UNKNOWN_TOKEN, version=version)
+            raise InvalidSessionError()
+        if not row.is_active or row.revoked_at is not None:
+            raise InvalidSessionError("revoked")
+
+        user_session = UserSession(id=row.id, user_id=row.user_id, expires_at=row.expires_at)
+        if user_session.is_expired(now):
+            raise InvalidSessionError("expired")
+        session_cache.set(token_hash, user_session, version=version)
+        return user_session
 
     def get_user_id_by_token(self, token: str) -> int:
-        session = self.db_session.query(UserSession).filter(UserSession.token == token).first()
-        if not session:
-            raise ValueError("Invalid session token")
-        return session.user_id
\ No newline at end of file
+        return self.validate(token).user_id
+
+    def revoke(self, token: str) -> bool:
+        return self._revoke(DbUserSession.token_hash == hash_token(token)) > 0
+
+    def revoke_all(self, user_id: int) -> int:
+        """Log a user out everywhere"""
+        return self._revoke(DbUserSession.user_id == user_id)
+
+    def _revoke(self, condition) -> int:
+        token_hashes: List[str] = list(self.db_session.scalars(
+            select(DbUserSession.token_hash).where(condition, DbUserSession.revoked_at.is_(None))
+        ))
+        if not token_hashes:
+            return 0
+
+        self.db_session.execute(
+            update(DbUserSession)
+            .where(DbUserSession.token_hash.in_(token_hashes))
+            .values(is_active=False, revoked_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        self.db_session.commit()
+
+        for token_hash in token_hashes:
+            session_cache.invalidate(token_hash)
+        publish_sessions_revoked(token_hashes)
+        return len(token_hashes)
+
+
+def sweep_expired_sessions(batch_size: int, revoked_grace: timedelta = timedelta(days=1)) -> int:
+    """Delete expired and long-revoked sessions, `batch_size` rows per transaction"""
+    now = datetime.utcnow()
+    removed = 0
+    while True:
+        db = SessionLocal()
+        try:
+            ids = list(db.scalars(
+                select(DbUserSession.id)
+                .where(or_(
+                    DbUserSession.expires_at <= now,
+                    DbUserSession.revoked_at <= now - revoked_grace,
+                ))
+                .limit(batch_size)
+            ))
+            if ids:
+                db.execute(delete(DbUserSession).where(DbUserSession.id.in_(ids)))
+                db.commit()
+        finally:
+            db.close()
+
+        removed += len(ids)
+        if len(ids) < batch_size:
+            return removed
+
+
+class SessionSweeper:
+    """Removes expired sessions in the background so the table and its indexes stay small"""
+
+    def __init__(self, interval: float, batch_size: int):
+        self.interval = interval
+        self.batch_size = batch_size
+
+        self.thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self.removed = 0
+
+    def start(self):
+        if self.thread is not None:
+            return
+        self._stopped.clear()
+        self.thread = threading.Thread(target=self._run, name="user-session-sweeper", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stopped.set()
+        if self.thread:
+            self.thread.join(timeout)
+            self.thread = None
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                removed = sweep_expired_sessions(self.batch_size)
+                self.removed += removed
+                if removed:
+                    logger.info(f"Removed {removed} expired sessions")
+            except Exception as e:
+                log_error("session_sweep_failed", str(e))
+
+
+session_sweeper = SessionSweeper(
+    interval=AppConfig.SESSION_SWEEP_INTERVAL,
+    batch_size=AppConfig.SESSION_SWEEP_BATCH_SIZE,
+)
@@ -1,11 +1,25 @@
-from typing import  Dict, Any
+from typing import  Dict, Any, List
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from models import User as DbUser
+from database import replica_reads
 from .base_service_crud import BaseService
 
 # call the producer.
 from producer import produce_message
 from .validators import validate_user_uniqueness
+from .cache import user_cache
+from .cache_invalidation import publish_user_updated
+from .user_snapshots import publish_user_snapshot, publish_user_deleted
+from .session import UserSessionService
+from .password import password_hasher
+from tracing import tracer
+
+# Columns of a user response, selected directly so listing users skips building ORM objects
+RESPONSE_COLUMNS = (
+    DbUser.id, DbUser.username, DbUser.email, DbUser.role, DbUser.age, DbUser.full_name,
+    DbUser.is_active, DbUser.is_superuser, DbUser.is_verified,
+)
 
 class UserService(BaseService):
     def __init__(self, session: Session):
@@ -24,29 +38,63 @@ class UserService(BaseService):
             "is_verified": user.is_verified,
         }
 
+    def get_all(self) -> List[Dict[str, Any]]:
+        with replica_reads(self.session, DbUser.__tablename__):
+            rows = self.session.execute(select(*RESPONSE_COLUMNS)).mappings()
+            return [dict(row) for row in rows]
+
+    def get_by_id(self, user_id: int) -> Dict[str, Any]:
+        cached = user_cache.get(user_id)
+        if cached is not None:
+            return dict(cached)
+
+        version = user_cache.version
+        user = super().get_by_id(user_id)
+        user_cache.set(user_id, user, version=version)
+        return dict(user)
+
+    @tracer.traced("UserService.create")
     async def create(self, **user_data) -> Dict[str, Any]:
         validate_user_uniqueness(self.session, user_data)
 
         user_data.setdefault("is_active", True)
         user_data.setdefault("is_superuser", False)
         user_data.setdefault("is_verified", False)
+        user_data["password"] = await password_hasher.hash(user_data["password"])
 
         new_user = await super().create(**user_data)
         print(new_user, " user")
 
         produce_message(
             topic="notification",
-            key="user_created",
+            # Keyed by user so records spread over the partitions, one user's events stay in order
+            key=str(new_user["id"]),
             value={
                 "user_id": new_user["id"],
                 "username": new_user["username"],
                 "email": new_user["email"],
             }
         )
+        publish_user_snapshot(new_user)
 
         return new_user
 
 
+    @tracer.traced("UserService.update")
     def update(self, user_id: int, **update_data) -> Dict[str, Any]:
         validate_user_uniqueness(self.session, update_data, user_id=user_id)
-        return super().update(user_id, **update_data)
\ No newline at end of file
+        updated_user = super().update(user_id, **update_data)
+        if updated_user is not None:
+            user_cache.invalidate(user_id)
+            publish_user_updated(user_id, action="updated")
+            publish_user_snapshot(updated_user)
+        return updated_user
+
+    def delete(self, user_id: int) -> bool:
+        deleted = super().delete(user_id)
+        if deleted:
+            user_cache.invalidate(user_id)
+            publish_user_updated(user_id, action="deleted")
+            publish_user_deleted(user_id)
+            UserSessionService(self.session).revoke_all(user_id)
+        return deleted
\ No newline at end of file
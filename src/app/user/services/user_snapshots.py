@@ -0,0 +1,84 @@
+"""
+Full user snapshots on the log-compacted users topic, keyed by user id.
+Kafka keeps the latest snapshot of each user and a deleted user gets a
+tombstone, so other services can rebuild every user by reading from offset zero.
+
+Publish every existing user once, e.g. after creating the topic:
+    python -m services.user_snapshots
+"""
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, Dict
+
+from sqlalchemy.orm import Session
+
+from config.config import AppConfig
+from loging import log_error
+from models import User as DbUser
+from producer import produce_message, flush_producer
+
+SNAPSHOT_FIELDS = ("username", "email", "full_name", "role", "age", "is_active", "is_verified")
+
+
+def to_snapshot(user: Dict[str, Any]) -> Dict[str, Any]:
+    snapshot = {"user_id": user["id"]}
+    for field in SNAPSHOT_FIELDS:
+        value = user.get(field)
+        snapshot[field] = value.value if isinstance(value, Enum) else value
+    snapshot["updated_at"] = datetime.now(timezone.utc).isoformat()
+    return snapshot
+
+
+def publish_user_snapshot(user: Dict[str, Any]):
+    """Publish the current state of a user, replacing the previous snapshot on compaction"""
+    try:
+        produce_message(topic=AppConfig.KAFKA_USERS_TOPIC, key=str(user["id"]), value=to_snapshot(user))
+    except Exception as e:
+        # The next change of this user publishes a full snapshot again
+        log_error("user_snapshot_publish_failed", str(e), {"user_id": user["id"]})
+
+
+def publish_user_deleted(user_id: int):
+    """Tombstone, compaction then drops every snapshot of the user"""
+    try:
+        produce_message(topic=AppConfig.KAFKA_USERS_TOPIC, key=str(user_id), value=None)
+    except Exception as e:
+        log_error("user_snapshot_publish_failed", str(e), {"user_id": user_id})
+
+
+def publish_all_snapshots(session: Session, batch_size: int = 500) -> int:
+    """Backfill the topic with every user, reading them in batches"""
+    published = 0
+    for user in session.query(DbUser).order_by(DbUser.id).yield_per(batch_size):
+        publish_user_snapshot({"id": user.id, **{field: getattr(user, field) for field in SNAPSHOT_FIELDS}})
+        published += 1
+    return published
+
+
+def ensure_users_topic(bootstrap_servers: str, topic: str, timeout: float = 10.0):
+    """Create the users topic with cleanup.policy=compact if it doesn't exist yet"""
+    from confluent_kafka.admin import AdminClient, NewTopic
+    from confluent_kafka import KafkaError
+
+    admin = AdminClient({"bootstrap.servers": bootstrap_servers})
+    futures = admin.create_topics(
+        [NewTopic(topic, num_partitions=1, replication_factor=1, config={"cleanup.policy": "compact"})],
+        request_timeout=timeout,
+    )
+    try:
+        futures[topic].result(timeout)
+    except Exception as e:
+        error = e.args[0] if e.args else None
+        if getattr(error, "code", lambda: None)() != KafkaError.TOPIC_ALREADY_EXISTS:
+            raise
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        print(f"Published {publish_all_snapshots(session)} user snapshots to {AppConfig.KAFKA_USERS_TOPIC}")
+    finally:
+        session.close()
+        flush_producer(60.0)
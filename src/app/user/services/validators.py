@@ -1,23 +1,27 @@
 from sqlalchemy.orm import Session
 from models import User as DbUser
+from database import replica_reads
 
 def validate_user_uniqueness(session: Session, data: dict, user_id: int = None):
     """
     Validates the uniqueness of username and email.
     Raises ValueError if a value is not unique.
+    A replica can miss a user created a moment ago, the unique
+    constraints on both columns still reject the insert then.
     """
-    username = data.get("username")
-    if username:
-        query = session.query(DbUser).filter(DbUser.username == username)
-        if user_id:
-            query = query.filter(DbUser.id != user_id)
-        if query.first():
-            raise ValueError("Username already exists")
+    with replica_reads(session, DbUser.__tablename__):
+        username = data.get("username")
+        if username:
+            query = session.query(DbUser).filter(DbUser.username == username)
+            if user_id:
+                query = query.filter(DbUser.id != user_id)
+            if query.first():
+                raise ValueError("Username already exists")
 
-    email = data.get("email")
-    if email:
-        query = session.query(DbUser).filter(DbUser.email == email)
-        if user_id:
-            query = query.filter(DbUser.id != user_id)
-        if query.first():
-            raise ValueError("Email already exists")
\ No newline at end of file
+        email = data.get("email")
+        if email:
+            query = session.query(DbUser).filter(DbUser.email == email)
+            if user_id:
+                query = query.filter(DbUser.id != user_id)
+            if query.first():
+                raise ValueError("Email already exists")
\ No newline at end of file
@@ -0,0 +1,21 @@
+"""
+The services are run from their own directory and share top level package
+names (config, domain, middleware...), so a test imports the service it
+covers through `use_service` rather than all of them being on sys.path.
+"""
+import os
+import sys
+
+SERVICES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "src", "app")
+
+
+def use_service(name: str):
+    """Put the service first on sys.path and forget the modules of the others"""
+    service_dir = os.path.join(SERVICES_DIR, name)
+    for module_name, module in list(sys.modules.items()):
+        # Namespace packages such as services have no __file__, only a __path__
+        module_file = getattr(module, "__file__", None) or next(iter(getattr(module, "__path__", [])), "")
+        if module_file.startswith(SERVICES_DIR + os.sep) and not module_file.startswith(service_dir + os.sep):
+            del sys.modules[module_name]
+    sys.path[:] = [path for path in sys.path if not path.startswith(SERVICES_DIR + os.sep)]
+    sys.path.insert(0, service_dir)
@@ -0,0 +1,118 @@
+import pytest
+
+from tests.units.services import use_service
+
+pytest.importorskip("httpx")
+
+use_service("gateway")
+
+from utils import resilience  # noqa: E402
+from utils.resilience import CircuitBreaker, CircuitState  # noqa: E402
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(resilience, "time", fake)
+    return fake
+
+
+def open_breaker(breaker: CircuitBreaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30.0)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+    assert not breaker.allow_request()
+    assert breaker.times_opened == 1
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30.0)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitState.CLOSED
+
+
+def test_half_open_after_reset_timeout(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30.0)
+    open_breaker(breaker)
+    clock.advance(29.9)
+    assert breaker.state == CircuitState.OPEN
+    assert breaker.snapshot()["retry_in"] == pytest.approx(0.1)
+
+    clock.advance(0.1)
+    assert breaker.state == CircuitState.HALF_OPEN
+
+
+def test_half_open_lets_a_limited_number_of_probes_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30.0, half_open_max_calls=2)
+    open_breaker(breaker)
+    clock.advance(30.0)
+    assert breaker.allow_request()
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+
+def test_successful_probe_closes_the_circuit(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30.0)
+    open_breaker(breaker)
+    clock.advance(30.0)
+    assert breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.snapshot()["consecutive_failures"] == 0
+    # A single failure no longer opens it
+    breaker.record_failure()
+    assert breaker.state == CircuitState.CLOSED
+
+
+def test_failed_probe_opens_the_circuit_again(clock):
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=30.0)
+    open_breaker(breaker)
+    clock.advance(30.0)
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+    assert breaker.times_opened == 2
+    assert not breaker.allow_request()
+    # The reset timeout starts over from the failed probe
+    clock.advance(29.0)
+    assert breaker.state == CircuitState.OPEN
+
+
+def test_probe_that_never_reports_back_does_not_wedge_the_circuit(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30.0)
+    open_breaker(breaker)
+    clock.advance(30.0)
+    assert breaker.allow_request()
+    # The probe was cancelled, neither success nor failure is recorded
+    assert not breaker.allow_request()
+
+    clock.advance(30.0)
+    assert breaker.state == CircuitState.HALF_OPEN
+    assert breaker.allow_request()
@@ -0,0 +1,234 @@
+import asyncio
+import base64
+import json
+import time
+
+import pytest
+
+from tests.units.services import use_service
+
+pytest.importorskip("cryptography")
+pytest.importorskip("httpx")
+
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, padding, rsa
+
+use_service("gateway")
+
+from use_cases.exceptions import InvalidTokenError, UnknownKeyError  # noqa: E402
+from use_cases.jwks import JWKSKeySet, parse_jwk, parse_jwks  # noqa: E402
+
+
+RSA_KEY = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+ED_KEY = ed25519.Ed25519PrivateKey.generate()
+
+
+def b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def b64url_uint(value: int) -> str:
+    return b64url(value.to_bytes((value.bit_length() + 7) // 8, "big"))
+
+
+def rsa_jwk(key, kid: str = "rsa-1") -> dict:
+    numbers = key.public_key().public_numbers()
+    return {"kty": "RSA", "kid": kid, "alg": "RS256", "use": "sig",
+            "n": b64url_uint(numbers.n), "e": b64url_uint(numbers.e)}
+
+
+def ed_jwk(key, kid: str = "ed-1") -> dict:
+    raw = key.public_key().public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+    return {"kty": "OKP", "crv": "Ed25519", "kid": kid, "x": b64url(raw)}
+
+
+def rsa_sign(data: bytes, key=RSA_KEY) -> bytes:
+    return key.sign(data, padding.PKCS1v15(), hashes.SHA256())
+
+
+def ed_sign(data: bytes, key=ED_KEY) -> bytes:
+    return key.sign(data)
+
+
+def make_token(header: dict, claims: dict, sign) -> str:
+    signing_input = f"{b64url(json.dumps(header).encode())}.{b64url(json.dumps(claims).encode())}"
+    return f"{signing_input}.{b64url(sign(signing_input.encode()))}"
+
+
+def make_key_set(*jwks, **kwargs) -> JWKSKeySet:
+    key_set = JWKSKeySet("unused.json", **kwargs)
+    key_set.keys = parse_jwks({"keys": list(jwks)})
+    return key_set
+
+
+def claims(**extra) -> dict:
+    return {"sub": "42", "role": "user", "exp": time.time() + 300, **extra}
+
+
+def verify(key_set: JWKSKeySet, token: str) -> dict:
+    header = json.loads(base64.urlsafe_b64decode(token.split(".")[0] + "=="))
+    return key_set.verify(token, header)
+
+
+def test_parse_jwk_skips_unsupported_keys():
+    assert parse_jwk({**rsa_jwk(RSA_KEY), "use": "enc"}) is None
+    assert parse_jwk({**rsa_jwk(RSA_KEY), "alg": "PS256"}) is None
+    assert parse_jwk({"kty": "oct", "kid": "hmac", "k": "c2VjcmV0"}) is None
+    assert parse_jwk({**ed_jwk(ED_KEY), "crv": "X25519"}) is None
+
+
+def test_parse_jwks_skips_invalid_keys():
+    keys = parse_jwks({"keys": [{"kty": "RSA", "kid": "broken"}, rsa_jwk(RSA_KEY), ed_jwk(ED_KEY)]})
+    assert sorted(keys) == ["ed-1", "rsa-1"]
+    assert keys["rsa-1"].algorithm == "RS256"
+    assert keys["ed-1"].algorithm == "EdDSA"
+
+
+def test_verify_rs256_token():
+    key_set = make_key_set(rsa_jwk(RSA_KEY), ed_jwk(ED_KEY))
+    token = make_token({"alg": "RS256", "kid": "rsa-1"}, claims(), rsa_sign)
+    assert verify(key_set, token)["sub"] == "42"
+
+
+def test_verify_eddsa_token():
+    key_set = make_key_set(rsa_jwk(RSA_KEY), ed_jwk(ED_KEY))
+    token = make_token({"alg": "EdDSA", "kid": "ed-1"}, claims(), ed_sign)
+    assert verify(key_set, token)["sub"] == "42"
+
+
+def test_verify_without_kid_uses_the_only_key():
+    key_set = make_key_set(ed_jwk(ED_KEY))
+    token = make_token({"alg": "EdDSA"}, claims(), ed_sign)
+    assert verify(key_set, token)["sub"] == "42"
+
+
+@pytest.mark.parametrize("alg", ["RS256", "HS256", "none"])
+def test_verify_rejects_alg_not_matching_the_key(alg):
+    key_set = make_key_set(rsa_jwk(RSA_KEY), ed_jwk(ED_KEY))
+    token = make_token({"alg": alg, "kid": "ed-1"}, claims(), ed_sign)
+    with pytest.raises(InvalidTokenError, match="Invalid token"):
+        verify(key_set, token)
+
+
+def test_verify_rejects_tampered_signature():
+    key_set = make_key_set(rsa_jwk(RSA_KEY))
+    token = make_token({"alg": "RS256", "kid": "rsa-1"}, claims(), rsa_sign)
+    signing_input, _, signature = token.rpartition(".")
+    forged = bytearray(base64.urlsafe_b64decode(signature + "=="))
+    forged[0] ^= 1
+    with pytest.raises(InvalidTokenError, match="Invalid token"):
+        verify(key_set, f"{signing_input}.{b64url(bytes(forged))}")
+
+
+def test_verify_rejects_tampered_payload():
+    key_set = make_key_set(ed_jwk(ED_KEY))
+    token = make_token({"alg": "EdDSA", "kid": "ed-1"}, claims(), ed_sign)
+    header, _, signature = token.split(".")
+    payload = b64url(json.dumps(claims(role="admin")).encode())
+    with pytest.raises(InvalidTokenError, match="Invalid token"):
+        verify(key_set, f"{header}.{payload}.{signature}")
+
+
+def test_verify_rejects_token_signed_by_another_key():
+    key_set = make_key_set(ed_jwk(ED_KEY))
+    other = ed25519.Ed25519PrivateKey.generate()
+    token = make_token({"alg": "EdDSA", "kid": "ed-1"}, claims(), lambda data: ed_sign(data, other))
+    with pytest.raises(InvalidTokenError, match="Invalid token"):
+        verify(key_set, token)
+
+
+@pytest.mark.parametrize("leeway, accepted", [(30.0, True), (0.0, False)])
+def test_verify_expired_token_within_leeway(leeway, accepted):
+    key_set = make_key_set(rsa_jwk(RSA_KEY), leeway=leeway)
+    token = make_token({"alg": "RS256", "kid": "rsa-1"}, claims(exp=time.time() - 10), rsa_sign)
+    if accepted:
+        assert verify(key_set, token)["sub"] == "42"
+    else:
+        with pytest.raises(InvalidTokenError, match="Token has expired"):
+            verify(key_set, token)
+
+
+@pytest.mark.parametrize("leeway, accepted", [(30.0, True), (0.0, False)])
+def test_verify_not_yet_valid_token_within_leeway(leeway, accepted):
+    key_set = make_key_set(ed_jwk(ED_KEY), leeway=leeway)
+    token = make_token({"alg": "EdDSA", "kid": "ed-1"}, claims(nbf=time.time() + 10), ed_sign)
+    if accepted:
+        assert verify(key_set, token)["sub"] == "42"
+    else:
+        with pytest.raises(InvalidTokenError, match="Token is not valid yet"):
+            verify(key_set, token)
+
+
+def test_verify_checks_issuer_and_audience():
+    key_set = make_key_set(ed_jwk(ED_KEY), issuer="https://auth.example", audience="gateway")
+    token = make_token({"alg": "EdDSA", "kid": "ed-1"},
+                       claims(iss="https://auth.example", aud=["gateway", "other"]), ed_sign)
+    assert verify(key_set, token)["sub"] == "42"
+
+    token = make_token({"alg": "EdDSA", "kid": "ed-1"}, claims(iss="https://other.example", aud="gateway"), ed_sign)
+    with pytest.raises(InvalidTokenError, match="Invalid token issuer"):
+        verify(key_set, token)
+
+    token = make_token({"alg": "EdDSA", "kid": "ed-1"}, claims(iss="https://auth.example", aud="other"), ed_sign)
+    with pytest.raises(InvalidTokenError, match="Invalid token audience"):
+        verify(key_set, token)
+
+
+def test_unknown_kid_refetch_loads_rotated_key(monkeypatch):
+    rotated = ed25519.Ed25519PrivateKey.generate()
+    key_set = make_key_set(ed_jwk(ED_KEY), min_refetch_interval=30.0)
+    fetches = []
+
+    async def fetch():
+        fetches.append(time.monotonic())
+        await asyncio.sleep(0)
+        return {"keys": [ed_jwk(ED_KEY), ed_jwk(rotated, kid="ed-2")]}
+    monkeypatch.setattr(key_set, "_fetch", fetch)
+
+    token = make_token({"alg": "EdDSA", "kid": "ed-2"}, claims(), lambda data: ed_sign(data, rotated))
+    with pytest.raises(UnknownKeyError) as excinfo:
+        verify(key_set, token)
+    assert excinfo.value.kid == "ed-2"
+
+    async def refetch_concurrently():
+        return await asyncio.gather(*(key_set.refetch() for _ in range(5)))
+
+    # Concurrent refetches share a single load
+    assert asyncio.run(refetch_concurrently()) == [True] * 5
+    assert len(fetches) == 1
+    assert key_set.unknown_kid_refetches == 1
+    assert verify(key_set, token)["sub"] == "42"
+
+
+def test_unknown_kid_refetch_is_throttled(monkeypatch):
+    key_set = make_key_set(ed_jwk(ED_KEY), min_refetch_interval=30.0)
+    fetches = []
+
+    async def fetch():
+        fetches.append(time.monotonic())
+        return {"keys": [ed_jwk(ED_KEY)]}
+    monkeypatch.setattr(key_set, "_fetch", fetch)
+
+    assert asyncio.run(key_set.refetch()) is True
+    # Within min_refetch_interval of the last load, nothing is fetched
+    assert asyncio.run(key_set.refetch()) is False
+    assert asyncio.run(key_set.refetch()) is False
+    assert len(fetches) == 1
+    assert key_set.throttled_refetches == 2
+
+    key_set._last_fetch = time.monotonic() - 31.0
+    assert asyncio.run(key_set.refetch()) is True
+    assert len(fetches) == 2
+    assert key_set.unknown_kid_refetches == 2
+
+
+def test_failed_refetch_keeps_previous_keys(monkeypatch):
+    key_set = make_key_set(ed_jwk(ED_KEY))
+
+    async def fetch():
+        raise OSError("connection refused")
+    monkeypatch.setattr(key_set, "_fetch", fetch)
+
+    assert asyncio.run(key_set.refetch()) is False
+    assert sorted(key_set.keys) == ["ed-1"]
+    assert key_set.refresh_failures == 1
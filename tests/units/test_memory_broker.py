@@ -0,0 +1,212 @@
+import asyncio
+import json
+
+import pytest
+
+from tests.units.services import use_service
+
+use_service("notification")
+
+from events.memory_broker import InMemoryBroker, InMemoryConsumer, TopicPartition  # noqa: E402
+
+TOPIC = "notification"
+
+
+def produce(broker: InMemoryBroker, count: int, start: int = 0):
+    for i in range(start, start + count):
+        broker.produce(TOPIC, str(i).encode(), json.dumps({"user_id": i}).encode())
+
+
+def consumer(broker: InMemoryBroker, group_id="group", **kwargs) -> InMemoryConsumer:
+    kwargs.setdefault("auto_offset_reset", "earliest")
+    kwargs.setdefault("enable_auto_commit", False)
+    return InMemoryConsumer(TOPIC, broker=broker, group_id=group_id, value_deserializer=json.loads, **kwargs)
+
+
+def user_ids(batches) -> list:
+    return sorted(record.value["user_id"] for records in batches.values() for record in records)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_keyed_records_stay_on_one_partition():
+    broker = InMemoryBroker(default_partitions=4)
+    first = broker.produce(TOPIC, b"42", b"{}")
+    second = broker.produce(TOPIC, b"42", b"{}")
+    assert first.partition == second.partition
+    assert second.offset == first.offset + 1
+
+
+def test_committed_offsets_resume_after_restart():
+    broker = InMemoryBroker()
+    produce(broker, 5)
+
+    async def scenario():
+        first = consumer(broker)
+        await first.start()
+        batches = await first.getmany(max_records=3)
+        await first.commit()
+        # Read but never committed, delivered again after the restart
+        await first.getmany(max_records=1)
+        await first.stop()
+
+        second = consumer(broker)
+        await second.start()
+        resumed = await second.getmany()
+        await second.stop()
+        return batches, resumed
+
+    batches, resumed = run(scenario())
+    assert user_ids(batches) == [0, 1, 2]
+    assert user_ids(resumed) == [3, 4]
+    assert broker.lag("group", TOPIC) == 2
+
+
+def test_commit_explicit_offsets():
+    broker = InMemoryBroker()
+    produce(broker, 5)
+
+    async def scenario():
+        first = consumer(broker)
+        await first.start()
+        await first.getmany()
+        await first.commit({TopicPartition(TOPIC, 0): 2})
+        await first.stop()
+
+        second = consumer(broker)
+        await second.start()
+        return await second.getmany()
+
+    assert user_ids(run(scenario())) == [2, 3, 4]
+
+
+def test_auto_commit_after_each_fetch():
+    broker = InMemoryBroker()
+    produce(broker, 3)
+
+    async def scenario():
+        auto = consumer(broker, enable_auto_commit=True)
+        await auto.start()
+        await auto.getmany()
+
+    run(scenario())
+    assert broker.lag("group", TOPIC) == 0
+
+
+def test_latest_offset_reset_skips_existing_records():
+    broker = InMemoryBroker()
+    produce(broker, 3)
+
+    async def scenario():
+        latest = consumer(broker, auto_offset_reset="latest")
+        await latest.start()
+        before = await latest.getmany()
+        produce(broker, 1, start=3)
+        return before, await latest.getmany()
+
+    before, after = run(scenario())
+    assert before == {}
+    assert user_ids(after) == [3]
+
+
+def test_seek_to_beginning_reads_committed_records_again():
+    broker = InMemoryBroker(default_partitions=2)
+    produce(broker, 6)
+
+    async def scenario():
+        replaying = consumer(broker)
+        await replaying.start()
+        await replaying.getmany()
+        await replaying.commit()
+        assert await replaying.getmany() == {}
+        await replaying.seek_to_beginning()
+        return await replaying.getmany()
+
+    assert user_ids(run(scenario())) == list(range(6))
+
+
+def test_seek_to_beginning_of_one_partition():
+    broker = InMemoryBroker(default_partitions=2)
+    produce(broker, 6)
+
+    async def scenario():
+        replaying = consumer(broker)
+        await replaying.start()
+        first = await replaying.getmany()
+        await replaying.seek_to_beginning(TopicPartition(TOPIC, 1))
+        return first, await replaying.getmany()
+
+    first, replayed = run(scenario())
+    assert list(replayed) == [TopicPartition(TOPIC, 1)]
+    assert replayed[TopicPartition(TOPIC, 1)] == first[TopicPartition(TOPIC, 1)]
+
+
+def test_getmany_only_fetches_the_given_partitions():
+    broker = InMemoryBroker(default_partitions=2)
+    produce(broker, 6)
+    p0, p1 = TopicPartition(TOPIC, 0), TopicPartition(TOPIC, 1)
+
+    async def scenario():
+        reader = consumer(broker)
+        await reader.start()
+        only_p1 = await reader.getmany(p1)
+        rest = await reader.getmany()
+        with pytest.raises(ValueError):
+            await reader.getmany(TopicPartition("other", 0))
+        return only_p1, rest
+
+    only_p1, rest = run(scenario())
+    assert list(only_p1) == [p1]
+    assert list(rest) == [p0]
+
+
+def test_group_members_share_the_partitions():
+    broker = InMemoryBroker(default_partitions=4)
+    produce(broker, 40)
+
+    async def scenario():
+        first, second = consumer(broker), consumer(broker)
+        await first.start()
+        assert len(first.assignment()) == 4
+        await second.start()
+        assignments = first.assignment(), second.assignment()
+        batches = await first.getmany(), await second.getmany()
+
+        # The partitions of a member that leaves go to the one left
+        await second.stop()
+        return assignments, batches, first.assignment()
+
+    (first, second), (first_batches, second_batches), after_leave = run(scenario())
+    assert len(first) == len(second) == 2
+    assert first.isdisjoint(second)
+    assert set(first_batches) <= first and set(second_batches) <= second
+    assert user_ids({**first_batches, **second_batches}) == list(range(40))
+    assert len(after_leave) == 4
+
+
+def test_groups_consume_independently():
+    broker = InMemoryBroker()
+    produce(broker, 3)
+
+    async def scenario():
+        first, other_group = consumer(broker, group_id="a"), consumer(broker, group_id="b")
+        await first.start()
+        await other_group.start()
+        return await first.getmany(), await other_group.getmany()
+
+    first, other_group = run(scenario())
+    assert user_ids(first) == user_ids(other_group) == [0, 1, 2]
+
+
+def test_getmany_waits_for_records():
+    broker = InMemoryBroker()
+
+    async def scenario():
+        waiting = consumer(broker)
+        await waiting.start()
+        asyncio.get_running_loop().call_later(0.01, produce, broker, 1)
+        return await waiting.getmany(timeout_ms=1000)
+
+    assert user_ids(run(scenario())) == [0]
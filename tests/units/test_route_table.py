@@ -0,0 +1,111 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from tests.units.services import use_service
+
+pytest.importorskip("httpx")
+pytest.importorskip("pydantic_settings")
+
+use_service("gateway")
+
+from domain.entities.service import ResiliencePolicy, Service  # noqa: E402
+from use_cases.route_table import RouteTableHolder, build_route_table, parse_rate_limit  # noqa: E402
+
+
+def make_settings(routes_file: str = "", **overrides) -> SimpleNamespace:
+    settings = {
+        "service_mapping": {
+            "user": Service(name="user", instances=["http://user:8001"], slag="user",
+                            policy=ResiliencePolicy(connect_timeout=1.0, read_timeout=5.0)),
+            "notification": Service(name="notification", instances=["http://notification:8002"], slag="notification"),
+        },
+        "routes_file": routes_file,
+        "rate_limit_enabled": False,
+        "rate_limit_default": "100/minute",
+        "max_body_size": 0,
+        "coalesce_enabled": False,
+        **overrides,
+    }
+    return SimpleNamespace(**settings)
+
+
+def write_routes(tmp_path, routes: list) -> str:
+    path = tmp_path / "routes.json"
+    path.write_text(json.dumps(routes))
+    return str(path)
+
+
+def test_default_routes_per_service():
+    table = build_route_table(make_settings())
+    route = table.match("/api/notification/notifications/7")
+    assert route.service == "notification"
+    assert route.upstream_path("/api/notification/notifications/7") == "notifications/7"
+    assert route.options.auth_required
+    assert table.match("/api/unknown/thing") is None
+    assert table.match("/health") is None
+
+
+def test_longest_prefix_wins(tmp_path):
+    routes_file = write_routes(tmp_path, [
+        {"prefix": "/api/user/users", "service": "user", "read_timeout": 2, "cache_policy": "private, max-age=5"},
+    ])
+    table = build_route_table(make_settings(routes_file))
+
+    login = table.match("/api/user/users/login")
+    assert login.route.prefix == "/api/user/users/login"
+    assert not login.options.auth_required
+
+    users = table.match("/api/user/users/42")
+    assert users.route.prefix == "/api/user/users"
+    assert users.upstream_path("/api/user/users/42") == "users/42"
+    assert users.response_headers == (("cache-control", "private, max-age=5"),)
+
+    other = table.match("/api/user/sessions/validate")
+    assert other.route.prefix == "/api/user"
+    assert other.timeout is None
+
+
+def test_prefix_matches_whole_segments_only():
+    table = build_route_table(make_settings())
+    assert table.match("/api/username/x") is None
+    assert table.match("/api/user/").route.prefix == "/api/user"
+
+
+def test_route_timeout_overrides_only_what_it_sets(tmp_path):
+    routes_file = write_routes(tmp_path, [{"prefix": "/api/user/users", "service": "user", "read_timeout": 2}])
+    timeout = build_route_table(make_settings(routes_file)).match("/api/user/users").timeout
+    assert (timeout.connect, timeout.read, timeout.write, timeout.pool) == (1.0, 2, 2, 1.0)
+
+
+def test_default_rate_limit_and_explicit_null(tmp_path):
+    routes_file = write_routes(tmp_path, [
+        {"prefix": "/api/user/users", "service": "user", "rate_limit": None},
+        {"prefix": "/api/user/reports", "service": "user", "rate_limit": "5/seconds"},
+    ])
+    table = build_route_table(make_settings(routes_file, rate_limit_enabled=True))
+    assert table.match("/api/notification/x").options.rate_limit.requests == 100
+    assert table.match("/api/user/users/1").options.rate_limit is None
+    assert table.match("/api/user/reports").options.rate_limit.refill_per_second == 5.0
+
+
+def test_unknown_service_is_rejected(tmp_path):
+    routes_file = write_routes(tmp_path, [{"prefix": "/api/billing", "service": "billing"}])
+    with pytest.raises(ValueError, match="unknown service 'billing'"):
+        build_route_table(make_settings(routes_file))
+
+
+@pytest.mark.parametrize("value", ["100", "ten/minute", "5/fortnight"])
+def test_invalid_rate_limit(value):
+    with pytest.raises(ValueError, match="Invalid rate limit"):
+        parse_rate_limit(value)
+
+
+def test_holder_swaps_tables(tmp_path):
+    holder = RouteTableHolder(build_route_table(make_settings()))
+    assert holder.match("/api/user/users/login").route.prefix == "/api/user/users/login"
+
+    routes_file = write_routes(tmp_path, [{"prefix": "/api/user/users/login", "service": "user"}])
+    holder.swap(build_route_table(make_settings(routes_file)))
+    assert holder.match("/api/user/users/login").options.auth_required
@@ -0,0 +1,119 @@
+import asyncio
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+from tests.units.services import use_service
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("dotenv")
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'scheduler.db')}"
+use_service("notification")
+
+from database import Base, SessionLocal, engine  # noqa: E402
+from models import Notification, ScheduledNotification  # noqa: E402
+from services.scheduler import ScheduledQueue, SchedulerWorker, digest_due_at, utcnow  # noqa: E402
+
+WINDOW = 60.0
+CONTEXT = {"username": "jdoe", "email": "jdoe@example.com"}
+
+
+@pytest.fixture
+def queue():
+    Base.metadata.create_all(bind=engine)
+    yield ScheduledQueue(claim_timeout=60.0)
+    session = SessionLocal()
+    session.query(ScheduledNotification).delete()
+    session.query(Notification).delete()
+    session.commit()
+    session.close()
+
+
+def schedule_digest(queue: ScheduledQueue, user_id: int, count: int, at: datetime) -> list:
+    return [
+        queue.schedule_digest(user_id, "EMAIL", "user_created", CONTEXT, "activity", window_seconds=WINDOW, at=at)
+        for _ in range(count)
+    ]
+
+
+def test_digest_due_at_is_the_end_of_the_window():
+    at = datetime(2024, 1, 1, 12, 0, 10)
+    assert digest_due_at(at, WINDOW) == datetime(2024, 1, 1, 12, 1)
+    assert digest_due_at(at + timedelta(seconds=49), WINDOW) == datetime(2024, 1, 1, 12, 1)
+    assert digest_due_at(datetime(2024, 1, 1, 12, 1), WINDOW) == datetime(2024, 1, 1, 12, 2)
+
+
+def test_claim_due_claims_due_items_once(queue):
+    now = utcnow()
+    due = [queue.schedule(1, "email", "user_created", CONTEXT, now - timedelta(seconds=i)) for i in (1, 2)]
+    queue.schedule(1, "email", "user_created", CONTEXT, now + timedelta(hours=1))
+
+    claimed = queue.claim_due(10, now)
+    assert sorted(item.id for item in claimed) == sorted(due)
+    assert all(item.channel == "EMAIL" for item in claimed)
+    assert queue.claim_due(10, now) == []
+    assert queue.stats() == {"claimed": 2, "pending": 1}
+
+
+def test_claim_due_takes_the_rest_of_a_digest_cut_by_the_limit(queue):
+    now = utcnow()
+    single = queue.schedule(2, "EMAIL", "user_created", CONTEXT, now - timedelta(hours=1))
+    digest = schedule_digest(queue, 1, 3, now - timedelta(minutes=10))
+    later_digest = schedule_digest(queue, 3, 2, now - timedelta(minutes=5))
+
+    claimed = queue.claim_due(2, now)
+    assert sorted(item.id for item in claimed) == sorted([single] + digest)
+    # The next claim starts at the following digest, nothing of the first is left behind
+    assert sorted(item.id for item in queue.claim_due(1, now)) == sorted(later_digest)
+    assert queue.claim_due(10, now) == []
+
+
+def test_claim_due_keeps_digest_windows_apart(queue):
+    now = utcnow()
+    first_window = schedule_digest(queue, 1, 2, now - timedelta(minutes=10))
+    second_window = schedule_digest(queue, 1, 2, now - timedelta(minutes=5))
+
+    assert sorted(item.id for item in queue.claim_due(1, now)) == sorted(first_window)
+    assert sorted(item.id for item in queue.claim_due(1, now)) == sorted(second_window)
+
+
+def test_stale_claims_are_claimed_again(queue):
+    now = utcnow()
+    item_id = queue.schedule(1, "EMAIL", "user_created", CONTEXT, now)
+    assert [item.id for item in queue.claim_due(10, now)] == [item_id]
+
+    assert queue.claim_due(10, now + timedelta(seconds=30)) == []
+    # The worker that claimed it died, another one picks it up after claim_timeout
+    assert [item.id for item in queue.claim_due(10, now + timedelta(seconds=61))] == [item_id]
+
+
+def test_deliver_sends_one_message_per_digest(queue):
+    now = utcnow()
+    queue.schedule(2, "EMAIL", "user_created", CONTEXT, now - timedelta(hours=1))
+    schedule_digest(queue, 1, 3, now - timedelta(minutes=10))
+    worker = SchedulerWorker(queue, batch_size=2)
+
+    asyncio.run(worker._deliver(queue.claim_due(2, now)))
+
+    session = SessionLocal()
+    messages = {row.user_id: row.message for row in session.query(Notification)}
+    session.close()
+    assert set(messages) == {1, 2}
+    assert messages[2].startswith("Hi jdoe")
+    assert messages[1].count("- Hi jdoe") == 3
+    assert (worker.delivered, worker.digested, worker.failed) == (2, 2, 0)
+    assert queue.stats() == {"sent": 4}
+
+
+def test_deliver_marks_unrenderable_items_failed(queue):
+    now = utcnow()
+    queue.schedule(1, "EMAIL", "no_such_event", CONTEXT, now)
+    worker = SchedulerWorker(queue)
+
+    asyncio.run(worker._deliver(queue.claim_due(10, now)))
+
+    assert worker.failed == 1
+    assert queue.stats() == {"failed": 1}
@@ -0,0 +1,81 @@
+import pytest
+
+from tests.units.services import use_service
+
+pytest.importorskip("dotenv")
+
+use_service("user")
+
+from services import cache  # noqa: E402
+from services.cache import LRUCache  # noqa: E402
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(cache, "time", fake)
+    return fake
+
+
+def test_get_and_set(clock):
+    users = LRUCache(max_size=2, ttl_seconds=60.0)
+    assert users.get(1) is None
+    assert users.set(1, {"id": 1})
+    assert users.get(1) == {"id": 1}
+    assert users.stats()["hits"] == users.stats()["misses"] == 1
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    users = LRUCache(max_size=2, ttl_seconds=60.0)
+    users.set(1, "a")
+    users.set(2, "b")
+    users.get(1)
+    users.set(3, "c")
+    assert users.get(2) is None
+    assert users.get(1) == "a" and users.get(3) == "c"
+    assert users.evictions == 1
+
+
+def test_entries_expire_after_ttl(clock):
+    users = LRUCache(max_size=2, ttl_seconds=60.0)
+    users.set(1, "a")
+    clock.now += 59.9
+    assert users.get(1) == "a"
+    clock.now += 0.1
+    assert users.get(1) is None
+    assert users.expirations == 1
+
+
+def test_invalidate_rejects_values_loaded_before_it(clock):
+    users = LRUCache(max_size=2, ttl_seconds=60.0)
+    users.set(1, "old")
+    # A reader starts loading from the DB, a writer invalidates meanwhile
+    version = users.version
+    assert users.invalidate(1)
+    assert not users.set(1, "stale", version=version)
+    assert users.get(1) is None
+
+    assert users.set(1, "fresh", version=users.version)
+    assert users.get(1) == "fresh"
+
+
+def test_clear_also_bumps_the_version(clock):
+    users = LRUCache(max_size=2, ttl_seconds=60.0)
+    version = users.version
+    users.set(1, "a")
+    users.clear()
+    assert users.get(1) is None
+    assert not users.set(1, "stale", version=version)
+
+
+def test_max_size_must_be_positive():
+    with pytest.raises(ValueError):
+        LRUCache(max_size=0)